@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import requests
 import logging
@@ -9,6 +10,10 @@ from datetime import datetime, timezone
 from logging.handlers import TimedRotatingFileHandler
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# stage timings (grib_to_json/tracing.py; off unless CINDER_TRACE is set)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "grib_to_json"))
+from tracing import finish_run, traced
+
 # -----------------------------------------
 # ------------ Constants ------------------
 # -----------------------------------------
@@ -129,6 +134,7 @@ def generate_href_urls(pull_date, run_hour_str, forecast_hours, field_type = 'me
 # --- Download Function ---
 # -------------------------
 
+@traced("fetch")
 def download_file(url, output_dir):
 	filename = url.split("file=")[1].split("&")[0]
 	filepath = os.path.join(output_dir, filename)
@@ -210,6 +216,7 @@ def main():
 		logger.info('All files downloaded successfully!')
 		
 	print("\n✅ 📂 All downloads complete!\n")
+	finish_run("get_href")
 	
 
 def view_grib():
@@ -1,13 +1,24 @@
 import re
+import sys
 import time
 import logging
 import pathlib
-import requests
 from datetime import datetime, timezone, timedelta
 from logging.handlers import TimedRotatingFileHandler
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# stage timings (grib_to_json/tracing.py; off unless CINDER_TRACE is set)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "grib_to_json"))
+from tracing import finish_run
+
+try:
+    from Fetch_Scripts.idx_selection import SelectionCache
+    from Fetch_Scripts.ranged_fetch import RangedFetcher, RangePlan
+except ImportError:  # run directly from Fetch_Scripts/
+    from idx_selection import SelectionCache
+    from ranged_fetch import RangedFetcher, RangePlan
+
 # =========================
 # User settings (MANUAL ONLY)
 # =========================
@@ -127,72 +138,19 @@ fh.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
 logger.addHandler(fh)
 
 # =========================
-# HTTP (retry) helpers
+# HTTP, planning & download (ranged_fetch.py)
 # =========================
 MAX_RETRIES = 2
 TIMEOUT = 60
 BACKOFF = 1.6
 
-def http_get(url, headers=None, stream=False):
-    for a in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.get(url, headers=headers or {}, stream=stream, timeout=TIMEOUT)
-            if r.status_code in (200, 206):
-                return r
-            logger.warning(f"GET {url} -> HTTP {r.status_code}")
-        except Exception as e:
-            logger.warning(f"GET {url} attempt {a} failed: {e}")
-        time.sleep(BACKOFF ** a)
-    raise RuntimeError(f"Failed GET {url}")
-
-def http_head(url):
-    for a in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.head(url, headers={"Accept-Encoding": "identity"}, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r
-            logger.warning(f"HEAD {url} -> HTTP {r.status_code}")
-        except Exception as e:
-            logger.warning(f"HEAD {url} attempt {a} failed: {e}")
-        time.sleep(BACKOFF ** a)
-    raise RuntimeError(f"Failed HEAD {url}")
-
-def http_get_range(url, start: int, end: int):
-    hdrs = {
-        "Range": f"bytes={start}-{end}",
-        "Accept-Encoding": "identity",
-        "Connection": "close",
-        "User-Agent": "nbm-manual-slicer/1.0",
-    }
-    for a in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.get(url, headers=hdrs, stream=True, timeout=TIMEOUT)
-            if r.status_code == 206 and r.headers.get("Content-Range"):
-                return r
-            logger.warning(
-                f"RANGE GET {url} [{start}-{end}] -> HTTP {r.status_code} "
-                f"(Content-Range={r.headers.get('Content-Range')!r}); retrying"
-            )
-        except Exception as e:
-            logger.warning(f"RANGE GET {url} attempt {a} failed: {e}")
-        time.sleep(BACKOFF ** a)
-    raise RuntimeError(f"Failed RANGE GET {url} bytes={start}-{end}")
-
-# .idx parsing & range builder
-
-IDX_RE = re.compile(r"^\s*(\d+):(\d+):(.*)$")
-
-def parse_idx(text_lines):
-    """
-    Return list of dicts: {'msg':int, 'offset':int, 'desc':str}, sorted by msg#
-    """
-    out = []
-    for line in text_lines:
-        m = IDX_RE.match(line)
-        if m:
-            out.append({"msg": int(m.group(1)), "offset": int(m.group(2)), "desc": m.group(3)})
-    out.sort(key=lambda d: d["msg"])
-    return out
+# MANUAL_PATTERNS selections per .idx layout, reused across hours and cycles
+SELECTIONS = SelectionCache("nbm")
+
+FETCH = RangedFetcher(
+    logger, SELECTIONS, retries=MAX_RETRIES, timeout=TIMEOUT, backoff=BACKOFF,
+    user_agent="nbm-manual-slicer/1.0",
+)
 
 
 # URL candidates (ENSEMBLE)
@@ -209,79 +167,19 @@ def candidate_urls(product: str, date: str, cycle: str, fxx: int):
     return []
 
 def pick_grib_url(product: str, date: str, cycle: str, fxx: int):
-    for url in candidate_urls(product, date, cycle, fxx):
-        idx_url = f"{url}.idx"
-        try:
-            r = http_head(idx_url)
-            if r.status_code == 200:
-                return url, idx_url
-        except Exception:
-            continue
-    return None, None
-
-
-def build_ranges(filtered_entries, full_entries, total_size):
-    """
-    For each selected message, compute [start,end] byte range to slice that message.
-    """
-    off = {e["msg"]: e["offset"] for e in full_entries}
-    all_msgs = [e["msg"] for e in full_entries]
-    ranges = []
-    for e in filtered_entries:
-        i = all_msgs.index(e["msg"])
-        start = off[e["msg"]]
-        end = (off[all_msgs[i + 1]] - 1) if i < len(all_msgs) - 1 else (total_size - 1)
-        ranges.append((start, end, e["desc"]))
-    return ranges
-
-
-# Core manual slicer
+    return FETCH.first_available(candidate_urls(product, date, cycle, fxx))
 
-def fetch_single_url(grib_url: str, outdir: pathlib.Path, idx_patterns: list[str]) -> pathlib.Path:
-    """
-    Slice a single NBM GRIB into a compact GRIB containing only messages whose
-    .idx 'desc' matches ANY of the provided regex patterns.
-    """
-    if not idx_patterns:
-        raise ValueError("No MANUAL_PATTERNS specified.")
-
-    outdir.mkdir(parents=True, exist_ok=True)
-    idx_url = grib_url + ".idx"
-
-    logger.info(f"Using index -> {idx_url}")
-    idx_lines = http_get(idx_url).text.splitlines()
-    entries = parse_idx(idx_lines)
-    if not entries:
-        raise RuntimeError("Empty/invalid .idx")
 
-    head = http_head(grib_url)
-    total_size = int(head.headers.get("Content-Length", "0"))
-    if total_size <= 0:
-        raise RuntimeError("Missing Content-Length on GRIB")
+def match_any(entries, patterns):
+    """Positions of the entries matching ANY of the patterns (SelectionCache matcher)."""
+    regexes = [re.compile(p) for p in patterns]
+    return [i for i, e in enumerate(entries) if any(rx.search(e["desc"]) for rx in regexes)]
 
-    # Compile regexes
-    regexes = [re.compile(p) for p in idx_patterns]
 
-    # Find matches
-    matched = []
-    for e in entries:
-        if any(rx.search(e["desc"]) for rx in regexes):
-            matched.append(e)
+# Planning
 
-    if not matched:
-        logger.info("No index lines matched your MANUAL_PATTERNS. Nothing to do.")
-        raise Exception("No index lines matched.")
-
-    # Log which lines matched for transparency
-    logger.info("Matched .idx lines:")
-    for e in matched:
-        logger.info(f"  msg={e['msg']:>} off={e['offset']:>10} :: {e['desc']}")
-
-    # Build byte ranges
-    downloads = build_ranges(matched, entries, total_size)
-    downloads.sort(key=lambda t: t[0])  # by start offset
-
-    # Output filename (derive from URL and a hash of patterns)
+def out_path(grib_url: str, outdir: pathlib.Path) -> pathlib.Path:
+    """Compact output file for a source URL (nbm_tCCz_fFFF_custom.grib2)."""
     m = re.search(r"\.t(\d{2})z.*?\.f(\d{2,3})", grib_url)
     if m:
         cy, fff = m.group(1), int(m.group(2))
@@ -289,33 +187,40 @@ def fetch_single_url(grib_url: str, outdir: pathlib.Path, idx_patterns: list[str
     else:
         # fallback to URL basename
         stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", pathlib.Path(grib_url).name) + "_custom"
+    return outdir / (stem + ".grib2")
+
+
+def plan_url(grib_url: str, outdir: pathlib.Path, idx_patterns: list[str]) -> RangePlan:
+    """
+    Resolves a GRIB URL to a RangePlan of the messages whose .idx 'desc'
+    matches ANY of the patterns.
+    """
+    if not idx_patterns:
+        raise ValueError("No MANUAL_PATTERNS specified.")
+    plan = FETCH.plan(grib_url, idx_patterns, match_any, out_path(grib_url, outdir))
+    if not plan.ranges:
+        logger.info("No index lines matched your MANUAL_PATTERNS. Nothing to do.")
+        raise Exception("No index lines matched.")
+    logger.info(f"Matched {plan.messages} .idx lines in {len(plan.ranges)} ranges")
+    return plan
 
-    outfile = outdir / (stem + ".grib2")
-    tmp = outfile.with_suffix(outfile.suffix + ".part")
-
-    # Fetch & write compact GRIB
-    logger.info(f"Writing -> {outfile}")
-    with open(tmp, "wb") as out:
-        for (start, end, desc) in downloads:
-            logger.info(f"  GET bytes={start}-{end} :: {desc}")
-            r = http_get_range(grib_url, start, end)
-            expected = end - start + 1
-            got = 0
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    out.write(chunk)
-                    got += len(chunk)
-            if got != expected:
-                raise RuntimeError(
-                    f"Range size mismatch [{start}-{end}] expected {expected}, got {got}"
-                )
-
-    if outfile.exists():
-        outfile.unlink(missing_ok=True)
-    tmp.replace(outfile)
-    sz_mb = outfile.stat().st_size / (1024 * 1024)
-    logger.info(f"Done. Size = {sz_mb:.1f} MB")
-    return outfile
+
+def plan_hour(date: str, cycle: str, fxx: int, outdir: pathlib.Path, idx_patterns: list[str]):
+    """RangePlan for one forecast hour of a cycle, or None when it has no candidate URL."""
+    grib_url, _ = pick_grib_url('qmd', date, cycle, fxx)
+    if not grib_url:
+        return None
+    return plan_url(grib_url, outdir, idx_patterns)
+
+
+# Core manual slicer
+
+def fetch_single_url(grib_url: str, outdir: pathlib.Path, idx_patterns: list[str]) -> pathlib.Path:
+    """
+    Slice a single NBM GRIB into a compact GRIB containing only messages whose
+    .idx 'desc' matches ANY of the provided regex patterns.
+    """
+    return FETCH.download(plan_url(grib_url, outdir, idx_patterns))
 
 # =========================
 # Main
@@ -327,27 +232,24 @@ def main():
         while True:  # keep looping until all files for one cycle succeed
             try:
                 t0 = time.time()
-                futures = []
-                rollback_triggered = False
+                hours = range(F_START + 1, F_END + 1)
 
                 with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                    for fxx in range(F_START + 1, F_END + 1):
-                        grib_url, idx_url = pick_grib_url('qmd', pull_date, cycle_str, fxx)
-                        if not grib_url:
-                            logger.info(
-                                f"No candidate GRIB URL for {pull_date} t{cycle_str}z f{fxx:03d} (Rolling-back Cycle)"
-                            )
-                            pull_date, cycle_str = rollback_cycle(pull_date, cycle_str)
-                            rollback_triggered = True
-                            break  # stop this cycle completely
-
-                        futures.append(
-                            executor.submit(fetch_single_url, grib_url, OUTDIR, MANUAL_PATTERNS)
+                    # Planning: every index and object size, concurrently
+                    plans, failed = FETCH.plan_cycle(executor, plan_hour, pull_date, cycle_str, hours, OUTDIR, MANUAL_PATTERNS)
+                    missing = [fxx for fxx, plan in plans.items() if plan is None]
+                    if missing:
+                        logger.info(
+                            f"No candidate GRIB URL for {pull_date} t{cycle_str}z {len(missing)} hours: "
+                            f"{', '.join(f'f{f:03d}' for f in missing)} (Rolling-back Cycle)"
                         )
+                        pull_date, cycle_str = rollback_cycle(pull_date, cycle_str)
+                        continue  # stop this cycle completely
+                    FETCH.log_plan(plans.values(), failed, time.time() - t0)
+                    SELECTIONS.save()
 
-                    # If rollback happened, skip to next cycle iteration
-                    if rollback_triggered:
-                        continue
+                    # Download: the whole plan at once, grouped by host
+                    futures = FETCH.submit_downloads(executor, plans.values())
 
                     # Otherwise, process results
                     for f in futures:
@@ -371,6 +273,8 @@ def main():
 
     except Exception as e:
         logger.exception(f"❌ Main thread failed: {e}")
+    finally:
+        finish_run("get_nbm")
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,25 @@
 import os
 import re
+import sys
 import time
 import logging
 import pathlib
-import requests
 from logging.handlers import TimedRotatingFileHandler
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+# stage timings (grib_to_json/tracing.py; off unless CINDER_TRACE is set)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "grib_to_json"))
+from tracing import finish_run
+
+try:
+    from Fetch_Scripts.idx_selection import SelectionCache
+    from Fetch_Scripts.ranged_fetch import RangedFetcher, RangePlan
+except ImportError:  # run directly from Fetch_Scripts/
+    from idx_selection import SelectionCache
+    from ranged_fetch import RangedFetcher, RangePlan
+
 # =========================
 # User settings
 # =========================
@@ -126,8 +137,8 @@ MAX_RETRIES = 1
 TIMEOUT = 60
 BACKOFF = 1.6
 
-# Regex to parse .idx lines: "msg#:offset:desc..."
-IDX_RE = re.compile(r"^\s*(\d+):(\d+):(.*)$")
+# FIELD_PATTERNS selections per .idx layout, reused across hours and cycles
+SELECTIONS = SelectionCache("refs")
 
 # =========================
 # Logging setup
@@ -152,56 +163,12 @@ fh.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
 logger.addHandler(fh)
 
 # =========================
-# HTTP helpers with retry
+# HTTP, planning & download (ranged_fetch.py)
 # =========================
-def http_get(url, headers=None, stream=False):
-    for a in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.get(url, headers=headers or {}, stream=stream, timeout=TIMEOUT)
-            if r.status_code in (200, 206):
-                return r
-            logger.warning(f"GET {url} -> HTTP {r.status_code}")
-        except Exception as e:
-            logger.warning(f"GET {url} attempt {a} failed: {e}")
-        time.sleep(BACKOFF ** a)
-    raise RuntimeError(f"Failed GET {url}")
-
-def http_head(url):
-    for a in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.head(url, headers={"Accept-Encoding": "identity"}, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r
-            logger.warning(f"HEAD {url} -> HTTP {r.status_code}")
-        except Exception as e:
-            logger.warning(f"HEAD {url} attempt {a} failed: {e}")
-        time.sleep(BACKOFF ** a)
-    raise RuntimeError(f"Failed HEAD {url}")
-
-def http_get_range(url, start: int, end: int):
-    """
-    Ranged GET that forces identity (no gzip) and validates 206 + Content-Range.
-    Returns a streaming response.
-    """
-    hdrs = {
-        "Range": f"bytes={start}-{end}",
-        "Accept-Encoding": "identity",
-        "Connection": "close",
-        "User-Agent": "rrfs-puller/1.0",
-    }
-    for a in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.get(url, headers=hdrs, stream=True, timeout=TIMEOUT)
-            if r.status_code == 206 and r.headers.get("Content-Range"):
-                return r
-            logger.warning(
-                f"RANGE GET {url} [{start}-{end}] -> HTTP {r.status_code} "
-                f"(Content-Range={r.headers.get('Content-Range')!r}); retrying"
-            )
-        except Exception as e:
-            logger.warning(f"RANGE GET {url} attempt {a} failed: {e}")
-        time.sleep(BACKOFF ** a)
-    raise RuntimeError(f"Failed RANGE GET {url} bytes={start}-{end}")
+FETCH = RangedFetcher(
+    logger, SELECTIONS, retries=MAX_RETRIES, timeout=TIMEOUT, backoff=BACKOFF,
+    user_agent="rrfs-puller/1.0",
+)
 
 # ==================================
 # Helper for Manual Request Only
@@ -235,38 +202,6 @@ def fetch_single_url(grib_url: str, outdir: pathlib.Path, field_names: list[str]
     Download ONLY the requested fields from an arbitrary GRIB2 URL that has a .idx file.
     Example grib_url: https://.../rrfs.t12z.conus.pmmn.f10.grib2
     """
-    outdir.mkdir(parents=True, exist_ok=True)
-    idx_url = grib_url + ".idx"
-
-    # Probe index + size
-    logger.info(f"Manual: using index -> {idx_url}")
-    idx_lines = http_get(idx_url).text.splitlines()
-    entries = parse_idx(idx_lines)
-    if not entries:
-        raise RuntimeError("Manual: empty/invalid .idx")
-
-    head = http_head(grib_url)
-    total_size = int(head.headers.get("Content-Length", "0"))
-    if total_size <= 0:
-        raise RuntimeError("Manual: missing Content-Length on GRIB")
-
-    # Select fields
-    pats = patterns_for(field_names)
-    downloads = []
-    for pat in pats:
-        rx = re.compile(pat)
-        filtered = [e for e in entries if rx.search(e["desc"])]
-        if not filtered:
-            logger.warning(f"Manual: no matches for {pat} in index (skipping)")
-            continue
-        ranges = build_ranges(filtered, entries, total_size)
-        downloads.extend((grib_url, start, end, desc) for (start, end, desc) in ranges)
-
-    if not downloads:
-        raise RuntimeError("Manual: no matching fields found in index")
-
-    downloads.sort(key=lambda t: t[1])  # by start byte
-
     # Output filename
     # Try to infer date/cycle/fhr from the URL; fall back to a safe stem.
     m = re.search(r"(rrfs)\.t(\d{2})z.*?\.f(\d{2,3})", grib_url)
@@ -276,54 +211,22 @@ def fetch_single_url(grib_url: str, outdir: pathlib.Path, field_names: list[str]
     else:
         stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", pathlib.Path(grib_url).name) + f"_{'_'.join(field_names).lower()}"
 
-    outfile = outdir / (stem + ".grib2")
-    tmp = outfile.with_suffix(outfile.suffix + ".part")
-
-    # Write compact GRIB
-    logger.info(f"Manual: writing -> {outfile}")
-    with open(tmp, "wb") as out:
-        for _, start, end, desc in downloads:
-            logger.info(f"  GET bytes={start}-{end} :: {desc}")
-            r = http_get_range(grib_url, start, end)
-            expected = end - start + 1
-            got = 0
-            for chunk in r.iter_content(chunk_size=1024*1024):
-                if chunk:
-                    out.write(chunk)
-                    got += len(chunk)
-            if got != expected:
-                raise RuntimeError(f"Manual: range mismatch [{start}-{end}] expected {expected}, got {got}")
-
-    if outfile.exists():
-        outfile.unlink(missing_ok=True)
-    tmp.replace(outfile)
-    sz_mb = outfile.stat().st_size / (1024*1024)
-    logger.info(f"Manual: done. Size = {sz_mb:.1f} MB")
-    return outfile
+    plan = FETCH.plan(grib_url, patterns_for(field_names), match_fields, outdir / (stem + ".grib2"))
+    if not plan.ranges:
+        raise RuntimeError("Manual: no matching fields found in index")
+    return FETCH.download(plan)
 
 
 # =========================
-# .idx parsing & ranges
+# .idx selection
 # =========================
-def parse_idx(text_lines):
-    out = []
-    for line in text_lines:
-        m = IDX_RE.match(line)
-        if m:
-            out.append({"msg": int(m.group(1)), "offset": int(m.group(2)), "desc": m.group(3)})
-    out.sort(key=lambda d: d["msg"])
-    return out
-
-def build_ranges(filtered_entries, full_entries, total_size):
-    off = {e["msg"]: e["offset"] for e in full_entries}
-    all_msgs = [e["msg"] for e in full_entries]
-    ranges = []
-    for e in filtered_entries:
-        i = all_msgs.index(e["msg"])
-        start = off[e["msg"]]
-        end = (off[all_msgs[i + 1]] - 1) if i < len(all_msgs) - 1 else (total_size - 1)
-        ranges.append((start, end, e["desc"]))
-    return ranges
+def match_fields(entries, patterns):
+    """Positions of the entries each pattern matches, pattern by pattern (SelectionCache matcher)."""
+    positions = []
+    for pat in patterns:
+        rx = re.compile(pat)
+        positions.extend(i for i, e in enumerate(entries) if rx.search(e["desc"]))
+    return positions
 
 # =========================
 # URL candidates (ENSEMBLE)
@@ -336,15 +239,7 @@ def candidate_urls(product: str, date: str, cycle: str, fxx: int):
     return [f"{BUCKET}/rrfs_a/refs.{date}/{cycle}/enspost_timelag/refs.t{cycle}z.conus.prob.f{fff}.grib2"]
 
 def pick_grib_url(product: str, date: str, cycle: str, fxx: int):
-    for url in candidate_urls(product, date, cycle, fxx):
-        idx_url = f"{url}.idx"
-        try:
-            r = http_head(idx_url)
-            if r.status_code == 200:
-                return url, idx_url
-        except Exception:
-            continue
-    return None, None
+    return FETCH.first_available(candidate_urls(product, date, cycle, fxx))
 
 # =========================
 # Writers
@@ -352,82 +247,46 @@ def pick_grib_url(product: str, date: str, cycle: str, fxx: int):
 def out_combined_path(date: str, cycle: str, fxx: int) -> pathlib.Path:
     return OUTDIR / f"rrfs.{date}t{cycle}z.f{fxx:03d}.conus.grib2"
 
+# =========================
+# Planning
+# =========================
+def plan_hour(date: str, cycle: str, fxx: int):
+    """
+    Resolves one forecast hour to a RangePlan (with no ranges if nothing
+    matched), or None when no candidate URL exists for the hour.
+    """
+    outfile = out_combined_path(date, cycle, fxx)
+    found = False
+    for product in PRODUCTS:
+        grib_url, _ = pick_grib_url(product, date, cycle, fxx)
+        if not grib_url:
+            continue
+        found = True
+        try:
+            return FETCH.plan(grib_url, FIELD_PATTERNS, match_fields, outfile)
+        except ValueError as e:
+            logger.warning(f"{date} t{cycle}z f{fxx:03d} {e}")
+    if found:
+        return RangePlan(None, 0, [], 0, outfile)
+    return None
+
+def already_downloaded(date: str, cycle: str, fxx: int):
+    outfile = out_combined_path(date, cycle, fxx)
+    return outfile.exists() and outfile.stat().st_size > 0
+
 def fetch_hour(date: str, cycle: str, fxx: int):
     """
-    Pull requested fields
+    Pull requested fields for one hour
     - write ONE combined file with all messages 
     """
-    
-    outfile = out_combined_path(date, cycle, fxx)
-    if outfile.exists() and outfile.stat().st_size > 0:
+    if already_downloaded(date, cycle, fxx):
+        outfile = out_combined_path(date, cycle, fxx)
         logger.info(f"{date} t{cycle}z f{fxx:03d} already exists -> {outfile} (skip)")
         return outfile
-    tmp = outfile.with_suffix(outfile.suffix + ".part")
-    # open once; append member slices into same file
-    with open(tmp, "wb") as out:
-        total_written = 0
-
-        downloads = []
-
-        # Find a viable product/URL for this member
-        grib_url = idx_url = None
-        entries = None
-        total_size = None
-        for product in PRODUCTS:
-            grib_url, idx_url = pick_grib_url(product, date, cycle, fxx)
-            if not grib_url:
-                continue
-            logger.info(f"{date} t{cycle}z f{fxx:03d} using index -> {idx_url}")
-            idx_lines = http_get(idx_url).text.splitlines()
-            entries = parse_idx(idx_lines)
-            if not entries:
-                logger.info(f"{date} t{cycle}z f{fxx:03d} empty/invalid index.")
-                continue
-            head = http_head(grib_url)
-            total_size = int(head.headers.get("Content-Length", "0"))
-            if total_size <= 0:
-                logger.warning(f"{date} t{cycle}z f{fxx:03d} missing Content-Length.")
-                continue
-            # select fields for this member
-            for pat in FIELD_PATTERNS:
-                rx = re.compile(pat)
-                filtered = [e for e in entries if rx.search(e["desc"])]
-                if not filtered:
-                    continue
-                ranges = build_ranges(filtered, entries, total_size)
-                for (start, end, desc) in ranges:
-                    downloads.append((grib_url, start, end, desc))
-            break  # we found a viable product for this member (or not)
-
-        if not downloads:
-            logger.info(f"{date} t{cycle}z f{fxx:03d} : no matching fields")
-
-        # keep in ascending byte order
-        downloads.sort(key=lambda t: t[1])
-
-        # fetch ranges
-        for grib_url, start, end, desc in downloads:
-            logger.info(f" GET {grib_url} bytes={start}-{end} :: {desc}")
-            r = http_get_range(grib_url, start, end)
-            expected = end - start + 1
-            got = 0
-            for chunk in r.iter_content(chunk_size=1024*1024):
-                if not chunk:
-                    continue
-                out.write(chunk)
-                got += len(chunk)
-                total_written += len(chunk)
-            if got != expected:
-                raise RuntimeError(
-                    f"range size mismatch [{start}-{end}] expected {expected}, got {got}"
-                )
-
-    if outfile.exists():
-        outfile.unlink(missing_ok=True)
-    tmp.replace(outfile)
-    sz_mb = outfile.stat().st_size / (1024*1024)
-    logger.info(f"{date} t{cycle}z f{fxx:03d} combined ENS file Size={sz_mb:.1f} MB")
-    return outfile
+    plan = plan_hour(date, cycle, fxx)
+    if plan is None:
+        raise RuntimeError(f"{date} t{cycle}z f{fxx:03d} has no candidate URL")
+    return FETCH.download(plan)
 
 # =========================
 # Main
@@ -469,31 +328,40 @@ def main():
                     f"==== REFS pull :: {pull_date} t{cycle_str}z f{F_START:03d}-{F_END:03d} ===="
                 )
 
-                with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                    for fxx in range(F_START, F_END + 1):
-                        grib_url, idx_url = pick_grib_url(PRODUCTS[0], pull_date, cycle_str, fxx)
-                        if not grib_url:
-                            logger.info(
-                                f"No candidate URL for f{fxx:02d} — rolling back cycle"
-                            )
-                            pull_date, cycle_str = rollback_cycle(pull_date, cycle_str)
-                            rollback_triggered = True
-                            rollback_count += 1
+                hours = []
+                success = 0
+                for fxx in range(F_START, F_END + 1):
+                    if already_downloaded(pull_date, cycle_str, fxx):
+                        logger.info(f"{pull_date} t{cycle_str}z f{fxx:03d} already exists (skip)")
+                        success += 1
+                    else:
+                        hours.append(fxx)
 
-                            if rollback_count >= MAX_RETRIES:
-                                logger.error(
-                                    f"Exceeded maximum rollback attempts ({MAX_RETRIES}). Aborting."
-                                )
-                                return
-                            break  # stop this cycle completely
+                with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
+                    # --- Planning: every index and object size, concurrently ---
+                    t_plan = time.time()
+                    plans, failed = FETCH.plan_cycle(executor, plan_hour, pull_date, cycle_str, hours)
+                    missing = [fxx for fxx, plan in plans.items() if plan is None]
+                    if missing:
+                        logger.info(
+                            f"No candidate URL for {len(missing)} hours: "
+                            f"{', '.join(f'f{f:02d}' for f in missing)} — rolling back cycle"
+                        )
+                        pull_date, cycle_str = rollback_cycle(pull_date, cycle_str)
+                        rollback_count += 1
 
-                        futures.append(executor.submit(fetch_hour, pull_date, cycle_str, fxx))
+                        if rollback_count >= MAX_RETRIES:
+                            logger.error(
+                                f"Exceeded maximum rollback attempts ({MAX_RETRIES}). Aborting."
+                            )
+                            return
+                        continue  # stop this cycle completely
+                    FETCH.log_plan(plans.values(), failed, time.time() - t_plan)
+                    SELECTIONS.save()
 
-                    # Skip rest of this loop if rollback happened
-                    if rollback_triggered:
-                        continue
+                    # --- Download: the whole plan at once, grouped by host ---
+                    futures = FETCH.submit_downloads(executor, plans.values())
 
-                    success = 0
                     for f in futures:
                         try:
                             out = f.result()
@@ -522,6 +390,8 @@ def main():
 
     except Exception as e:
         logger.exception(f"❌ Main thread failed: {e}")
+    finally:
+        finish_run("get_refs")
 
 
 
@@ -0,0 +1,104 @@
+"""
+Cache of .idx field selections keyed by inventory layout.
+
+Within a cycle, and from one cycle to the next, a forecast hour's .idx
+usually lists the same messages with the same descriptions in the same
+order; only the byte offsets move. SelectionCache remembers which message
+positions the field patterns selected, keyed by a hash of the description
+column (reference date stripped) plus the patterns, so a repeated layout
+skips the regex matching and only its byte ranges are rebuilt from the new
+offsets.
+
+    SELECTIONS = SelectionCache("refs")
+    selected = SELECTIONS.select(entries, FIELD_PATTERNS, match_fields)
+    ...
+    logger.info(SELECTIONS.summary())
+    SELECTIONS.save()
+
+Selections persist in idx_cache/<name>.json next to this file.
+"""
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent / "idx_cache"
+MAX_LAYOUTS = 1024
+
+# "d=2025103000:" leads every description and changes each cycle
+REF_DATE_RE = re.compile(r"^d=\d+:")
+
+
+def layout_key(entries, patterns):
+    """Hash of the patterns and the .idx description column, without reference dates."""
+    h = hashlib.sha1()
+    for pattern in patterns:
+        h.update(pattern.encode())
+        h.update(b"\0")
+    h.update(b"\1")
+    for e in entries:
+        h.update(REF_DATE_RE.sub("", e["desc"]).encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class SelectionCache:
+    """
+    Thread-safe {layout_key: [selected message positions]} for one model,
+    loaded from disk on first use and written back by save().
+    """
+
+    def __init__(self, name, cache_dir=CACHE_DIR):
+        self.path = Path(cache_dir) / f"{name}.json"
+        self._lock = threading.Lock()
+        self._layouts = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        try:
+            self._layouts = json.loads(self.path.read_text(encoding="utf-8")).get("layouts", {})
+        except (OSError, ValueError):
+            self._layouts = {}
+
+    def select(self, entries, patterns, match):
+        """
+        Returns the entries selected by match(entries, patterns) -> [position],
+        reusing the stored positions when this layout has been matched before.
+        """
+        key = layout_key(entries, patterns)
+        with self._lock:
+            if self._layouts is None:
+                self._load()
+            positions = self._layouts.get(key)
+            if positions is not None:
+                self.hits += 1
+        if positions is None:
+            positions = match(entries, patterns)
+            with self._lock:
+                self.misses += 1
+                self._layouts[key] = positions
+                self._dirty = True
+        return [entries[i] for i in positions]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        return (f"Selection cache: {self.hits}/{self.hits + self.misses} layouts reused "
+                f"({self.hit_rate():.0%})")
+
+    def save(self):
+        """Writes new selections to disk (most recent MAX_LAYOUTS kept)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            layouts = dict(list(self._layouts.items())[-MAX_LAYOUTS:])
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".part")
+        tmp.write_text(json.dumps({"layouts": layouts}), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,302 @@
+"""
+Plan-then-download byte-range fetching shared by the .idx-driven scripts
+(get_nbm.py, get_refs.py).
+
+A cycle is fetched in two phases on one thread pool. Planning reads every
+forecast hour's .idx, HEADs the object for its size and turns the messages
+the field patterns select into byte ranges, byte-adjacent messages merged
+into one request. Downloading then pulls each planned object's ranges in
+offset order into a compact GRIB. Every thread keeps its own
+requests.Session, so connections opened while planning are reused by the
+downloads that follow.
+
+    FETCH = RangedFetcher(logger, SELECTIONS, retries=MAX_RETRIES, user_agent="rrfs-puller/1.0")
+
+    def plan_hour(date, cycle, fxx):
+        grib_url = ...  # model-specific URL lookup
+        return FETCH.plan(grib_url, FIELD_PATTERNS, match_fields, outfile)
+
+    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
+        plans, failed = FETCH.plan_cycle(executor, plan_hour, date, cycle, hours)
+        FETCH.log_plan(plans.values(), failed, seconds)
+        for future in FETCH.submit_downloads(executor, plans.values()):
+            future.result()
+
+The scripts keep only their URLs, field patterns and output names.
+"""
+import pathlib
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import requests
+
+# stage timings (grib_to_json/tracing.py; off unless CINDER_TRACE is set)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "grib_to_json"))
+from tracing import span, traced
+
+# Regex to parse .idx lines: "msg#:offset:desc..."
+IDX_RE = re.compile(r"^\s*(\d+):(\d+):(.*)$")
+
+_local = threading.local()
+
+
+def session():
+    """This thread's requests.Session, so its keep-alive connections are reused across requests."""
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = _local.session = requests.Session()
+    return s
+
+
+# .idx parsing & ranges
+
+@traced("idx_parse")
+def parse_idx(text_lines):
+    """
+    Return list of dicts: {'msg':int, 'offset':int, 'desc':str}, sorted by msg#
+    """
+    out = []
+    for line in text_lines:
+        m = IDX_RE.match(line)
+        if m:
+            out.append({"msg": int(m.group(1)), "offset": int(m.group(2)), "desc": m.group(3)})
+    out.sort(key=lambda d: d["msg"])
+    return out
+
+
+def build_ranges(filtered_entries, full_entries, total_size):
+    """
+    For each selected message, compute [start,end] byte range to slice that message.
+    """
+    position = {e["msg"]: i for i, e in enumerate(full_entries)}
+    ranges = []
+    for e in filtered_entries:
+        i = position[e["msg"]]
+        start = e["offset"]
+        end = (full_entries[i + 1]["offset"] - 1) if i < len(full_entries) - 1 else (total_size - 1)
+        ranges.append((start, end, e["desc"]))
+    return ranges
+
+
+def coalesce_ranges(ranges):
+    """
+    Sorts (start, end, desc) ranges by start byte and merges byte-adjacent
+    ones, so consecutive selected messages come down in a single request.
+    """
+    merged = []
+    for start, end, desc in sorted(ranges):
+        if merged and start == merged[-1][1] + 1:
+            prev_start, _, prev_desc = merged[-1]
+            merged[-1] = (prev_start, end, f"{prev_desc} | {desc}")
+        else:
+            merged.append((start, end, desc))
+    return merged
+
+
+# Planning
+
+class RangePlan(NamedTuple):
+    """One GRIB object resolved to the byte ranges to pull from it and the compact output file."""
+    grib_url: str
+    total_size: int     # size of the whole source object
+    ranges: list        # [(start, end, desc)], ascending, adjacent messages merged
+    messages: int       # selected .idx messages
+    outfile: pathlib.Path
+
+    @property
+    def nbytes(self):
+        return sum(end - start + 1 for start, end, _ in self.ranges)
+
+
+class RangedFetcher:
+    """
+    HTTP with retry, planning and ranged download for one model; logs to
+    the script's logger and remembers selections in its SelectionCache.
+    """
+
+    def __init__(self, logger, selections, retries=2, timeout=60, backoff=1.6,
+                 user_agent="cinder-fetch/1.0"):
+        self.logger = logger
+        self.selections = selections
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.user_agent = user_agent
+
+    # HTTP (retry) helpers
+
+    def get(self, url, headers=None, stream=False):
+        for a in range(1, self.retries + 1):
+            try:
+                r = session().get(url, headers=headers or {}, stream=stream, timeout=self.timeout)
+                if r.status_code in (200, 206):
+                    return r
+                self.logger.warning(f"GET {url} -> HTTP {r.status_code}")
+            except Exception as e:
+                self.logger.warning(f"GET {url} attempt {a} failed: {e}")
+            time.sleep(self.backoff ** a)
+        raise RuntimeError(f"Failed GET {url}")
+
+    def head(self, url):
+        for a in range(1, self.retries + 1):
+            try:
+                r = session().head(url, headers={"Accept-Encoding": "identity"}, timeout=self.timeout)
+                if r.status_code == 200:
+                    return r
+                self.logger.warning(f"HEAD {url} -> HTTP {r.status_code}")
+            except Exception as e:
+                self.logger.warning(f"HEAD {url} attempt {a} failed: {e}")
+            time.sleep(self.backoff ** a)
+        raise RuntimeError(f"Failed HEAD {url}")
+
+    def get_range(self, url, start: int, end: int):
+        """
+        Ranged GET that forces identity (no gzip) and validates 206 + Content-Range.
+        Returns a streaming response.
+        """
+        hdrs = {
+            "Range": f"bytes={start}-{end}",
+            "Accept-Encoding": "identity",
+            "User-Agent": self.user_agent,
+        }
+        for a in range(1, self.retries + 1):
+            try:
+                r = session().get(url, headers=hdrs, stream=True, timeout=self.timeout)
+                if r.status_code == 206 and r.headers.get("Content-Range"):
+                    return r
+                r.close()
+                self.logger.warning(
+                    f"RANGE GET {url} [{start}-{end}] -> HTTP {r.status_code} "
+                    f"(Content-Range={r.headers.get('Content-Range')!r}); retrying"
+                )
+            except Exception as e:
+                self.logger.warning(f"RANGE GET {url} attempt {a} failed: {e}")
+            time.sleep(self.backoff ** a)
+        raise RuntimeError(f"Failed RANGE GET {url} bytes={start}-{end}")
+
+    def first_available(self, urls):
+        """(grib_url, idx_url) of the first candidate whose .idx exists, or (None, None)."""
+        for url in urls:
+            idx_url = f"{url}.idx"
+            try:
+                r = self.head(idx_url)
+                if r.status_code == 200:
+                    return url, idx_url
+            except Exception:
+                continue
+        return None, None
+
+    # Planning
+
+    @traced("plan")
+    def plan(self, grib_url: str, patterns, match, outfile: pathlib.Path) -> RangePlan:
+        """
+        Resolves a GRIB URL to a RangePlan: reads its .idx, HEADs the object for
+        its size and selects the messages match(entries, patterns) picks (or the
+        positions picked for this layout before). A plan with no ranges means
+        nothing matched; ValueError when the index or object size is unusable.
+        """
+        idx_url = grib_url + ".idx"
+        self.logger.info(f"Using index -> {idx_url}")
+        entries = parse_idx(self.get(idx_url).text.splitlines())
+        if not entries:
+            raise ValueError(f"Empty/invalid .idx {idx_url}")
+
+        total_size = int(self.head(grib_url).headers.get("Content-Length", "0"))
+        if total_size <= 0:
+            raise ValueError(f"Missing Content-Length on {grib_url}")
+
+        selected = self.selections.select(entries, patterns, match)
+        for e in selected:
+            self.logger.debug(f"  msg={e['msg']:>} off={e['offset']:>10} :: {e['desc']}")
+        ranges = coalesce_ranges(build_ranges(selected, entries, total_size))
+        return RangePlan(grib_url, total_size, ranges, len(selected), outfile)
+
+    def plan_cycle(self, executor, plan_hour, date: str, cycle: str, hours, *args):
+        """
+        Planning phase: runs plan_hour(date, cycle, fxx, *args) for every hour
+        concurrently on executor (the same threads, and so the same sessions,
+        then download). Returns ({fxx: RangePlan or None}, [fxx whose planning failed]).
+        """
+        plans, failed = {}, []
+        futures = {fxx: executor.submit(plan_hour, date, cycle, fxx, *args) for fxx in hours}
+        for fxx, future in futures.items():
+            try:
+                plans[fxx] = future.result()
+            except Exception as e:
+                self.logger.exception(f"{date} t{cycle}z f{fxx:03d} planning failed: {e}")
+                failed.append(fxx)
+        return plans, failed
+
+    def log_plan(self, plans, failed, seconds):
+        """Logs what the download phase will transfer: files, range requests and bytes."""
+        plans = [p for p in plans if p is not None and p.ranges]
+        range_requests = sum(len(p.ranges) for p in plans)
+        messages = sum(p.messages for p in plans)
+        planned = sum(p.nbytes for p in plans)
+        total = sum(p.total_size for p in plans)
+        share = f" ({planned / total:.0%})" if total else ""
+        self.logger.info(
+            f"Plan :: {len(plans)} files, {range_requests} range requests ({messages} messages), "
+            f"{planned / (1024 * 1024):.1f} MB of {total / (1024 * 1024):.1f} MB{share}, planned in {seconds:.1f}s"
+        )
+        if failed:
+            self.logger.warning(
+                f"Plan :: {len(failed)} hours failed planning: {', '.join(f'f{f:03d}' for f in failed)}"
+            )
+        self.logger.info(f"Plan :: {self.selections.summary()}")
+
+    # Download
+
+    @traced("fetch")
+    def download(self, plan: RangePlan):
+        """
+        Pulls a planned object's ranges (one session, ascending offsets) into
+        its compact GRIB; None when the plan selected nothing.
+        """
+        outfile = plan.outfile
+        if not plan.ranges:
+            self.logger.info(f"{outfile.name} : no matching fields")
+            return None
+        outfile.parent.mkdir(parents=True, exist_ok=True)
+        tmp = outfile.with_suffix(outfile.suffix + ".part")
+
+        self.logger.info(f"Writing -> {outfile}")
+        with open(tmp, "wb") as out:
+            for start, end, desc in plan.ranges:
+                self.logger.info(f"  GET {plan.grib_url} bytes={start}-{end} :: {desc}")
+                with span("range_download", bytes=end - start + 1), self.get_range(plan.grib_url, start, end) as r:
+                    expected = end - start + 1
+                    got = 0
+                    for chunk in r.iter_content(chunk_size=1024 * 1024):
+                        if chunk:
+                            out.write(chunk)
+                            got += len(chunk)
+                if got != expected:
+                    raise RuntimeError(
+                        f"Range size mismatch [{start}-{end}] expected {expected}, got {got}"
+                    )
+
+        if outfile.exists():
+            outfile.unlink(missing_ok=True)
+        tmp.replace(outfile)
+        sz_mb = outfile.stat().st_size / (1024 * 1024)
+        self.logger.info(f"Done. {outfile.name} Size = {sz_mb:.1f} MB")
+        return outfile
+
+    def submit_downloads(self, executor, plans):
+        """
+        Download phase: submits the whole plan at once, grouped by host (each
+        thread's session keeps its connection to a host alive). Plans that
+        selected nothing are skipped. Returns the futures in submission order.
+        """
+        ordered = sorted(
+            (plan for plan in plans if plan is not None and plan.ranges),
+            key=lambda plan: (urlsplit(plan.grib_url).netloc, plan.grib_url),
+        )
+        return [executor.submit(self.download, plan) for plan in ordered]
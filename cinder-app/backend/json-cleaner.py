@@ -3,10 +3,17 @@ import glob
 
 def clean_data_directory(directory):
     """
-    Removes all JSON, macOS metadata files, and leftover GRIB2 files.
+    Removes all JSON/NDJSON/MessagePack/Parquet output, macOS metadata files, and leftover GRIB2 files.
     """
     
-    json_files = glob.glob(os.path.join(directory, "*.json"))
+    json_files = (
+        glob.glob(os.path.join(directory, "*.json")) +
+        glob.glob(os.path.join(directory, "*.ndjson"))
+    )
+    binary_files = (
+        glob.glob(os.path.join(directory, "*.msgpack")) +
+        glob.glob(os.path.join(directory, "*.parquet"))
+    )
     
     
     macos_meta_files = [f for f in os.listdir(directory) if f.startswith("._")]
@@ -16,6 +23,7 @@ def clean_data_directory(directory):
 
     all_files = (
         json_files +
+        binary_files +
         [os.path.join(directory, f) for f in macos_meta_files] +
         grib_files
     )
@@ -2,6 +2,7 @@ import fs from "fs";
 import path from "path";
 import { MongoClient } from "mongodb";
 import { fileURLToPath } from "url";
+import { bucketUpserts, docsToBuckets } from "./utils/pointBuckets.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -12,6 +13,23 @@ const client = new MongoClient(process.env.MONGO_URI, {
   useUnifiedTopology: true,
 });
 
+// Expands the dictionary-encoded columnar layout written by output_writers.py.
+function expandColumnar(json) {
+  const { dictionaries = {}, columns = {} } = json;
+  const names = Object.keys(columns);
+  const count = names.length > 0 ? columns[names[0]].length : 0;
+  const rows = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const row = {};
+    for (const col of names) {
+      const v = columns[col][i];
+      row[col] = dictionaries[col] ? dictionaries[col][v] : v;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
 async function run() {
   try {
     
@@ -20,7 +38,7 @@ async function run() {
 
     
     const db = client.db("ModelData");
-    const collection = db.collection("points");
+    const collection = db.collection("point_buckets");
 
     
     const preferred = path.resolve(__dirname, "..", "cinder-app", "backend", "models", "data");
@@ -54,6 +72,9 @@ async function run() {
       return;
     }
 
+    // every file left out of the import, reported together at the end
+    const skipped = [];
+
     for (const file of files) {
       const fullPath = path.join(jsonDir, file);
       console.log(`[IMPORT] Reading ${file} ...`);
@@ -63,6 +84,7 @@ async function run() {
         raw = fs.readFileSync(fullPath, "utf8");
       } catch (err) {
         console.error(`[IMPORT-ERR] Failed to read ${file}:`, err);
+        skipped.push([file, "unreadable"]);
         continue;
       }
 
@@ -71,6 +93,7 @@ async function run() {
         json = JSON.parse(raw);
       } catch (err) {
         console.error(`[IMPORT-ERR] Failed to parse ${file} as JSON:`, err);
+        skipped.push([file, "not valid JSON"]);
         continue;
       }
 
@@ -80,34 +103,51 @@ async function run() {
 
       if (typeof lat === "undefined" || typeof lon === "undefined") {
         console.warn(`[IMPORT] Skipping ${file} — metadata.location.lat/lon missing`);
+        skipped.push([file, "metadata.location.lat/lon missing"]);
+        continue;
+      }
+
+      // buckets are keyed on the grid cell the converter resolved; files written
+      // before outputs carried metadata.cell cannot be bucketed here
+      if (!meta.cell) {
+        console.warn(`[IMPORT] Skipping ${file} — metadata.cell missing (re-run the converter)`);
+        skipped.push([file, "metadata.cell missing, re-run grib_data_to_json.py for this point"]);
         continue;
       }
 
       
-      const docs = json.data.map(item => ({
+      const rows = json.layout === "columnar" ? expandColumnar(json) : json.data;
+      const docs = rows.map(item => ({
         ...item,
         lat,
         lon,
         sitrep: meta.sitrep, 
-        anal_date: meta.anal_date
+        anal_date: meta.anal_date,
+        cell: meta.cell
       }));
 
       if (docs.length > 0) {
         try {
-          const res = await collection.insertMany(docs, { ordered: false });
-          console.log(`[IMPORT] Inserted ${res.insertedCount} docs from ${file}`);
+          // one bucket document per (sitrep, anal_date, grid cell), replaced on re-import
+          const res = await collection.bulkWrite(bucketUpserts(docsToBuckets(docs)), { ordered: false });
+          console.log(`[IMPORT] Stored ${docs.length} rows from ${file} ` +
+            `(${res.upsertedCount} new, ${res.modifiedCount} updated buckets)`);
         } catch (err) {
-          
-          if (err.code === 11000) {
-            console.warn(`[IMPORT-WARN] Duplicate key error while inserting ${file}:`, err.message);
-          } else {
-            console.error(`[IMPORT-ERR] Error inserting docs from ${file}:`, err);
-          }
+          console.error(`[IMPORT-ERR] Error storing buckets from ${file}:`, err);
+          skipped.push([file, "bulk write failed"]);
         }
       } else {
         console.log(`[IMPORT] SKIPPED — no data inside ${file}`);
       }
     }
+
+    if (skipped.length > 0) {
+      console.warn(`[IMPORT] ${skipped.length} of ${files.length} file(s) NOT imported:`);
+      for (const [file, reason] of skipped) {
+        console.warn(`[IMPORT]   ${file}: ${reason}`);
+      }
+      process.exitCode = 1;
+    }
   } catch (err) {
     console.error("[IMPORT-ERR] Fatal:", err);
   } finally {
@@ -1,5 +1,9 @@
 import mongoose from "mongoose";
 
+// One document per output row in ModelData.points. Only the Python
+// MongoSink(layout="rows") writes this collection; the routes and
+// json-to-mongodb.js read and write point_buckets (models/PointBucket.js).
+// Kept so the row layout's indexes stay declared in one place.
 const pointSchema = new mongoose.Schema({
   lat: Number,
   lon: Number,
@@ -8,7 +12,37 @@ const pointSchema = new mongoose.Schema({
   value: Number,
   name: String,
   threshold: String,
+  sitrep: String,
+  anal_date: String,
+  // grid cell the requested lat/lon resolved to (metadata.cell of the output)
+  cell: {
+    grid_id: String,
+    i: Number,
+    j: Number,
+    lat: Number,
+    lon: Number,
+    radius_m: Number
+  }
 });
 
+// Same key the Python MongoSink upserts on (grib_to_json/output_sinks.py)
+pointSchema.index(
+  {
+    sitrep: 1,
+    anal_date: 1,
+    lat: 1,
+    lon: 1,
+    name: 1,
+    threshold: 1,
+    forecast_time: 1,
+    step_length: 1
+  },
+  { unique: true, name: "point_row_key" }
+);
+pointSchema.index(
+  { sitrep: 1, anal_date: 1, "cell.grid_id": 1, "cell.i": 1, "cell.j": 1 },
+  { name: "point_cell" }
+);
+
 const Point = mongoose.model("Point", pointSchema);
 export default Point;
\ No newline at end of file
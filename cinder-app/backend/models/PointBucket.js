@@ -0,0 +1,41 @@
+import mongoose from "mongoose";
+
+// One document per (sitrep, anal_date, grid_id, i, j): a model cycle's whole
+// output for one grid cell as parallel arrays, written by the Python MongoSink
+// (grib_to_json/output_sinks.py, output_to_bucket). thresholds is the
+// dictionary of distinct { threshold, name } pairs that threshold_id indexes.
+// lat/lon and location are the cell center; any point within radius_m of it
+// resolved to this cell.
+const pointBucketSchema = new mongoose.Schema(
+  {
+    sitrep: String,
+    anal_date: String,
+    grid_id: String,
+    i: Number,
+    j: Number,
+    lat: Number,
+    lon: Number,
+    radius_m: Number,
+    location: {
+      type: { type: String, enum: ["Point"] },
+      coordinates: [Number]
+    },
+    thresholds: [{ _id: false, threshold: String, name: String }],
+    threshold_id: [Number],
+    forecast_time: [Number],
+    step_length: [Number],
+    value: [Number],
+    count: Number
+  },
+  { collection: "point_buckets" }
+);
+
+// Same keys the Python MongoSink creates
+pointBucketSchema.index(
+  { sitrep: 1, anal_date: 1, grid_id: 1, i: 1, j: 1 },
+  { unique: true, name: "bucket_cell" }
+);
+pointBucketSchema.index({ location: "2dsphere" }, { name: "bucket_geo" });
+
+const PointBucket = mongoose.model("PointBucket", pointBucketSchema);
+export default PointBucket;
@@ -1,7 +1,9 @@
 import express from "express";
-import Point from "../models/Point.js";
+import PointBucket from "../models/PointBucket.js";
 import { runPython } from "../utils/runPython.js";
-import { spawn } from "child_process";
+import { extractPoint, outputsToDocs } from "../utils/extractService.js";
+import { bucketUpserts, docsToBuckets, expandBucket } from "../utils/pointBuckets.js";
+import fs from "fs";
 import path from "path";
 import { updateProgress } from "./progress.js";
 import { fileURLToPath } from "url";
@@ -12,6 +14,75 @@ const __dirname = path.dirname(__filename);
 
 const router = express.Router();
 
+// Requested points, read by grib_to_json/warm_points.py to pick hot points
+const QUERY_LOG = path.resolve(__dirname, "../query_log.csv");
+
+// One bucket per (sitrep, anal_date, grid cell); replacing on that key makes
+// a concurrent request's identical write harmless.
+async function upsertBuckets(docs) {
+  const buckets = docsToBuckets(docs);
+  if (buckets.length > 0) {
+    await PointBucket.bulkWrite(bucketUpserts(buckets), { ordered: false });
+  }
+  return buckets.length;
+}
+
+// Upper bound on any model's cell radius (half-diagonal), for the index seek
+const MAX_CELL_RADIUS_M = 5000;
+// The converter picks the nearest grid point in lat/lon degrees, which can sit
+// slightly past the geodesic half-diagonal; accept a little beyond radius_m.
+const CELL_RADIUS_SLACK = 1.25;
+
+// Every stored cell containing the point, one per (sitrep, anal_date, grid),
+// expanded to rows within the requested forecast hours and ordered by sitrep,
+// name and forecast time. $geoNear seeks the 2dsphere index on the cell
+// centers, so a point anywhere inside a cached cell is a hit.
+async function findPoints(LAT, LON, range) {
+  const buckets = await PointBucket.aggregate([
+    {
+      $geoNear: {
+        near: { type: "Point", coordinates: [LON, LAT] },
+        distanceField: "distance_m",
+        maxDistance: MAX_CELL_RADIUS_M,
+        spherical: true
+      }
+    },
+    { $match: { $expr: { $lte: ["$distance_m", { $multiply: ["$radius_m", CELL_RADIUS_SLACK] }] } } },
+    // results are nearest first, so $first keeps the closest cell of each grid
+    {
+      $group: {
+        _id: { sitrep: "$sitrep", anal_date: "$anal_date", grid_id: "$grid_id" },
+        bucket: { $first: "$$ROOT" }
+      }
+    },
+    { $replaceRoot: { newRoot: "$bucket" } },
+    { $sort: { sitrep: 1, anal_date: 1 } }
+  ]);
+  return buckets.flatMap((bucket) => expandBucket(bucket, range));
+}
+
+// Fallback miss path: spawn the converter in streaming mode (progress comes
+// from its progress events) and store the rows as buckets once it finishes.
+async function runScriptPipeline(LAT, LON) {
+  const gribScript = path.resolve(
+    process.cwd(),
+    "../../grib_to_json/grib_data_to_json.py"
+  );
+
+  const docs = [];
+  await runPython(
+    gribScript,
+    [LAT, LON, "--sink", "stream"],
+    (p) => updateProgress(p),
+    (event) => {
+      if (event.type === "rows") docs.push(...event.docs);
+    }
+  );
+  const buckets = await upsertBuckets(docs);
+
+  console.log(`GRIB→MongoDB streaming complete (${docs.length} rows, ${buckets} buckets)`);
+}
+
 router.get("/", async (req, res) => {
   try {
     const { lat, lon, fh, fh_min, fh_max } = req.query;
@@ -23,66 +94,44 @@ router.get("/", async (req, res) => {
     const LAT = Number(lat);
     const LON = Number(lon);
 
-    const query = { lat: LAT, lon: LON };
+    fs.appendFile(QUERY_LOG, `${new Date().toISOString()},${LAT},${LON}\n`, (err) => {
+      if (err) console.error("Failed to append query log:", err.message);
+    });
 
+    let range = {};
     if (fh_min && fh_max) {
-      query.forecast_time = { $gte: Number(fh_min), $lte: Number(fh_max) };
+      range = { fhMin: Number(fh_min), fhMax: Number(fh_max) };
     } else if (fh) {
-      query.forecast_time = Number(fh);
+      range = { fhMin: Number(fh), fhMax: Number(fh) };
     }
 
-    console.log("QUERY ->", query);
-    let points = await Point.find(query).sort({
-      sitrep: 1,
-      name: 1,
-      forecast_time: 1
-    });
+    console.log("QUERY ->", { lat: LAT, lon: LON, ...range });
+    let points = await findPoints(LAT, LON, range);
 
     if (points.length > 0) {
       console.log("DB HIT -> returning cached data");
       return res.json(points);
     }
 
-    console.log("DB MISS -> running GRIB -> JSON script");
-
-    const gribScript = path.resolve(
-      process.cwd(),
-      "../../grib_to_json/grib_data_to_json.py"
-    );
+    console.log("DB MISS -> asking GRIB extraction service");
 
     updateProgress(0);
-    await runPython(gribScript, [LAT, LON], (p) => updateProgress(p));
+    try {
+      const result = await extractPoint(LAT, LON, { sink: "mongo" });
+      if (result.sink === "mongo") {
+        console.log("Service upserted buckets directly:", result.rows);
+      } else {
+        const docs = outputsToDocs(result.models || {});
+        await upsertBuckets(docs);
+        console.log(`Service extraction complete (${docs.length} rows)`);
+      }
+    } catch (err) {
+      console.warn("GRIB service unavailable, falling back to scripts:", err.message);
+      await runScriptPipeline(LAT, LON);
+    }
     updateProgress(100);
 
-    console.log("GRIB→JSON complete");
-
-    const importScript = path.resolve(__dirname, "../json-to-mongodb.js");
-
-    console.log("Running JSON→MongoDB importer...");
-
-    await new Promise((resolve, reject) => {
-      const proc = spawn("node", [importScript]);
-
-      proc.stdout.on("data", (d) => console.log(`[IMPORT] ${d}`));
-      proc.stderr.on("data", (d) => console.error(`[IMPORT-ERR] ${d}`));
-
-      proc.on("close", (code) => {
-        if (code === 0) resolve();
-        else reject(new Error(`json-to-mongodb.js exited with code ${code}`));
-      });
-    });
-
-    console.log("Import complete.");
-
-    const scriptPath = path.resolve(__dirname, "../json-cleaner.py");
-    await runPython(scriptPath);
-    console.log("Cleaned Data Directory");
-
-    points = await Point.find(query).sort({
-      sitrep: 1,
-      name: 1,
-      forecast_time: 1
-    });
+    points = await findPoints(LAT, LON, range);
 
     if (!points || points.length === 0) {
       console.error("Still no DB results after scripts.");
@@ -4,6 +4,7 @@ import cors from "cors";
 import dataRouter from "./routes/data.js";
 import connectDB from "./config/db.js";
 import { progressRouter } from "./routes/progress.js";
+import { startExtractService } from "./utils/extractService.js";
 
 dotenv.config();
 const app = express();
@@ -28,6 +29,9 @@ app.get("/", (req, res) => {
 const startServer = async () => {
   try {
     await connectDB();
+    if (process.env.START_GRIB_SERVICE !== "false") {
+      startExtractService();
+    }
     const PORT = process.env.PORT || 5050;
     app.listen(PORT, () => console.log(`Server running on port ${PORT}`));
   } catch (error) {
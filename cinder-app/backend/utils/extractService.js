@@ -0,0 +1,65 @@
+import { spawn } from "child_process";
+import path from "path";
+
+const SERVICE_HOST = process.env.GRIB_SERVICE_HOST || "127.0.0.1";
+const SERVICE_PORT = process.env.GRIB_SERVICE_PORT || "5051";
+const SERVICE_URL = `http://${SERVICE_HOST}:${SERVICE_PORT}`;
+
+let serviceProc = null;
+
+// Starts the resident Python extraction service (grib_service.py) once.
+export function startExtractService() {
+  if (serviceProc) return serviceProc;
+
+  const serviceScript = path.resolve(
+    process.cwd(),
+    "../../grib_to_json/grib_service.py"
+  );
+
+  serviceProc = spawn(
+    "python3",
+    [serviceScript, "--host", SERVICE_HOST, "--port", SERVICE_PORT],
+    { cwd: path.dirname(serviceScript), stdio: ["ignore", "pipe", "pipe"] }
+  );
+
+  serviceProc.stdout.on("data", (d) => console.log("[GRIB-SERVICE]", d.toString()));
+  serviceProc.stderr.on("data", (d) => console.log("[GRIB-SERVICE]", d.toString()));
+  serviceProc.on("close", (code) => {
+    console.log(`[GRIB-SERVICE] exited with code ${code}`);
+    serviceProc = null;
+  });
+
+  return serviceProc;
+}
+
+// Asks the resident service to extract every model for one point.
+// With sink "mongo" the service upserts rows itself and resolves to
+// { sink: "mongo", rows: { model: count } }; otherwise (or if the service
+// has no Mongo access) it resolves to { models: { model: { metadata, data } } }.
+export async function extractPoint(lat, lon, { sink } = {}) {
+  const sinkParam = sink ? `&sink=${sink}` : "";
+  const res = await fetch(`${SERVICE_URL}/extract?lat=${lat}&lon=${lon}${sinkParam}`);
+  if (!res.ok) {
+    throw new Error(`GRIB service returned HTTP ${res.status}`);
+  }
+  return res.json();
+}
+
+// Flattens service output into Point documents (same shape json-to-mongodb.js builds).
+export function outputsToDocs(outputs) {
+  const docs = [];
+  for (const output of Object.values(outputs)) {
+    const meta = output.metadata || {};
+    for (const item of output.data || []) {
+      docs.push({
+        ...item,
+        lat: meta.location?.lat,
+        lon: meta.location?.lon,
+        sitrep: meta.sitrep,
+        anal_date: meta.anal_date,
+        ...(meta.cell ? { cell: meta.cell } : {})
+      });
+    }
+  }
+  return docs;
+}
@@ -0,0 +1,90 @@
+// Conversions between Point-shaped rows and bucket documents
+// (models/PointBucket.js); mirrors output_to_bucket / bucket_to_docs in
+// grib_to_json/output_sinks.py.
+
+const BUCKET_KEY = ["sitrep", "anal_date", "grid_id", "i", "j"];
+const CELL_FIELDS = ["grid_id", "i", "j", "lat", "lon", "radius_m"];
+
+// Groups rows into one bucket per (sitrep, anal_date, grid cell), ordered by
+// name then forecast time. Rows without a resolved cell are dropped.
+export function docsToBuckets(docs) {
+  const groups = new Map();
+  for (const doc of docs) {
+    if (!doc.cell) continue;
+    const key = [doc.sitrep, doc.anal_date, doc.cell.grid_id, doc.cell.i, doc.cell.j].join("|");
+    if (!groups.has(key)) groups.set(key, []);
+    groups.get(key).push(doc);
+  }
+
+  const buckets = [];
+  for (const rows of groups.values()) {
+    rows.sort((a, b) =>
+      a.name.localeCompare(b.name) ||
+      a.forecast_time - b.forecast_time ||
+      String(a.threshold).localeCompare(String(b.threshold))
+    );
+    const { cell } = rows[0];
+    const bucket = {
+      sitrep: rows[0].sitrep,
+      anal_date: rows[0].anal_date,
+      ...Object.fromEntries(CELL_FIELDS.map((k) => [k, cell[k]])),
+      location: { type: "Point", coordinates: [cell.lon, cell.lat] },
+      thresholds: [],
+      threshold_id: [],
+      forecast_time: [],
+      step_length: [],
+      value: [],
+      count: rows.length
+    };
+    const ids = new Map();
+    for (const row of rows) {
+      const pair = `${row.threshold}\u0000${row.name}`;
+      if (!ids.has(pair)) {
+        ids.set(pair, ids.size);
+        bucket.thresholds.push({ threshold: row.threshold, name: row.name });
+      }
+      bucket.threshold_id.push(ids.get(pair));
+      bucket.forecast_time.push(row.forecast_time);
+      bucket.step_length.push(row.step_length);
+      bucket.value.push(row.value);
+    }
+    buckets.push(bucket);
+  }
+  return buckets;
+}
+
+// Expands a bucket back into Point-shaped rows (lat/lon = cell center),
+// keeping forecast times within [fhMin, fhMax] when given.
+export function expandBucket(bucket, { fhMin = -Infinity, fhMax = Infinity } = {}) {
+  const cell = Object.fromEntries(CELL_FIELDS.map((k) => [k, bucket[k]]));
+  const rows = [];
+  for (let i = 0; i < bucket.forecast_time.length; i++) {
+    const forecastTime = bucket.forecast_time[i];
+    if (forecastTime < fhMin || forecastTime > fhMax) continue;
+    const { threshold, name } = bucket.thresholds[bucket.threshold_id[i]];
+    rows.push({
+      lat: bucket.lat,
+      lon: bucket.lon,
+      step_length: bucket.step_length[i],
+      forecast_time: forecastTime,
+      value: bucket.value[i],
+      name,
+      threshold,
+      sitrep: bucket.sitrep,
+      anal_date: bucket.anal_date,
+      cell
+    });
+  }
+  return rows;
+}
+
+// replaceOne upserts for a collection's bulkWrite (mongoose model or driver).
+export function bucketUpserts(buckets) {
+  return buckets.map((bucket) => ({
+    replaceOne: {
+      filter: Object.fromEntries(BUCKET_KEY.map((k) => [k, bucket[k]])),
+      replacement: bucket,
+      upsert: true
+    }
+  }));
+}
@@ -1,6 +1,11 @@
 import { spawn } from "child_process";
 
-export function runPython(scriptPath, args = []) {
+// Runs a Python script and resolves to its stdout.
+// Scripts run with `--sink stream` print one JSON event per line
+// ({ type: "progress" | "rows" | "done", ... }); those lines are parsed as
+// they arrive: progress events go to onProgress(percent, event), every event
+// to onEvent(event). Other output is logged as before.
+export function runPython(scriptPath, args = [], onProgress = null, onEvent = null) {
   return new Promise((resolve, reject) => {
     const py = spawn("python3", [scriptPath, ...args], {
       stdio: ["ignore", "pipe", "pipe"]
@@ -8,10 +13,33 @@ export function runPython(scriptPath, args = []) {
 
     let stdoutData = "";
     let stderrData = "";
+    let pending = "";
+
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      let event = null;
+      if (line.startsWith("{")) {
+        try {
+          event = JSON.parse(line);
+        } catch {
+          event = null;
+        }
+      }
+      if (!event || !event.type) {
+        console.log("[PYTHON]", line);
+        return;
+      }
+      if (event.type === "progress" && onProgress) onProgress(event.percent, event);
+      if (onEvent) onEvent(event);
+    };
 
     py.stdout.on("data", (data) => {
-      stdoutData += data.toString();
-      console.log("[PYTHON]", data.toString());
+      const text = data.toString();
+      stdoutData += text;
+      pending += text;
+      const lines = pending.split("\n");
+      pending = lines.pop();
+      lines.forEach(handleLine);
     });
 
     py.stderr.on("data", (data) => {
@@ -20,6 +48,7 @@ export function runPython(scriptPath, args = []) {
     });
 
     py.on("close", (code) => {
+      handleLine(pending);
       if (code !== 0) {
         return reject(
           new Error(`Python script exited with code ${code}\n${stderrData}`)
@@ -29,4 +58,4 @@ export function runPython(scriptPath, args = []) {
       resolve(stdoutData);
     });
   });
-}
\ No newline at end of file
+}
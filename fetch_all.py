@@ -1,24 +1,90 @@
+import logging
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# stage timings (grib_to_json/tracing.py; off unless CINDER_TRACE is set)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "grib_to_json"))
+from tracing import finish_run
+
 import Fetch_Scripts.get_nbm as nbm
 import Fetch_Scripts.get_href as href
 import Fetch_Scripts.get_refs as refs
-from concurrent.futures import ThreadPoolExecutor
 
 MAX_THREADS = 10
+
+GRIB_DIR = Path(__file__).resolve().parent / "grib_to_json"
+WARM_SINK = "mongo"
+
+logger = logging.getLogger("fetch_all")
+
+# Post-fetch stages, run in order for each model: (label, script, extra args, labels of the
+# stages whose output it needs). A failed stage skips every stage that depends on it.
+# Exceedance runs before the point warm-up so its extractions include the derived
+# products when they exist; nothing depends on it, so its failure blocks no stage.
+WARM_STAGES = [
+    ("Time-series store", GRIB_DIR / "timeseries_store.py", [], ()),
+    ("Range tables", GRIB_DIR / "range_queries.py", [], ("Time-series store",)),
+    ("Exceedance products", GRIB_DIR / "exceedance.py", [], ()),
+    ("Warm-up", GRIB_DIR / "warm_points.py", ["--sink", WARM_SINK], ()),
+    ("Tile warm-up", GRIB_DIR / "tile_renderer.py", [], ()),
+]
+
+# Warm-ups each use every core, so run them one at a time
+_warm_lock = threading.Lock()
+
+
+def warm_model(model):
+    """
+    Runs every post-fetch stage for one model: the time-major store and its
+    range tables, the exceedance products, the hot-point list and the low-zoom map tiles
+    (see WARM_STAGES). Returns the labels of the stages that failed or were skipped.
+    """
+    not_done = []
+    with _warm_lock:
+        for label, script, extra_args, needs in WARM_STAGES:
+            missing = [need for need in needs if need in not_done]
+            if missing:
+                logger.warning(f"{label} for {model} skipped: {', '.join(missing)} did not complete")
+                not_done.append(label)
+                continue
+            try:
+                subprocess.run(
+                    [sys.executable, str(script), "--model", model, *extra_args],
+                    cwd=GRIB_DIR,
+                    check=True
+                )
+            except Exception:
+                logger.exception(f"{label} for {model} failed")
+                not_done.append(label)
+    return not_done
+
+
+def fetch_then_warm(fetch_main, model):
+    """Runs one model's fetch script, then its warm-up stage."""
+    fetch_main()
+    warm_model(model)
+
+
 def fetch_all():
     """Runs all model fetch scripts (NBM, HREF, REFS) and multithreads the processes"""
 
-    nbm.main()
-    href.main()
-    refs.main()
+    fetch_then_warm(nbm.main, "NBM")
+    fetch_then_warm(href.main, "HREF")
+    fetch_then_warm(refs.main, "REFS")
 
     
 
 if __name__ == "__main__":
    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
         futures = [
-            executor.submit(nbm.main),
-            executor.submit(href.main),
-            executor.submit(refs.main)
+            executor.submit(fetch_then_warm, nbm.main, "NBM"),
+            executor.submit(fetch_then_warm, href.main, "HREF"),
+            executor.submit(fetch_then_warm, refs.main, "REFS")
         ]
         for future in futures:
-            future.result()
\ No newline at end of file
+            future.result()
+   # one trace covering every fetch and warm-up stage (when CINDER_TRACE is set)
+   finish_run("fetch_all")
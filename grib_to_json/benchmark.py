@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# benchmark.py (decode/extract/write benchmarks on synthetic GRIB2 files)
+"""
+Times the conversion hot paths on synthetic files from synthetic_grib.py at
+several grid sizes, and compares against a stored baseline:
+
+    process_single_file   one HREF forecast hour, one point
+    make_json_file        a folder of HREF hours on a fresh pool (manifest cleared per run)
+    get_one_forecast      grib_visualizer's catalog lookup + decode
+    write_<format>        every available output_writers format
+
+Sizes divide the operational grid dimensions (see SIZES); data is generated
+once into bench_data/ and reused.
+
+    python benchmark.py [--size small --size medium] [--repeat 5]
+    python benchmark.py --save-baseline       # store results in benchmark_baseline.json
+    python benchmark.py --compare             # exit 1 if any case is slower than baseline by > --tolerance
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import grib_data_to_json
+from conversion_manifest import ConversionManifest
+from grib_data_to_json import DESIRED_FORECAST_TYPES, make_json_file, process_single_file
+from output_writers import benchmark_writers
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BENCH_DIR = SCRIPT_DIR / "bench_data"
+BASELINE_PATH = SCRIPT_DIR / "benchmark_baseline.json"
+
+# grid scale divisor per size (1 = operational 1799 x 1059 HREF grid)
+SIZES = {"small": 16, "medium": 4, "full": 1}
+HOURS = (1, 6)
+POINT = (38.9, -97.5)
+ANAL_DATE = datetime(2025, 10, 16, 12)  # synthetic_grib.ANAL_DATE / CYCLE
+
+sys.path.insert(0, str(SCRIPT_DIR.parent))
+from grib_visualizer import get_one_forecast  # noqa: E402
+
+
+def bench_folder(size):
+    """Returns the synthetic HREF folder for size, generating it on first use."""
+    folder = BENCH_DIR / f"href_{size}"
+    if len(list(folder.glob("*.grib2"))) < HOURS[1] - HOURS[0] + 1:
+        # eccodes and pygrib don't share a process well; generate in a child
+        subprocess.run(
+            [sys.executable, str(SCRIPT_DIR / "synthetic_grib.py"), str(folder), "--model", "HREF",
+             "--hours", str(HOURS[0]), str(HOURS[1]), "--scale", str(SIZES[size])],
+            check=True
+        )
+    return folder
+
+
+def timed(fn, repeat, setup=None):
+    """Runs fn repeat times (setup before each, untimed); returns the durations in seconds."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def run_size(size, repeat):
+    """Returns {case: {"min_ms", "median_ms"}} for one size."""
+    folder = bench_folder(size)
+    files = sorted(folder.glob("*.grib2"))
+    keywords_lower = [k.lower() for k in DESIRED_FORECAST_TYPES]
+    lat, lon = POINT
+    results = {}
+
+    def record(case, times):
+        results[case] = {"min_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000}
+
+    record("process_single_file", timed(lambda: process_single_file(str(files[0]), lat, lon, keywords_lower), repeat))
+
+    # make_json_file writes into the backend data folder; writing is timed separately below
+    real_writer = grib_data_to_json.write_json_output
+    grib_data_to_json.write_json_output = lambda *args: None
+    manifest_dir = ConversionManifest(folder).dir
+    output = {}
+    try:
+        record("make_json_file", timed(
+            lambda: output.update(data=make_json_file(folder, lat, lon, DESIRED_FORECAST_TYPES)),
+            repeat, setup=lambda: shutil.rmtree(manifest_dir, ignore_errors=True)
+        ))
+    finally:
+        grib_data_to_json.write_json_output = real_writer
+        shutil.rmtree(manifest_dir, ignore_errors=True)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        record("get_one_forecast", timed(
+            lambda: get_one_forecast(folder, 12.7, "tp", ANAL_DATE + timedelta(hours=1), 1, lat, lon), repeat
+        ))
+
+    if output.get("data"):
+        for r in benchmark_writers(output["data"], repeat=repeat):
+            results[f"write_{r['format']}"] = {"min_ms": r["write_ms"], "median_ms": r["write_ms"]}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints results next to baseline; returns the cases slower than baseline * (1 + tolerance)."""
+    regressions = []
+    print(f"{'case':<36} {'median ms':>10} {'baseline':>10} {'ratio':>7}")
+    for case, r in results.items():
+        base = baseline.get("results", {}).get(case)
+        if base is None:
+            print(f"{case:<36} {r['median_ms']:>10.2f} {'-':>10} {'-':>7}")
+            continue
+        ratio = r["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        flag = "  <-- slower" if ratio > 1 + tolerance else ""
+        print(f"{case:<36} {r['median_ms']:>10.2f} {base['median_ms']:>10.2f} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append(case)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark GRIB decode/extract/write on synthetic files")
+    parser.add_argument("--size", choices=list(SIZES), action="append",
+                        help="grid size(s) to run (default: small and medium)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_PATH.name}")
+    parser.add_argument("--compare", action="store_true", help=f"compare with {BASELINE_PATH.name}")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before --compare fails")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.size or ["small", "medium"]:
+        for case, r in run_size(size, args.repeat).items():
+            results[f"{size}/{case}"] = r
+
+    if args.compare:
+        try:
+            baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            sys.exit(f"No baseline at {BASELINE_PATH}; run with --save-baseline first")
+        print(f"Baseline from {baseline.get('created')} on {baseline.get('machine')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} case(s) slower than baseline: {', '.join(regressions)}")
+    else:
+        print(f"{'case':<36} {'min ms':>10} {'median ms':>10}")
+        for case, r in results.items():
+            print(f"{case:<36} {r['min_ms']:>10.2f} {r['median_ms']:>10.2f}")
+
+    if args.save_baseline:
+        baseline = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "machine": f"{platform.node()} {platform.processor() or platform.machine()} x{os.cpu_count()}",
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {BASELINE_PATH}")
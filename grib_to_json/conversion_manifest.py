@@ -0,0 +1,141 @@
+"""
+Conversion manifest for incremental GRIB -> JSON runs.
+
+For every source file the manifest keeps its size, mtime and a content
+fingerprint, and for every converted point the rows that file produced.
+A run then only reprocesses files that are new or whose fingerprint changed
+and merges them with the cached rows of the rest, so a partial refetch
+(say f47 and f48) costs two file extractions instead of the whole folder.
+
+Layout under manifests/<folder tag>/:
+
+    _files.json        {path: [size, mtime_ns, fingerprint]}
+    <lat>,<lon>.json   {path: {"fingerprint", "rows", "anal_date", "fname"}}
+
+The fingerprint hashes the file size plus its first and last FINGERPRINT_BYTES
+(GRIB headers carry the reference time and product definition), so it stays
+cheap for multi-hundred-MB REFS files; it is recomputed only when size or
+mtime changes.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+MANIFEST_DIR = SCRIPT_DIR / "manifests"
+FINGERPRINT_BYTES = 1024 * 1024
+MAX_MANIFEST_AGE = 2 * 24 * 3600
+
+_lock = threading.Lock()
+
+
+def fingerprint(path, size):
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > 2 * FINGERPRINT_BYTES:
+            f.seek(-FINGERPRINT_BYTES, 2)
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, obj):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{threading.get_ident()}.part")
+    tmp.write_text(json.dumps(obj), encoding="utf-8")
+    tmp.replace(path)
+
+
+class ConversionManifest:
+    """Per-folder manifest: file fingerprints plus cached per-point rows."""
+
+    def __init__(self, folder, manifest_dir=None):
+        folder = Path(folder).resolve()
+        self.folder = folder
+        self.dir = Path(manifest_dir or MANIFEST_DIR) / f"{folder.parent.name}_{folder.name}"
+
+    def fingerprints(self, file_list):
+        """Returns {path: fingerprint} for file_list, rehashing only files whose size/mtime changed."""
+        index_path = self.dir / "_files.json"
+        with _lock:
+            saved = _read_json(index_path)
+            current = {}
+            changed = False
+            for file_path in map(str, file_list):
+                try:
+                    stat = Path(file_path).stat()
+                except OSError:
+                    continue
+                entry = saved.get(file_path)
+                if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+                    entry = [stat.st_size, stat.st_mtime_ns, fingerprint(file_path, stat.st_size)]
+                    changed = True
+                current[file_path] = entry
+            if changed or current.keys() != saved.keys():
+                _write_json(index_path, current)
+                self._prune()
+        return {path: entry[2] for path, entry in current.items()}
+
+    def version(self, file_list):
+        """One digest of the folder's current contents (changes whenever any file does)."""
+        prints = self.fingerprints(file_list)
+        return hashlib.blake2b(json.dumps(sorted(prints.items())).encode(), digest_size=8).hexdigest()
+
+    def _point_path(self, lat, lon):
+        return self.dir / f"{float(lat):.5f},{float(lon):.5f}.json"
+
+    def plan(self, file_list, lat, lon):
+        """
+        Splits file_list into (cached_results, todo_files) for one point.
+        cached_results are (rows, anal_date, fname_lower) tuples in the same
+        shape process_single_file returns.
+        """
+        prints = self.fingerprints(file_list)
+        saved = _read_json(self._point_path(lat, lon))
+        cached, todo = [], []
+        for file_path in map(str, file_list):
+            entry = saved.get(file_path)
+            if entry is not None and entry["fingerprint"] == prints.get(file_path):
+                anal_date = datetime.fromisoformat(entry["anal_date"]) if entry["anal_date"] else None
+                cached.append(([tuple(row) for row in entry["rows"]], anal_date, entry["fname"]))
+            else:
+                todo.append(file_path)
+        return cached, todo
+
+    def record(self, lat, lon, file_results):
+        """Stores [(file_path, (rows, anal_date, fname_lower))] for one point, dropping vanished files."""
+        path = self._point_path(lat, lon)
+        with _lock:
+            prints = {p: entry[2] for p, entry in _read_json(self.dir / "_files.json").items()}
+            saved = {p: e for p, e in _read_json(path).items() if p in prints}
+            for file_path, (rows, anal_date, fname_lower) in file_results:
+                file_path = str(file_path)
+                if file_path not in prints:
+                    continue
+                saved[file_path] = {
+                    "fingerprint": prints[file_path],
+                    "rows": [list(row) for row in rows],
+                    "anal_date": anal_date.isoformat() if anal_date else None,
+                    "fname": fname_lower,
+                }
+            _write_json(path, saved)
+
+    def _prune(self):
+        # caller holds _lock; drop point manifests nobody has touched for a while
+        cutoff = time.time() - MAX_MANIFEST_AGE
+        for path in self.dir.glob("*,*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
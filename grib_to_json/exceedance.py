@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# exceedance.py (grid-wide any-hour exceedance products)
+"""
+Generalizes prob_test.range_exceedance_probability to whole grids:
+
+    P(any hour exceeds) = 1 - prod(1 - p_h) = 1 - exp(sum(log1p(-p_h)))
+
+The sum is kept in log-space (float64) so long windows of small hourly
+probabilities don't underflow, and it is accumulated while streaming over
+the forecast-hour files in order, so memory is one running field per
+product instead of one field per hour. A window (start, end] is the running
+sum at `end` minus a snapshot taken at `start`.
+
+Results are written as GRIB messages (the hourly message with its values,
+forecastTime and lengthOfTimeRange replaced) to <model>_data/<model>_derived/,
+one file per window end hour. The point path (grib_data_to_json) and the
+tile/bbox paths read that folder like any download folder.
+
+    python exceedance.py [--model HREF] [--window 0:24 ...]
+"""
+import argparse
+import logging
+import re
+import shutil
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+from grib_data_to_json import (
+    DERIVED_FOLDERS,
+    DESIRED_FORECAST_TYPES,
+    MODEL_FOLDERS,
+    is_interesting_message,
+    list_grib_files,
+    open_grib,
+)
+from grib_metadata import describe_message
+from timeseries_store import forecast_end_of
+
+DERIVED_TAG = "derived"
+DEFAULT_WINDOWS = [(0, 6), (0, 12), (0, 24), (0, 48)]
+BASE_LENGTH = 1
+MAX_PROBABILITY = 1.0 - 1e-7
+
+logger = logging.getLogger("exceedance")
+
+
+def any_hour_exceedance(probs, axis=0):
+    """
+    Vectorized range_exceedance_probability: probs are fractions (0-1) with
+    the hours along `axis`; returns the probability that at least one hour
+    exceeds the threshold.
+    """
+    probs = np.clip(np.asarray(probs, dtype=np.float64), 0.0, MAX_PROBABILITY)
+    return -np.expm1(np.log1p(-probs).sum(axis=axis))
+
+
+class ExceedanceAccumulator:
+    """
+    Running log(1 - p) sum of one product, with snapshots at window starts.
+    `hours` counts forecast hours, each of which may be added only once.
+    """
+
+    def __init__(self):
+        self.log_none = None
+        self.hours = 0
+        self.last_hour = None
+        self.snapshots = {}
+
+    def add(self, percent, hour):
+        if hour == self.last_hour:
+            raise ValueError(f"forecast hour {hour} already added to this product")
+        self.last_hour = hour
+        p = np.clip(np.asarray(percent, dtype=np.float64) / 100.0, 0.0, MAX_PROBABILITY)
+        if self.log_none is None:
+            self.log_none = np.log1p(-p)
+        else:
+            self.log_none += np.log1p(-p)
+        self.hours += 1
+
+    def snapshot(self, hour):
+        self.snapshots[hour] = (self.log_none.copy() if self.log_none is not None else None, self.hours)
+
+    def window_percent(self, start):
+        """Returns (exceedance % since the snapshot at `start`, hours covered), or (None, 0)."""
+        base, base_hours = self.snapshots.get(start, (None, 0))
+        if self.log_none is None:
+            return None, 0
+        log_none = self.log_none if base is None else self.log_none - base
+        return (-np.expm1(log_none) * 100.0).astype(np.float32), self.hours - base_hours
+
+
+def derived_file_name(source_name, end_hour):
+    """
+    Name of the derived file for windows ending at end_hour. Keeps the source
+    file's model/date/cycle prefix ('href.t12z', 'rrfs.20251016t12z',
+    'nbm_t12z') so detect_model_cycle reads it like the download.
+    """
+    name = Path(source_name).name.lower()
+    m = re.match(r"(.*?t\d{2}z)", name)
+    prefix = m.group(1) if m else name.split(".")[0]
+    return f"{prefix}.{DERIVED_TAG}.f{end_hour:03d}.grib2"
+
+
+def set_window(grb, start, end):
+    """
+    Rewrites a message's time keys to describe the window (start, end].
+    Raises if the message has no end-of-interval keys to rewrite.
+    """
+    grb["forecastTime"] = start
+    grb["lengthOfTimeRange"] = end - start
+    end_time = grb.analDate + timedelta(hours=end)
+    grb["yearOfEndOfOverallTimeInterval"] = end_time.year
+    grb["monthOfEndOfOverallTimeInterval"] = end_time.month
+    grb["dayOfEndOfOverallTimeInterval"] = end_time.day
+    grb["hourOfEndOfOverallTimeInterval"] = end_time.hour
+    grb["minuteOfEndOfOverallTimeInterval"] = 0
+    grb["secondOfEndOfOverallTimeInterval"] = 0
+
+
+def build_exceedance(model, windows=DEFAULT_WINDOWS, keywords=DESIRED_FORECAST_TYPES, base_length=BASE_LENGTH):
+    """
+    Streams a model's hour files once and writes every (product, window)
+    exceedance field to the model's derived folder. Products are the
+    probability messages covering `base_length` hours, keyed like the
+    time-series store's series: (threshold text, name, n-th occurrence in the
+    file), so repeated messages in one file stay separate products. Returns
+    the number of derived messages written.
+    """
+    t0 = time.time()
+    keywords_lower = [k.lower() for k in keywords]
+    files = sorted((f for f in list_grib_files(MODEL_FOLDERS[model]) if forecast_end_of(f) is not None),
+                   key=forecast_end_of)
+    windows = sorted({(int(s), int(e)) for s, e in windows if e > s})
+    starts = {s for s, _ in windows}
+    if not files or not windows:
+        return 0
+
+    out_dir = Path(DERIVED_FOLDERS[model])
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+
+    accumulators = {}
+    written = 0
+    skipped = 0
+    pending_snapshot = set()
+
+    for file_path in files:
+        end_hour = forecast_end_of(file_path)
+        ending = [(s, e) for s, e in windows if e == end_hour]
+        finished = []
+        seen = Counter()
+
+        with open_grib(Path(file_path)) as grbs:
+            for grb in grbs:
+                if not is_interesting_message(grb, keywords_lower):
+                    continue
+                try:
+                    descriptor = describe_message(grb)
+                except Exception:
+                    continue
+                if not descriptor.is_probability:
+                    continue
+                # occurrences are counted over every probability message, as in timeseries_store.scan_messages
+                base = (descriptor.threshold_text, descriptor.name)
+                key = base + (seen[base],)
+                seen[base] += 1
+                if end_hour - grb.forecastTime != base_length:
+                    continue
+
+                accumulator = accumulators.get(key)
+                if accumulator is None:
+                    accumulator = accumulators[key] = ExceedanceAccumulator()
+                    for s in pending_snapshot:
+                        accumulator.snapshot(s)
+                values = grb.values
+                if np.ma.isMaskedArray(values):
+                    values = values.filled(np.nan)
+                accumulator.add(values, end_hour)
+
+                for s, e in ending:
+                    percent, hours = accumulator.window_percent(s)
+                    if percent is None or hours != (e - s) // base_length:
+                        skipped += 1
+                        continue
+                    grb.values = percent
+                    try:
+                        set_window(grb, s, e)
+                    except Exception as exc:
+                        logger.warning(f"{Path(file_path).name}: cannot mark {descriptor.name} "
+                                       f"{descriptor.threshold_text} as ({s}, {e}], skipped: {exc}")
+                        skipped += 1
+                        continue
+                    finished.append(grb.tostring())
+
+        if finished:
+            part = out_dir / (derived_file_name(file_path, end_hour) + ".part")
+            with open(part, "wb") as f:
+                for message in finished:
+                    f.write(message)
+            part.replace(part.with_suffix(""))
+            written += len(finished)
+
+        # hours after this file belong to windows starting at end_hour
+        if end_hour in starts:
+            for accumulator in accumulators.values():
+                accumulator.snapshot(end_hour)
+            pending_snapshot.add(end_hour)
+
+    logger.info(f"Exceedance {model}: {len(accumulators)} products x {len(windows)} windows -> "
+                f"{written} derived messages ({skipped} incomplete or unwritable skipped) "
+                f"in {time.time() - t0:.1f}s")
+    return written
+
+
+def parse_window(text):
+    start, end = text.split(":")
+    return int(start), int(end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build any-hour exceedance products after a model fetch")
+    parser.add_argument("--model", choices=list(MODEL_FOLDERS), action="append",
+                        help="model(s) to process (default: all)")
+    parser.add_argument("--window", type=parse_window, action="append",
+                        help="START:END forecast hours (default: 0:6 0:12 0:24 0:48)")
+    args = parser.parse_args()
+
+    for model in args.model or list(MODEL_FOLDERS):
+        build_exceedance(model, windows=args.window or DEFAULT_WINDOWS)
@@ -1,5 +1,21 @@
-import orjson
+import sys
+from collections import defaultdict
 from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import orjson
+
+from output_writers import from_columnar, iter_ndjson
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@lru_cache(maxsize=256)
+def parse_time(time_str: str) -> datetime:
+    """Parses a '%Y-%m-%d %H:%M:%S' string once; repeated anal_dates hit the cache."""
+    return datetime.strptime(time_str, TIME_FORMAT)
+
 
 def add_hours_to_time(time_str: str, hours: int) -> str:
     """
@@ -12,55 +28,106 @@ def add_hours_to_time(time_str: str, hours: int) -> str:
     Returns:
         A new datetime string with hours added.
     """
-    dt = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-    new_dt = dt + timedelta(hours=hours)
-    return new_dt.strftime("%Y-%m-%d %H:%M:%S")
+    return (parse_time(time_str) + timedelta(hours=hours)).strftime(TIME_FORMAT)
 
 
+class ForecastIndex:
+    """
+    One point's output document indexed by forecast hour.
+
+    anal_date is parsed once and every offset label is formatted at most once,
+    so querying many hours costs one dict lookup per hour plus its records.
+    """
+
+    def __init__(self, metadata):
+        self.metadata = metadata
+        # older files use "model", grib_data_to_json writes "sitrep"
+        self.model = metadata.get("sitrep") or metadata.get("model")
+        anal_date = metadata.get("anal_date")
+        self.anal_date = parse_time(anal_date) if anal_date and anal_date != "unknown" else None
+        self.by_hour = defaultdict(list)
+        self._labels = {}
+
+    def add(self, record):
+        self.by_hour[int(record["forecast_time"])].append(record)
+
+    def records(self, forecast_hour):
+        return self.by_hour.get(int(forecast_hour), [])
+
+    def time_label(self, offset_hours):
+        """anal_date + offset_hours as a string, memoized per offset."""
+        label = self._labels.get(offset_hours)
+        if label is None:
+            label = (self.anal_date + timedelta(hours=offset_hours)).strftime(TIME_FORMAT)
+            self._labels[offset_hours] = label
+        return label
+
+    def describe(self, record):
+        """Readable sentence for one record."""
+        threshold = record["threshold"]
+        name = record["name"]
+        step_length = int(record["step_length"] or 0)
+        forecast_time = int(record["forecast_time"])
+        value = record["value"]
+        step_end = self.time_label(forecast_time)
+
+        if step_length == 0:
+            return f"Probability of {threshold} of {name} at {step_end} is {value}"
+        step_start = self.time_label(forecast_time - step_length)
+        return f"Probability of {threshold} of {name} between {step_start} and {step_end} is {value}"
+
+
+def index_document(document):
+    """Builds the ForecastIndex of one {"metadata", "data"} document."""
+    if document.get("layout") == "columnar":
+        document = from_columnar(document)
+    index = ForecastIndex(document["metadata"])
+    for record in document["data"]:
+        index.add(record)
+    return index
+
+
+def iter_forecasts(path):
+    """
+    Yields a ForecastIndex per point stored in path. NDJSON files are streamed
+    line by line, so a large multi-point file never has to fit in memory at
+    once; .json files may hold one document or a list of them.
+    """
+    path = Path(path)
+    if path.suffix == ".ndjson":
+        for document in iter_ndjson(path):
+            yield index_document(document)
+        return
+
+    with open(path, "rb") as f:
+        parsed = orjson.loads(f.read())
+    for document in parsed if isinstance(parsed, list) else [parsed]:
+        yield index_document(document)
 
-import sys
-import orjson
-from pathlib import Path
 
 if __name__ == "__main__":
     # Check command-line arguments
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <filename> <forecast_hour>")
+    if len(sys.argv) < 3:
+        print("Usage: python script.py <filename> <forecast_hour> [<forecast_hour> ...]")
         sys.exit(1)
 
     FILENAME = Path(sys.argv[1])
-    user_hour = str(sys.argv[2])  # forecast hour
+    user_hours = [int(h) for h in sys.argv[2:]]  # forecast hours
 
     if not FILENAME.exists():
         print(f"File '{FILENAME}' does not exist!")
         sys.exit(1)
 
-    with open(FILENAME, "rb") as f:
-        parsed = orjson.loads(f.read())
-
-    metadata = parsed["metadata"]
-    data = parsed["data"]
-
-    print("Model:", metadata["model"])
-    print("Forecast time:", metadata["anal_date"])
-    print("Location:", metadata["location"])
+    for forecast in iter_forecasts(FILENAME):
+        print("Model:", forecast.model)
+        print("Forecast time:", forecast.metadata["anal_date"])
+        print("Location:", forecast.metadata["location"])
 
-    for record in data:
-        if str(record["forecast_time"]) == user_hour:
-            threshold = record["threshold"]
-            name = record["name"]
-            step_length = record["step_length"]
-            forecast_time = record["forecast_time"]
-            step_end = add_hours_to_time(metadata["anal_date"], forecast_time)
-            step_start = add_hours_to_time(metadata["anal_date"], forecast_time - step_length)
-            value = record["value"]
-
-            if int(step_length) == 0:
-                print(f"Probability of {threshold} of {name} at {step_end} is {value}")
-            else:
-                print(f"Probability of {threshold} of {name} between {step_start} and {step_end} is {value}")
+        for user_hour in user_hours:
+            for record in forecast.records(user_hour):
+                print(forecast.describe(record))
 
 """
 href12z_for_24.02619,-107.421197.json
 nbm06z_for_24.02619,-107.421197.json
-"""
\ No newline at end of file
+"""
@@ -1,14 +1,27 @@
 import pygrib
 import numpy as np
 from pathlib import Path
-import json
 import re
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from multiprocessing import Pool, cpu_count
 import sys
+import argparse
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import partial
+from conversion_manifest import ConversionManifest
+from grib_metadata import describe_message
+from grid_geometry import SharedGeometries, attach_geometries, geometry_for_message
+from output_writers import DEFAULT_OUTPUT_FORMAT, HEADERS, WRITERS, importable_formats, write_output
+from output_sinks import SINKS, open_sink, output_to_docs, rows_to_docs
+from point_cache import PointCache, cell_metadata, resolve_cell
+from tracing import TRACE_ENV, current_rss_mb, enable as enable_tracing, finish_run, flush as flush_trace, span, traced
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PARENT_DIR = SCRIPT_DIR.parent
@@ -16,12 +29,9 @@ PARENT_DIR = SCRIPT_DIR.parent
 class SafeMemoryFormatter(logging.Formatter):
     def format(self, record):
         if not hasattr(record, "memory"):
-            try:
-                import psutil, os
-                mem = psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
-                record.memory = f"{mem:,.1f}"
-            except Exception:
-                record.memory = "?"
+            # sampled in the background by tracing.py, not queried per record
+            mem = current_rss_mb()
+            record.memory = f"{mem:,.1f}" if mem is not None else "?"
         return super().format(record)
 
 logging.basicConfig(
@@ -37,6 +47,101 @@ def compute_nearest_index(lat, lon, lats, lons):
     dist = (lats - lat) ** 2 + (lons - lon) ** 2
     return np.unravel_index(np.argmin(dist), dist.shape)
 
+# Worker-side cache of open pygrib handles, enabled by long-lived workers
+# (see grib_service.py) so repeated requests skip re-opening every file.
+MAX_OPEN_HANDLES = 160
+_HANDLE_CACHE = OrderedDict()
+_HANDLE_CACHE_ENABLED = False
+
+
+def enable_handle_cache():
+    """Pool initializer that keeps GRIB files open between tasks in this worker."""
+    global _HANDLE_CACHE_ENABLED
+    _HANDLE_CACHE_ENABLED = True
+
+
+def init_worker(shared_geometries=None):
+    """
+    Pool initializer: enables the handle cache and attaches the grid
+    geometries the parent placed in shared memory (see share_geometries), so
+    workers don't each decode and hold their own lat/lon arrays.
+    """
+    enable_handle_cache()
+    attach_geometries(shared_geometries)
+
+
+def share_geometries(file_paths, shared=None):
+    """
+    Puts the grid geometry of each file's first message into shared memory
+    (a new float32 SharedGeometries unless `shared` is given).
+    Returns the SharedGeometries (the caller owns it and must close it once
+    the pool is done); files on an already shared grid are only header-read.
+    """
+    shared = shared if shared is not None else SharedGeometries()
+    for file_path in file_paths:
+        try:
+            with pygrib.open(str(file_path)) as grbs:
+                shared.add_message(grbs.message(1))
+        except Exception as e:
+            logger.warning(f"Could not share geometry of {file_path}: {e}")
+    if shared.descriptors:
+        logger.info(f"Shared {len(shared.descriptors)} grid geometr{'y' if len(shared.descriptors) == 1 else 'ies'} "
+                    f"({shared.nbytes() / (1024 * 1024):,.1f} MB)")
+    return shared
+
+
+def log_memory(label, when):
+    """
+    Logs this process's current and peak RSS and the peak RSS of its finished
+    children (peaks are Unix only); called before and after each pool run.
+    """
+    current = current_rss_mb()
+    current = f"{current:,.1f} MB" if current is not None else "?"
+    if resource is None:
+        logger.info(f"{label} ({when}): RSS {current}")
+        return
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    logger.info(f"{label} ({when}): RSS {current}, peak {own:,.1f} MB (parent), "
+                f"{children:,.1f} MB (largest worker)")
+
+
+@contextmanager
+def open_grib(file_path):
+    """
+    Yields an open pygrib file positioned at the first message.
+    Reuses a cached handle when the handle cache is enabled and the file's
+    size/mtime have not changed since it was opened.
+    """
+    path = str(file_path)
+    if not _HANDLE_CACHE_ENABLED:
+        with span("file_open", file=file_path.name if isinstance(file_path, Path) else os.path.basename(path)):
+            grbs = pygrib.open(path)
+        with grbs:
+            yield grbs
+        return
+
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _HANDLE_CACHE.pop(path, None)
+    if cached is not None and cached[0] != stamp:
+        cached[1].close()
+        cached = None
+    if cached is None:
+        with span("file_open", file=os.path.basename(path)):
+            cached = (stamp, pygrib.open(path))
+    _HANDLE_CACHE[path] = cached
+    while len(_HANDLE_CACHE) > MAX_OPEN_HANDLES:
+        _, (_, old) = _HANDLE_CACHE.popitem(last=False)
+        old.close()
+
+    grbs = cached[1]
+    grbs.seek(0)
+    yield grbs
+
+
 def is_interesting_message(grb, keywords_lower):
     """
     Fast checks:
@@ -61,30 +166,38 @@ def is_interesting_message(grb, keywords_lower):
     return False
 def process_single_file(file_path_str, lat, lon, keywords_lower):
     """
-    Opens the grib file, computes index once (using first message latlons) and
-    extracts values from messages that match keywords_lower.
+    Opens the grib file, looks up the nearest index on the (cached) grid
+    geometry of the first message and extracts values from messages that match keywords_lower.
     Returns: (list_of_rows, anal_date_or_None, model_cycle_hint)
     list_of_rows: list of tuples -> (threshold_text, grb.name, step_length, forecastTime, value)
     model_cycle_hint: tuple (lowercase filename) to help determine model/cycle upstream
     """
+    rows_per_point, anal_date, fname_lower = process_file_points(file_path_str, [(lat, lon)], keywords_lower)
+    return rows_per_point[0], anal_date, fname_lower
+
+
+def process_file_points(file_path_str, points, keywords_lower):
+    """
+    Same as process_single_file for many (lat, lon) points at once: every
+    matching message is decoded once and sampled at all points.
+    Returns: (rows_per_point, anal_date_or_None, model_cycle_hint) where
+    rows_per_point[k] is the list_of_rows for points[k].
+    """
     file_path = Path(file_path_str)
-    readable_rows = []
+    rows_per_point = [[] for _ in points]
     anal_date = None
     try:
-        with pygrib.open(str(file_path)) as grbs:
+        with open_grib(file_path) as grbs:
             try:
-                first = grbs.message(1)
-                anal_date = first.analDate
-                try:
-                    lats, lons = first.latlons()
-                except Exception:
-                    _, lats, lons = first.data()
-            
-                row, col = compute_nearest_index(lat, lon, lats, lons)
+                with span("geometry", file=file_path.name):
+                    first = grbs.message(1)
+                    anal_date = first.analDate
+                    geometry = geometry_for_message(first)
+                    indices = [geometry.nearest_index(lat, lon) for lat, lon in points]
             except Exception:
-                row, col = None, None
-
-            paren_re = re.compile(r'\(([^)]*?)\)')
+                indices = None
+            # message(1) leaves the iterator past the first message
+            grbs.seek(0)
 
             forecast_end = None
             m = re.search(r'f(\d{2,3})', file_path.name)
@@ -95,38 +208,41 @@ def process_single_file(file_path_str, lat, lon, keywords_lower):
                     forecast_end = None
 
             for grb in grbs:
-                try:
-                    if not is_interesting_message(grb, keywords_lower):
+                with span("message_select"):
+                    try:
+                        if not is_interesting_message(grb, keywords_lower):
+                            continue
+                    except Exception:
                         continue
-                except Exception:
-                    continue
 
-                try:
-                    anal_date = grb.analDate or anal_date
-                except Exception:
-                    pass
+                    try:
+                        anal_date = grb.analDate or anal_date
+                    except Exception:
+                        pass
 
-                try:
-                    txt = str(grb)
-                    pm = paren_re.findall(txt)
-                    threshold_text = pm[-1].strip() if pm else "none"
-                except Exception:
-                    threshold_text = "none"
+                    try:
+                        descriptor = describe_message(grb)
+                    except Exception:
+                        continue
 
-                units = getattr(grb, "units", "") or ""
-                limit = f"{threshold_text} {units}".strip()
-                if not (">" in limit or "<" in limit):
+                    if not descriptor.is_probability:
                         continue
+                limit = descriptor.threshold_text
                 try:
-                    if row is not None and col is not None:
-                        values = getattr(grb, "values", None)
-                        if values is None:
-                            values, _, _ = grb.data()
-                        value = float(values[row, col])
+                    if indices is not None:
+                        with span("decode"):
+                            values = getattr(grb, "values", None)
+                            if values is None:
+                                values, _, _ = grb.data()
+                        with span("extract"):
+                            point_values = [float(values[r, c]) for r, c in indices]
                     else:
-                        data, lats2, lons2 = grb.data()
-                        r, c = compute_nearest_index(lat, lon, lats2, lons2)
-                        value = float(data[r, c])
+                        with span("decode"):
+                            data, lats2, lons2 = grb.data()
+                        with span("extract"):
+                            point_values = [
+                                float(data[compute_nearest_index(lat, lon, lats2, lons2)]) for lat, lon in points
+                            ]
                 except Exception as e:
                     continue
 
@@ -135,59 +251,20 @@ def process_single_file(file_path_str, lat, lon, keywords_lower):
                 except Exception:
                     step_length = None
 
-                readable_rows.append((limit, grb.name, step_length, grb.forecastTime, value))
+                for rows, value in zip(rows_per_point, point_values):
+                    rows.append((limit, descriptor.name, step_length, grb.forecastTime, value))
     except Exception as e:
         logger.error(f"Error processing {file_path.name}: {e}")
 
-    return readable_rows, anal_date, file_path.name.lower()
-
-
-def make_json_file(folder_path, lat, lon, desired_forecast_types, max_workers=8):
-    """
-    folder_path: path to directory with grib files
-    lat, lon: target point
-    desired_forecast_types: list of substring keywords (case-insensitive)
-    max_workers: used only for multiprocessing pool size hint (ignored by Pool's own defaults)
-    """
-
-    keywords_lower = [k.lower() for k in desired_forecast_types]
-
-    folder_path = os.fspath(folder_path) if not isinstance(folder_path, (str, os.PathLike)) else folder_path
-    logger.info(f"make_json_file: scanning folder {folder_path}")
-
-
-    file_list = [str(p) for p in Path(folder_path).iterdir() if p.is_file()]
-    if not file_list:
-        logger.warning(f"No files found in {folder_path}")
-        return
-
-
-    pool_size = min(len(file_list), max(1, cpu_count() - 1))
-    results = []
-    try:
-        with Pool(processes=pool_size) as pool:
-            fn = partial(process_single_file, lat=lat, lon=lon, keywords_lower=keywords_lower)
-            results = pool.map(fn, file_list)
-    except Exception as e:
-        logger.error(f"Multiprocessing error: {e}")
-
-        results = [process_single_file(fp, lat, lon, keywords_lower) for fp in file_list]
-
-
-    readable_data = []
-    anal_date = None
-    lower_first_fname = None
-    for rows, ad, fname_lower in results:
-        if rows:
-            readable_data.extend(rows)
-        if anal_date is None and ad:
-            anal_date = ad
-        if lower_first_fname is None and fname_lower:
-            lower_first_fname = fname_lower
+    # pool workers are terminated rather than exited, so hand events over per file
+    flush_trace()
+    return rows_per_point, anal_date, file_path.name.lower()
 
 
+def detect_model_cycle(fname):
+    """Returns (model, cycle) guessed from a lowercase GRIB filename."""
     model, cycle = "unknown", "unknown"
-    fname = (lower_first_fname or "").lower()
+    fname = (fname or "").lower()
 
     m = re.search(r"^(rrfs)\.(\d{8})t(\d{2})z", fname)
     if m:
@@ -209,74 +286,435 @@ def make_json_file(folder_path, lat, lon, desired_forecast_types, max_workers=8)
         if cyc:
             cycle = f"{cyc.group(1)}z"
 
-    headers = ["threshold", "name", "step_length", "forecast_time", "value"]
+    return model, cycle
+
+
+def list_grib_files(folder_path):
+    """Returns the file paths (as str) inside folder_path, or [] if it is missing."""
+    folder = Path(folder_path)
+    if not folder.is_dir():
+        return []
+    return sorted(str(p) for p in folder.iterdir() if p.is_file())
+
+
+def build_output_data(folder_path, lat, lon, results, cell=None):
+    """
+    Merges per-file results from process_single_file into one output
+    document. Returns (output_data, output_name).
+    cell: optional point_cache.cell_metadata of the grid cell lat/lon resolved to.
+    """
+    readable_data = []
+    anal_date = None
+    lower_first_fname = None
+    for rows, ad, fname_lower in sorted(results, key=lambda r: r[2]):
+        if rows:
+            readable_data.extend(rows)
+        if anal_date is None and ad:
+            anal_date = ad
+        if lower_first_fname is None and fname_lower:
+            lower_first_fname = fname_lower
+
+    model, cycle = detect_model_cycle(lower_first_fname)
+
+    return assemble_output(
+        model,
+        cycle,
+        anal_date.strftime("%Y-%m-%d %H:%M:%S") if anal_date else "unknown",
+        [dict(zip(HEADERS, row)) for row in readable_data],
+        folder_path,
+        lat,
+        lon,
+        cell
+    )
+
 
+def assemble_output(sitrep, cycle, anal_date, data, folder_path, lat, lon, cell=None):
+    """Builds the output document and file name for already-merged rows."""
     output_data = {
         "metadata": {
-            "sitrep": model,
-            "anal_date": anal_date.strftime("%Y-%m-%d %H:%M:%S") if anal_date else "unknown",
+            "sitrep": sitrep,
+            "anal_date": anal_date,
             "location": {"lat": lat, "lon": lon},
             "folder": str(folder_path)
         },
-        "data": [dict(zip(headers, row)) for row in readable_data],
+        "data": data,
     }
+    if cell is not None:
+        output_data["metadata"]["cell"] = cell
 
+    safe_lat = float(lat)
+    safe_lon = float(lon)
+    output_name = f"{sitrep}{cycle}_for_{safe_lat},{safe_lon}.json"
+    return output_data, output_name
+
+
+@traced("write")
+def write_json_output(output_data, output_name, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Writes one output document to the backend data directory with the chosen writer."""
     DATA_DIR = PARENT_DIR / "cinder-app" / "backend" / "models"
     OUTDIR = DATA_DIR / "data"
 
     if not OUTDIR.exists():
         raise FileNotFoundError(f"Hardcoded output directory does not exist: {OUTDIR}")
 
+    output_path = write_output(output_data, OUTDIR / output_name, output_format)
 
-    safe_lat = float(lat)
-    safe_lon = float(lon)
-    output_name = f"{model}{cycle}_for_{safe_lat},{safe_lon}.json"
-    output_path = OUTDIR / output_name
+    logger.info(f"Output ({output_format}) saved to {output_path}")
+    if output_format not in importable_formats():
+        logger.warning(f"json-to-mongodb.js only imports {', '.join(importable_formats())} output; "
+                       f"{output_path.name} will not be loaded into the database")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
 
-    logger.info(f"JSON saved to {output_path}")
+def default_pool_size(task_count):
+    """One worker per core (minus one for the parent), never more than there are tasks."""
+    return max(1, min(task_count, cpu_count() - 1))
 
 
-def run_all_models(lat, lon):
-    logger.info("Running ALL GRIB -> JSON conversions in parallel...")
+def make_json_file(folder_path, lat, lon, desired_forecast_types, max_workers=8, pool=None,
+                   output_format=DEFAULT_OUTPUT_FORMAT, full_precision=False):
+    """
+    folder_path: path to directory with grib files (a MODEL_FOLDERS folder also
+    brings in its derived products, see folder_files)
+    lat, lon: target point
+    desired_forecast_types: list of substring keywords (case-insensitive)
+    max_workers: used only for multiprocessing pool size hint (ignored by Pool's own defaults)
+    pool: optional existing multiprocessing.Pool to run on instead of creating one
+    output_format: writer name from output_writers.WRITERS
+    full_precision: keep grid lat/lons float64 instead of float32, in the
+    shared geometries and when resolving the point's cell
+    """
+
+    keywords_lower = [k.lower() for k in desired_forecast_types]
+
+    folder_path = os.fspath(folder_path) if not isinstance(folder_path, (str, os.PathLike)) else folder_path
+    logger.info(f"make_json_file: scanning folder {folder_path}")
+
+
+    file_list = folder_files(folder_path)
+    if not file_list:
+        logger.warning(f"No files found in {folder_path}")
+        return
+
+    # only new or changed files are extracted; the rest come from the manifest
+    manifest = ConversionManifest(folder_path)
+    results, todo = manifest.plan(file_list, lat, lon)
+    logger.info(f"make_json_file: {len(todo)}/{len(file_list)} files new or changed")
+
+    if todo:
+        fn = partial(process_single_file, lat=lat, lon=lon, keywords_lower=keywords_lower)
+        if pool is not None:
+            new_results = pool.map(fn, todo)
+        else:
+            log_memory("make_json_file", "before")
+            with share_geometries(todo[:1], SharedGeometries(full_precision)) as shared, \
+                    Pool(processes=default_pool_size(len(todo)), initializer=init_worker,
+                         initargs=(shared.descriptors,)) as own_pool:
+                new_results = own_pool.map(fn, todo)
+            log_memory("make_json_file", "after")
+        manifest.record(lat, lon, zip(todo, new_results))
+        results += new_results
+
+    cell = cell_metadata(resolve_cell(detect_model_cycle(Path(file_list[0]).name)[0], file_list, lat, lon,
+                                      full_precision))
+    output_data, output_name = build_output_data(folder_path, lat, lon, results, cell)
+    write_json_output(output_data, output_name, output_format)
+    return output_data
 
-    model_folders = {
-        "HREF": PARENT_DIR / "href_data" / "href_download",
-        "NBM": PARENT_DIR / "nbm_data" / "nbm_download",
-        "REFS": PARENT_DIR / "refs_data" / "refs_download"
+
+MODEL_FOLDERS = {
+    "HREF": PARENT_DIR / "href_data" / "href_download",
+    "NBM": PARENT_DIR / "nbm_data" / "nbm_download",
+    "REFS": PARENT_DIR / "refs_data" / "refs_download"
+}
+
+# Derived products (exceedance.py) live next to each download folder
+DERIVED_FOLDERS = {model: folder.parent / folder.name.replace("_download", "_derived")
+                   for model, folder in MODEL_FOLDERS.items()}
+
+DESIRED_FORECAST_TYPES = ["precip", "wind", "apparent", "2 metre", "relative humidity"]
+
+# Grid-cell result cache shared by every call in this process
+POINT_CACHE = PointCache()
+
+
+def model_files(model, folder):
+    """The GRIB files of a model's download folder followed by its derived products."""
+    derived = DERIVED_FOLDERS.get(model)
+    return list_grib_files(folder) + (list_grib_files(derived) if derived is not None else [])
+
+
+def folder_files(folder_path):
+    """
+    The files a folder's ConversionManifest tracks: model_files() for a
+    MODEL_FOLDERS folder, so make_json_file and run_all_models fingerprint
+    the same paths and keep each other's cached rows, else the folder's files.
+    """
+    folder = Path(folder_path).resolve()
+    for model, model_folder in MODEL_FOLDERS.items():
+        if Path(model_folder).resolve() == folder:
+            return model_files(model, model_folder)
+    return list_grib_files(folder_path)
+
+
+def forecast_hour_of(file_path):
+    """Forecast hour from a GRIB filename ('...f05...' -> 5), or None."""
+    m = re.search(r'f(\d{2,3})', Path(file_path).name.lower())
+    return int(m.group(1)) if m else None
+
+
+def build_task_queue(model_folders, files_by_model=None, near_term_first=False):
+    """
+    Returns one (model, file_path) task per GRIB file across all models,
+    largest file first so big REFS files start early and small files fill in
+    the gaps at the end of the run.
+    files_by_model: optional {model: [file_path]} to schedule instead of
+    every file of each folder.
+    near_term_first: order by forecast hour instead (largest first within an
+    hour), so streaming callers get the first hours of every model early.
+    """
+    tasks = []
+    for model, folder in model_folders.items():
+        file_list = files_by_model[model] if files_by_model is not None else model_files(model, folder)
+        for file_path in file_list:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+            tasks.append((size, model, file_path))
+
+    if near_term_first:
+        def hour_then_size(task):
+            hour = forecast_hour_of(task[2])
+            return (hour if hour is not None else float("inf"), -task[0])
+        tasks.sort(key=hour_then_size)
+    else:
+        tasks.sort(key=lambda t: t[0], reverse=True)
+    return [(model, file_path) for _, model, file_path in tasks]
+
+
+def _process_task(task, lat, lon, keywords_lower):
+    model, file_path = task
+    return model, file_path, process_single_file(file_path, lat, lon, keywords_lower)
+
+
+def make_cache_entry(output_data, results, version=None):
+    """
+    Returns the PointCache entry for one model's merged output. version is
+    the ConversionManifest digest of the files it was built from; an entry
+    whose version no longer matches the folder is stale.
+    """
+    _, cycle = detect_model_cycle(min(r[2] for r in results))
+    return {
+        "sitrep": output_data["metadata"]["sitrep"],
+        "cycle": cycle,
+        "anal_date": output_data["metadata"]["anal_date"],
+        "data": output_data["data"],
+        "version": version,
     }
 
 
-    with ThreadPoolExecutor(max_workers=min(len(model_folders), cpu_count())) as execd:
-        futures = []
-        for _, folder in model_folders.items():
-            futures.append(
-                execd.submit(
-                    make_json_file,
-                    folder,
-                    lat,
-                    lon,
-                    ["precip", "wind", "apparent", "2 metre", "relative humidity"],
-                    max(1, cpu_count() // 2)
-                )
-            )
-        for f in as_completed(futures):
+def output_from_cache_entry(entry, folder_path, lat, lon, cell=None):
+    """Rebuilds (output_data, output_name) for lat/lon from a PointCache entry."""
+    return assemble_output(
+        entry["sitrep"], entry["cycle"], entry["anal_date"], entry["data"], folder_path, lat, lon, cell
+    )
+
+
+def _entry_current(entry, version):
+    return entry is not None and entry.get("version") == version
+
+
+def run_all_models(lat, lon, pool=None, write=True, output_format=DEFAULT_OUTPUT_FORMAT, sink=None,
+                   cache=POINT_CACHE, progress=None, near_term_first=False, full_precision=False):
+    """
+    Converts every model's GRIB files for one point using a single process
+    pool fed by one global (model, file) task queue.
+    Returns {model: output_data} for the models that produced output;
+    write=False skips writing the JSON files (used by grib_service.py).
+    sink: optional output_sinks sink; no files are written. Row sinks get each
+    file's rows as soon as its worker returns; bucketed sinks (MongoSink's
+    default layout) get one write_output() per model once it is complete.
+    Every output carries its resolved grid cell in metadata["cell"] (see
+    point_cache.cell_metadata), and so does every document given to a sink.
+    cache: PointCache consulted per (model, cycle, grid cell) before any file
+    is scheduled; None disables it. Concurrent calls for the same cell are
+    single-flighted through cache.leases: one extracts, the others wait and
+    reuse its entry.
+    progress: optional callback progress(done, total, **info), called once
+    before extraction and after every file.
+    near_term_first: schedule files by forecast hour (see build_task_queue).
+    full_precision: keep grid lat/lons float64 instead of float32. Cells are
+    resolved in the same precision the pool's workers extract with; a
+    caller-supplied pool builds its own geometries, float32 by default.
+    """
+    logger.info("Running ALL GRIB -> JSON conversions in parallel...")
+
+    keywords_lower = [k.lower() for k in DESIRED_FORECAST_TYPES]
+
+    # row sinks are fed per file, bucketed sinks once per finished model
+    stream_rows = sink is not None and not getattr(sink, "bucketed", False)
+    held_leases = []
+    try:
+        cached_entries = {}
+        cell_keys = {}
+        cells = {}
+        versions = {}
+        pending_folders = {}
+        for model, folder in MODEL_FOLDERS.items():
+            key = resolve_cell(model, list_grib_files(folder), lat, lon, full_precision)
+            cells[model] = cell_metadata(key)
+            if key is None or cache is None:
+                pending_folders[model] = folder
+                continue
+            cache.observe_cycle(model, key.cycle)
+            versions[model] = ConversionManifest(folder).version(model_files(model, folder))
+            # files can still arrive or be refetched within a cycle, so entries must match the version
+            entry = cache.get(key, version=versions[model])
+            if not _entry_current(entry, versions[model]):
+                # single flight: one caller per cell extracts, concurrent callers wait
+                # for its lease and then pick up the entry it stored
+                if cache.leases.acquire(key):
+                    entry = cache.get(key, fresh=True, version=versions[model])
+                held_leases.append(key)
+            if _entry_current(entry, versions[model]):
+                cache.leases.release(key)
+                cached_entries[model] = entry
+            else:
+                cell_keys[model] = key
+                pending_folders[model] = folder
+
+        # cache hits are complete already; hand them to the sink before any extraction
+        if stream_rows:
+            for model, entry in cached_entries.items():
+                output_data, _ = output_from_cache_entry(entry, MODEL_FOLDERS[model], lat, lon, cells[model])
+                sink.write(output_to_docs(output_data))
+
+        # per model: rows of unchanged files from the manifest, the rest scheduled
+        manifests = {model: ConversionManifest(folder) for model, folder in pending_folders.items()}
+        results_by_model = {}
+        todo_by_model = {}
+        for model, folder in pending_folders.items():
+            results_by_model[model], todo_by_model[model] = manifests[model].plan(model_files(model, folder), lat, lon)
+            if stream_rows:
+                for rows, anal_date, fname_lower in results_by_model[model]:
+                    if rows:
+                        sink.write(rows_to_docs(rows, detect_model_cycle(fname_lower)[0], anal_date, lat, lon,
+                                                cells[model]))
+
+        tasks = build_task_queue(pending_folders, todo_by_model, near_term_first)
+        if not tasks and not cached_entries and not any(results_by_model.values()):
+            logger.warning("No GRIB files found for any model")
+            return {}
+        if pending_folders:
+            logger.info(f"{len(tasks)} files to extract, "
+                        f"{sum(len(r) for r in results_by_model.values())} reused from the conversion manifest")
+
+        new_results = {model: [] for model in pending_folders}
+        fn = partial(_process_task, lat=lat, lon=lon, keywords_lower=keywords_lower)
+        if progress is not None:
+            progress(0, len(tasks), cached_models=sorted(cached_entries))
+
+        def collect(active_pool):
+            # chunksize=1 so one slow file never holds a batch of queued work hostage
+            for done, (model, file_path, result) in enumerate(
+                    active_pool.imap_unordered(fn, tasks, chunksize=1), start=1):
+                results_by_model[model].append(result)
+                new_results[model].append((file_path, result))
+                rows, anal_date, fname_lower = result
+                if stream_rows and rows:
+                    sitrep, _ = detect_model_cycle(fname_lower)
+                    with span("write", sink=type(sink).__name__):
+                        sink.write(rows_to_docs(rows, sitrep, anal_date, lat, lon, cells[model]))
+                if progress is not None:
+                    progress(done, len(tasks), model=model, forecast_hour=forecast_hour_of(file_path))
+
+        if tasks and pool is not None:
+            collect(pool)
+        elif tasks:
+            # one geometry per model grid, decoded once here instead of once per worker
+            first_files = {}
+            for model, file_path in tasks:
+                first_files.setdefault(model, file_path)
+            log_memory("run_all_models", "before")
+            with share_geometries(first_files.values(), SharedGeometries(full_precision)) as shared, \
+                    Pool(processes=default_pool_size(len(tasks)), initializer=init_worker,
+                         initargs=(shared.descriptors,)) as own_pool:
+                collect(own_pool)
+            log_memory("run_all_models", "after")
+
+        for model, file_results in new_results.items():
+            if file_results:
+                manifests[model].record(lat, lon, file_results)
+
+        outputs = {}
+        for model in MODEL_FOLDERS:
             try:
-                f.result()
+                if model in cached_entries:
+                    output_data, output_name = output_from_cache_entry(
+                        cached_entries[model], MODEL_FOLDERS[model], lat, lon, cells[model]
+                    )
+                elif results_by_model.get(model):
+                    results = results_by_model[model]
+                    output_data, output_name = build_output_data(MODEL_FOLDERS[model], lat, lon, results,
+                                                                 cells[model])
+                    if model in cell_keys:
+                        cache.put(cell_keys[model], make_cache_entry(output_data, results, versions.get(model)))
+                        cache.leases.release(cell_keys[model])
+                else:
+                    logger.warning(f"No files found in {MODEL_FOLDERS[model]}")
+                    continue
+
+                if sink is not None and not stream_rows:
+                    with span("write", sink=type(sink).__name__):
+                        sink.write_output(output_data)
+                elif write and sink is None:
+                    write_json_output(output_data, output_name, output_format)
+                outputs[model] = output_data
             except Exception as e:
                 logger.error(f"Model conversion failed: {e}")
 
-    logger.info("All GRIB -> JSON files have been generated.")
+        if cache is not None:
+            logger.info(f"Point cache: {len(cached_entries)}/{len(MODEL_FOLDERS)} models served from cache "
+                        f"(hit rate {cache.hit_rate():.0%})")
+        logger.info("All GRIB -> JSON files have been generated.")
+        return outputs
+    finally:
+        # leases of models that failed or produced nothing
+        for key in held_leases:
+            cache.leases.release(key)
 
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python grib_data_to_json.py <lat> <lon>")
-        sys.exit(1)
-
-    LAT = float(sys.argv[1])
-    LON = float(sys.argv[2])
-    run_all_models(LAT, LON)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract every model's GRIB values for one point")
+    parser.add_argument("lat", type=float)
+    parser.add_argument("lon", type=float)
+    parser.add_argument("format", nargs="?", default=DEFAULT_OUTPUT_FORMAT, choices=list(WRITERS),
+                        help=f"output file format (default {DEFAULT_OUTPUT_FORMAT}; the backend importer "
+                             f"loads only {', '.join(importable_formats())})")
+    parser.add_argument("--sink", choices=list(SINKS), default=None,
+                        help="upsert rows directly into a sink instead of writing files "
+                             "('stream' emits NDJSON rows/progress events, near-term hours first)")
+    parser.add_argument("--stream-to", default=None, metavar="HOST:PORT",
+                        help="with --sink stream: send events to a TCP socket instead of stdout")
+    parser.add_argument("--full-precision", action="store_true",
+                        help="keep grid lat/lons float64 (default float32, half the geometry memory)")
+    parser.add_argument("--trace", nargs="?", const="1", default=None, metavar="DIR",
+                        help=f"record stage timings (same as {TRACE_ENV}=DIR)")
+    args = parser.parse_args()
+
+    if args.trace:
+        enable_tracing(None if args.trace == "1" else args.trace)
+    streaming = args.sink == "stream"
+    if streaming:
+        sink = open_sink("stream", target=args.stream_to)
+    else:
+        sink = open_sink(args.sink) if args.sink else None
+    try:
+        run_all_models(args.lat, args.lon, output_format=args.format, sink=sink,
+                       progress=sink.progress if streaming else None, near_term_first=streaming,
+                       full_precision=args.full_precision)
+    finally:
+        if sink is not None:
+            sink.close()
+        finish_run("grib_data_to_json")
@@ -11,12 +11,25 @@ import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 
-lats = grb.latitudes
-lons = grb.longitudes
-values = grb.values
-
-lats_two_dimensional = lats.reshape(values.shape)
-lons_two_dimensional = lons.reshape(values.shape)
+# (lat_min, lat_max, lon_min, lon_max) to plot only that window, None for the full grid
+BBOX = None
+
+if BBOX is not None:
+    from grib_subgrid import crop
+    from grid_geometry import geometry_for_message
+
+    geometry = geometry_for_message(grb)
+    window = geometry.window(BBOX)
+    values = crop(grb.values, window)
+    lats_two_dimensional = crop(geometry.lats, window)
+    lons_two_dimensional = crop(geometry.lons_180, window)
+else:
+    lats = grb.latitudes
+    lons = grb.longitudes
+    values = grb.values
+
+    lats_two_dimensional = lats.reshape(values.shape)
+    lons_two_dimensional = lons.reshape(values.shape)
 
 da = xarray.DataArray(
     data=values,
@@ -0,0 +1,134 @@
+from typing import NamedTuple, Optional
+
+# Header keys that fully determine how a message's variable and threshold are
+# described (level and statistical process included, since eccodes names
+# e.g. 10 m and 2 m wind differently). Keys a template lacks read as None.
+# Messages that share these values share one cached descriptor.
+SIGNATURE_KEYS = (
+    "discipline",
+    "parameterCategory",
+    "parameterNumber",
+    "productDefinitionTemplateNumber",
+    "typeOfFirstFixedSurface",
+    "scaleFactorOfFirstFixedSurface",
+    "scaledValueOfFirstFixedSurface",
+    "typeOfStatisticalProcessing",
+    "stepType",
+    "probabilityType",
+    "scaleFactorOfLowerLimit",
+    "scaledValueOfLowerLimit",
+    "scaleFactorOfUpperLimit",
+    "scaledValueOfUpperLimit",
+    "percentileValue",
+)
+
+# GRIB2 code table 4.9: probabilityType -> (operator, which limit is the threshold)
+PROBABILITY_OPERATORS = {
+    0: ("<", "lower"),
+    1: (">", "upper"),
+    2: ("between", "lower"),
+    3: (">", "lower"),
+    4: ("<", "upper"),
+}
+
+
+class MessageDescriptor(NamedTuple):
+    """Typed description of a GRIB message's variable and threshold."""
+    name: str
+    short_name: str
+    units: str
+    step_type: Optional[str]
+    operator: Optional[str]
+    threshold: Optional[float]
+    lower_limit: Optional[float]
+    upper_limit: Optional[float]
+    percentile: Optional[float]
+
+    @property
+    def is_probability(self):
+        return self.operator is not None
+
+    @property
+    def threshold_text(self):
+        """Human-readable threshold, e.g. '> 12.7 kg m**-2' (or 'none')."""
+        if self.operator is None:
+            return "none"
+        if self.operator == "between":
+            text = f">= {self.lower_limit:g} < {self.upper_limit:g}"
+        else:
+            text = f"{self.operator} {self.threshold:g}"
+        return f"{text} {self.units}".strip()
+
+
+_DESCRIPTOR_CACHE = {}
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _read_key(grb, key):
+    """Returns the value of a header key, or None if absent/missing."""
+    try:
+        if not grb.has_key(key) or grb.is_missing(key):
+            return None
+        return grb[key]
+    except Exception:
+        return None
+
+
+def _scaled_limit(scale_factor, scaled_value):
+    if scale_factor is None or scaled_value is None:
+        return None
+    return float(scaled_value) / (10 ** scale_factor)
+
+
+def header_signature(grb):
+    """Returns the tuple of header values used as the descriptor cache key."""
+    return tuple(_read_key(grb, key) for key in SIGNATURE_KEYS)
+
+
+def _build_descriptor(grb, signature):
+    keys = dict(zip(SIGNATURE_KEYS, signature))
+
+    lower_limit = _scaled_limit(keys["scaleFactorOfLowerLimit"], keys["scaledValueOfLowerLimit"])
+    upper_limit = _scaled_limit(keys["scaleFactorOfUpperLimit"], keys["scaledValueOfUpperLimit"])
+
+    operator, threshold = None, None
+    probability_type = keys["probabilityType"]
+    if probability_type in PROBABILITY_OPERATORS:
+        operator, which = PROBABILITY_OPERATORS[probability_type]
+        threshold = lower_limit if which == "lower" else upper_limit
+
+    percentile = keys["percentileValue"]
+
+    return MessageDescriptor(
+        name=str(_read_key(grb, "name") or "unknown"),
+        short_name=str(_read_key(grb, "shortName") or "unknown"),
+        units=str(_read_key(grb, "units") or ""),
+        step_type=keys["stepType"],
+        operator=operator,
+        threshold=threshold,
+        lower_limit=lower_limit,
+        upper_limit=upper_limit,
+        percentile=float(percentile) if percentile is not None else None,
+    )
+
+
+def describe_message(grb):
+    """
+    Returns the MessageDescriptor for a pygrib message.
+    Reads the probability, percentile and statistical-process keys directly
+    (no str(grb) rendering) and memoizes the result per header signature.
+    """
+    signature = header_signature(grb)
+    descriptor = _DESCRIPTOR_CACHE.get(signature)
+    if descriptor is None:
+        _CACHE_STATS["misses"] += 1
+        descriptor = _build_descriptor(grb, signature)
+        _DESCRIPTOR_CACHE[signature] = descriptor
+    else:
+        _CACHE_STATS["hits"] += 1
+    return descriptor
+
+
+def descriptor_cache_info():
+    """Returns (hits, misses, cached descriptor count) for this process."""
+    return _CACHE_STATS["hits"], _CACHE_STATS["misses"], len(_DESCRIPTOR_CACHE)
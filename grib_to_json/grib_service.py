@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# grib_service.py (resident extraction service)
+"""
+Long-lived HTTP wrapper around grib_data_to_json.run_all_models.
+
+The process pool is created once at startup, so worker processes stay warm:
+pygrib/numpy are already imported, each worker keeps its grid geometry and
+open GRIB handles between requests, and a point request only pays for the
+extraction itself.
+
+    python grib_service.py [--host 127.0.0.1] [--port 5051]
+
+GET /health                -> {"status": "ok", "workers": N}
+GET /extract?lat=..&lon=.. -> {"models": {model: output_data}}
+GET /extract?lat=..&lon=..&sink=mongo
+                           -> rows upserted straight into MongoDB,
+                              {"sink": "mongo", "rows": {model: count}}
+GET /bbox?model=HREF&fh=6&lat_min=..&lat_max=..&lon_min=..&lon_max=..[&var=precip][&derived=1]
+                           -> cropped float32 sub-grid (see grib_subgrid.py)
+GET /timeseries?model=HREF&lat=..&lon=..
+                           -> every hour of the point from the time-major store
+GET /window?model=HREF&lat=..&lon=..&start=6&end=30[&op=max]
+                           -> per-series window aggregate (sum/mean/max/min/exceedance)
+GET /tiles/<model>/<fh>/<msgno>/<z>/<x>/<y>.png[?derived=1]
+                           -> 256x256 Web Mercator PNG tile (see tile_renderer.py)
+"""
+import argparse
+import json
+import logging
+import math
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool, cpu_count
+from urllib.parse import urlparse, parse_qs
+
+from grib_data_to_json import MODEL_FOLDERS, enable_handle_cache, run_all_models
+from grib_subgrid import extract_bbox, find_forecast_file, subgrid_payload
+from tile_renderer import MAX_ZOOM, render_tile
+from range_queries import OPERATIONS, window_aggregate
+from timeseries_store import timeseries
+from output_sinks import MongoSink
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5051
+
+logger = logging.getLogger("grib_service")
+
+POOL = None
+POOL_SIZE = 0
+MONGO_SINK = None
+
+
+def get_mongo_sink():
+    """Returns the shared MongoSink, or None if pymongo/MongoDB is unavailable."""
+    global MONGO_SINK
+    if MONGO_SINK is None:
+        try:
+            MONGO_SINK = MongoSink()
+        except Exception as e:
+            logger.warning(f"Mongo sink unavailable, returning rows instead: {e}")
+            return None
+    return MONGO_SINK
+
+
+def _finite(obj):
+    """Copy of a JSON payload with NaN/inf floats (masked or missing cells) replaced by None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps_json(payload):
+    """Strict JSON (no bare NaN tokens, which JSON.parse rejects); non-finite values become null."""
+    try:
+        return json.dumps(payload, ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        return json.dumps(_finite(payload), ensure_ascii=False, allow_nan=False)
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the shared worker pool."""
+
+    def _send_json(self, status, payload):
+        body = dumps_json(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_png(self, png):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(png)))
+        self.send_header("Cache-Control", "public, max-age=300")
+        self.end_headers()
+        self.wfile.write(png)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path.startswith("/tiles/"):
+            return self._get_tile(url.path, derived=params.get("derived", ["0"])[0] == "1")
+
+        if url.path == "/health":
+            return self._send_json(200, {"status": "ok", "workers": POOL_SIZE})
+
+        if url.path == "/extract":
+            try:
+                lat = float(params["lat"][0])
+                lon = float(params["lon"][0])
+            except (KeyError, ValueError):
+                return self._send_json(400, {"error": "lat and lon are required"})
+
+            sink = get_mongo_sink() if params.get("sink", [None])[0] == "mongo" else None
+
+            t0 = time.time()
+            try:
+                outputs = run_all_models(lat, lon, pool=POOL, write=False, sink=sink)
+            except Exception as e:
+                logger.exception(f"Extraction failed for ({lat}, {lon}): {e}")
+                return self._send_json(500, {"error": str(e)})
+            logger.info(f"Extracted ({lat}, {lon}) in {time.time() - t0:.2f}s")
+
+            if sink is not None:
+                rows = {model: len(output["data"]) for model, output in outputs.items()}
+                return self._send_json(200, {"sink": "mongo", "rows": rows})
+            return self._send_json(200, {"models": outputs})
+
+        if url.path == "/timeseries":
+            try:
+                model = params["model"][0].upper()
+                lat = float(params["lat"][0])
+                lon = float(params["lon"][0])
+            except (KeyError, ValueError):
+                return self._send_json(400, {"error": "model, lat and lon are required"})
+            if model not in MODEL_FOLDERS:
+                return self._send_json(400, {"error": f"unknown model {model}"})
+            output_data = timeseries(model, lat, lon)
+            if output_data is None:
+                return self._send_json(404, {"error": f"no time-series store for {model} yet"})
+            return self._send_json(200, output_data)
+
+        if url.path == "/window":
+            try:
+                model = params["model"][0].upper()
+                lat = float(params["lat"][0])
+                lon = float(params["lon"][0])
+                start_hour = int(params["start"][0])
+                end_hour = int(params["end"][0])
+            except (KeyError, ValueError):
+                return self._send_json(400, {"error": "model, lat, lon, start and end are required"})
+            op = params.get("op", ["max"])[0]
+            if model not in MODEL_FOLDERS or op not in OPERATIONS:
+                return self._send_json(400, {"error": f"unknown model {model} or op {op}"})
+            rows = window_aggregate(model, lat, lon, start_hour, end_hour, op)
+            if rows is None:
+                return self._send_json(404, {"error": f"no range tables for {model} yet"})
+            return self._send_json(200, {"model": model, "op": op, "start": start_hour, "end": end_hour,
+                                         "data": rows})
+
+        if url.path == "/bbox":
+            try:
+                model = params["model"][0].upper()
+                forecast_hour = int(params["fh"][0])
+                bbox = tuple(float(params[k][0]) for k in ("lat_min", "lat_max", "lon_min", "lon_max"))
+            except (KeyError, ValueError):
+                return self._send_json(400, {"error": "model, fh, lat_min, lat_max, lon_min and lon_max are required"})
+            if model not in MODEL_FOLDERS:
+                return self._send_json(400, {"error": f"unknown model {model}"})
+
+            file_path = find_forecast_file(model, forecast_hour, derived=params.get("derived", ["0"])[0] == "1")
+            if file_path is None:
+                return self._send_json(404, {"error": f"no {model} file for forecast hour {forecast_hour}"})
+
+            t0 = time.time()
+            try:
+                subgrid = extract_bbox(file_path, bbox, keywords=params.get("var"))
+            except Exception as e:
+                logger.exception(f"Bounding-box extraction failed for {file_path.name}: {e}")
+                return self._send_json(500, {"error": str(e)})
+            if subgrid is None:
+                return self._send_json(404, {"error": "bounding box does not intersect the grid"})
+            logger.info(f"Extracted {subgrid['shape']} window from {file_path.name} in {time.time() - t0:.2f}s")
+            return self._send_json(200, {"model": model, "fh": forecast_hour, **subgrid_payload(subgrid)})
+
+        return self._send_json(404, {"error": f"unknown path {url.path}"})
+
+    def _get_tile(self, path, derived=False):
+        m = re.fullmatch(r"/tiles/(\w+)/(\d+)/(\d+)/(\d+)/(\d+)/(\d+)\.png", path)
+        if not m:
+            return self._send_json(400, {"error": "expected /tiles/<model>/<fh>/<msgno>/<z>/<x>/<y>.png"})
+        model = m.group(1).upper()
+        forecast_hour, msgno, z, x, y = (int(v) for v in m.groups()[1:])
+        if model not in MODEL_FOLDERS:
+            return self._send_json(400, {"error": f"unknown model {model}"})
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return self._send_json(400, {"error": f"tile {z}/{x}/{y} out of range"})
+
+        file_path = find_forecast_file(model, forecast_hour, derived=derived)
+        if file_path is None:
+            return self._send_json(404, {"error": f"no {model} file for forecast hour {forecast_hour}"})
+        try:
+            png = render_tile(model, file_path, msgno, z, x, y)
+        except Exception as e:
+            logger.exception(f"Tile {z}/{x}/{y} of {file_path.name} message {msgno} failed: {e}")
+            return self._send_json(500, {"error": str(e)})
+        return self._send_png(png)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+    """Starts the worker pool and serves requests until interrupted."""
+    global POOL, POOL_SIZE
+    POOL_SIZE = workers or max(1, cpu_count() - 1)
+    POOL = Pool(processes=POOL_SIZE, initializer=enable_handle_cache)
+
+    server = ThreadingHTTPServer((host, port), ExtractionHandler)
+    logger.info(f"GRIB extraction service on http://{host}:{port} ({POOL_SIZE} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        POOL.terminate()
+        POOL.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident GRIB point extraction service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# grib_subgrid.py (bounding-box extraction for map / area views)
+"""
+Extracts the sub-grid of a GRIB file that covers a lat/lon bounding box.
+
+The index window for a bbox is computed once per grid (GridGeometry.window)
+and every decoded field is cropped to that window immediately, so only the
+cropped float32 array is kept per message. Coordinates are returned as the
+grid's projected affine transform when pyproj is available (a handful of
+numbers instead of two full lat/lon arrays), otherwise as cropped lat/lon
+arrays.
+
+    python grib_subgrid.py FILE LAT_MIN LAT_MAX LON_MIN LON_MAX [--var precip]
+"""
+import argparse
+import base64
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+from grib_data_to_json import DERIVED_FOLDERS, MODEL_FOLDERS, is_interesting_message, list_grib_files, open_grib
+from grib_metadata import describe_message
+from grid_geometry import geometry_for_message
+
+
+def find_forecast_file(model, forecast_hour, derived=False):
+    """
+    Returns the model's GRIB file for a forecast hour (fNN / fNNN in the name),
+    or None. derived=True looks in the derived-products folder instead.
+    """
+    folder = DERIVED_FOLDERS[model] if derived else MODEL_FOLDERS[model]
+    for file_path in map(Path, list_grib_files(folder)):
+        m = re.search(r'f(\d{2,3})', file_path.name.lower())
+        if m and int(m.group(1)) == int(forecast_hour):
+            return file_path
+    return None
+
+
+def crop(values, window, dtype=np.float32):
+    """Crops a decoded field to window, filling masked points with NaN."""
+    row0, row1, col0, col1 = window
+    part = values[row0:row1, col0:col1]
+    if np.ma.isMaskedArray(part):
+        part = part.astype(dtype).filled(np.nan)
+    return np.asarray(part, dtype=dtype)
+
+
+def extract_bbox(file_path, bbox, keywords=None, coords="affine", dtype=np.float32):
+    """
+    Extracts every probability message of file_path (optionally only those
+    matching keywords) cropped to bbox = (lat_min, lat_max, lon_min, lon_max).
+    Returns {"window", "shape", "coords", "messages"} where each message is
+    {"msgno", "name", "threshold", "forecast_time", "values"}, or None if the
+    bbox does not intersect the grid.
+    """
+    keywords_lower = [k.lower() for k in keywords] if keywords else None
+    window = None
+    geometry = None
+    messages = []
+
+    with open_grib(Path(file_path)) as grbs:
+        for grb in grbs:
+            if keywords_lower and not is_interesting_message(grb, keywords_lower):
+                continue
+            try:
+                descriptor = describe_message(grb)
+            except Exception:
+                continue
+            if not descriptor.is_probability:
+                continue
+
+            if geometry is None:
+                geometry = geometry_for_message(grb)
+                window = geometry.window(bbox)
+                if window is None:
+                    return None
+
+            messages.append({
+                "msgno": grb.messagenumber,
+                "name": descriptor.name,
+                "threshold": descriptor.threshold_text,
+                "forecast_time": grb.forecastTime,
+                "values": crop(grb.values, window, dtype),
+            })
+
+    if geometry is None:
+        return None
+
+    row0, row1, col0, col1 = window
+    affine = geometry.affine() if coords == "affine" else None
+    if affine is not None:
+        coord_data = {
+            "type": "affine",
+            "crs": affine["crs"],
+            "x0": affine["x0"] + col0 * affine["dx"],
+            "y0": affine["y0"] + row0 * affine["dy"],
+            "dx": affine["dx"],
+            "dy": affine["dy"],
+        }
+    else:
+        coord_data = {
+            "type": "latlon",
+            "lats": crop(geometry.lats, window, dtype),
+            "lons": crop(geometry.lons_180, window, dtype),
+        }
+
+    return {
+        "window": window,
+        "shape": (row1 - row0, col1 - col0),
+        "coords": coord_data,
+        "messages": messages,
+    }
+
+
+def encode_array(values):
+    """Packs a float32 array as {"dtype", "shape", "b64"} for JSON transport."""
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    return {"dtype": "float32", "shape": list(values.shape), "b64": base64.b64encode(values.tobytes()).decode("ascii")}
+
+
+def decode_array(payload):
+    """Inverse of encode_array."""
+    raw = base64.b64decode(payload["b64"])
+    return np.frombuffer(raw, dtype=payload["dtype"]).reshape(payload["shape"])
+
+
+def subgrid_payload(subgrid):
+    """JSON-safe form of an extract_bbox result (arrays base64-encoded)."""
+    coords = dict(subgrid["coords"])
+    for key in ("lats", "lons"):
+        if key in coords:
+            coords[key] = encode_array(coords[key])
+    return {
+        "window": list(subgrid["window"]),
+        "shape": list(subgrid["shape"]),
+        "coords": coords,
+        "messages": [{**msg, "values": encode_array(msg["values"])} for msg in subgrid["messages"]],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract a bounding-box sub-grid from a GRIB file")
+    parser.add_argument("file")
+    parser.add_argument("lat_min", type=float)
+    parser.add_argument("lat_max", type=float)
+    parser.add_argument("lon_min", type=float)
+    parser.add_argument("lon_max", type=float)
+    parser.add_argument("--var", action="append", help="only messages whose name contains VAR")
+    parser.add_argument("--coords", choices=["affine", "latlon"], default="affine")
+    args = parser.parse_args()
+
+    subgrid = extract_bbox(args.file, (args.lat_min, args.lat_max, args.lon_min, args.lon_max),
+                           keywords=args.var, coords=args.coords)
+    if subgrid is None:
+        print("Bounding box does not intersect the grid")
+    else:
+        print(json.dumps({
+            "window": subgrid["window"],
+            "shape": subgrid["shape"],
+            "coords": {k: v for k, v in subgrid["coords"].items() if k not in ("lats", "lons")},
+            "messages": [f"{m['msgno']}: {m['name']} {m['threshold']} (max {np.nanmax(m['values']):.3f})"
+                         for m in subgrid["messages"]],
+        }, indent=2))
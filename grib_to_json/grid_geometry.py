@@ -0,0 +1,285 @@
+import hashlib
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    import pyproj
+except ImportError:
+    pyproj = None
+
+# Keys used to identify a grid when md5Section3 is unavailable (e.g. GRIB1)
+GRID_KEYS = (
+    "gridType",
+    "Ni",
+    "Nj",
+    "latitudeOfFirstGridPointInDegrees",
+    "longitudeOfFirstGridPointInDegrees",
+    "DxInMetres",
+    "DyInMetres",
+    "iDirectionIncrementInDegrees",
+    "jDirectionIncrementInDegrees",
+)
+
+MAX_NEAREST_CACHE = 4096
+MAX_WINDOW_CACHE = 256
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres between two lat/lon points."""
+    lat1, lon1, lat2, lon2 = np.radians([lat1, lon1, lat2, lon2])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return float(2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a)))
+
+
+class GridGeometry:
+    """Lat/lon geometry of one GRIB grid, shared by every message on that grid."""
+
+    def __init__(self, grid_id, lats, lons, projparams=None, shared=False):
+        self.grid_id = grid_id
+        self.lats = lats
+        self.lons = lons
+        self.shape = lats.shape
+        self.projparams = projparams
+        # lats/lons are views of SharedGeometries segments (see attach_geometries)
+        self.shared = shared
+        self._nearest = {}
+        self._windows = {}
+        self._lons_180 = None
+        self._affine = None
+
+    def nearest_index(self, lat, lon):
+        """Returns the (row, col) of the grid point closest to lat/lon."""
+        key = (float(lat), float(lon))
+        index = self._nearest.get(key)
+        if index is None:
+            dist = (self.lats - lat) ** 2 + (self.lons - lon) ** 2
+            row, col = np.unravel_index(np.argmin(dist), dist.shape)
+            index = (int(row), int(col))
+            if len(self._nearest) >= MAX_NEAREST_CACHE:
+                self._nearest.clear()
+            self._nearest[key] = index
+        return index
+
+    def cell(self, row, col):
+        """
+        Describes the grid cell at (row, col) as {"grid_id", "i", "j", "lat",
+        "lon", "radius_m"}: its center point (lon in [-180, 180)) and the
+        half-diagonal to the neighbouring grid points, i.e. how far a point
+        can be from the center and still resolve to this cell.
+        """
+        lat = float(self.lats[row, col])
+        lon = float(self.lons_180[row, col])
+        # one-sided differences at the grid edges
+        r2 = row + 1 if row + 1 < self.shape[0] else row - 1
+        c2 = col + 1 if col + 1 < self.shape[1] else col - 1
+        dx = haversine_m(lat, lon, self.lats[row, c2], self.lons_180[row, c2])
+        dy = haversine_m(lat, lon, self.lats[r2, col], self.lons_180[r2, col])
+        return {"grid_id": self.grid_id, "i": int(row), "j": int(col),
+                "lat": round(lat, 5), "lon": round(lon, 5), "radius_m": round(0.5 * float(np.hypot(dx, dy)), 1)}
+
+    @property
+    def lons_180(self):
+        """Longitudes normalized to [-180, 180)."""
+        if self._lons_180 is None:
+            self._lons_180 = ((self.lons + 180.0) % 360.0) - 180.0
+        return self._lons_180
+
+    def window(self, bbox):
+        """
+        Returns (row0, row1, col0, col1), the smallest index window containing
+        every grid point inside bbox = (lat_min, lat_max, lon_min, lon_max),
+        or None if no grid point falls inside it.
+        """
+        bbox = tuple(float(v) for v in bbox)
+        if bbox in self._windows:
+            return self._windows[bbox]
+
+        lat_min, lat_max, lon_min, lon_max = bbox
+        lons = self.lons_180
+        inside = (self.lats >= lat_min) & (self.lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+        rows = np.flatnonzero(inside.any(axis=1))
+        cols = np.flatnonzero(inside.any(axis=0))
+        window = None
+        if rows.size and cols.size:
+            window = (int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1)
+
+        if len(self._windows) >= MAX_WINDOW_CACHE:
+            self._windows.clear()
+        self._windows[bbox] = window
+        return window
+
+    def affine(self):
+        """
+        Returns the grid's projected affine transform as a dict
+        {"crs", "x0", "y0", "dx", "dy"} (x = x0 + col*dx, y = y0 + row*dy),
+        or None when pyproj or the projection parameters are unavailable.
+        """
+        if self._affine is None and pyproj is not None and self.projparams:
+            try:
+                proj = pyproj.Proj(self.projparams)
+                x, y = proj(self.lons[:2, :2], self.lats[:2, :2])
+                self._affine = {
+                    "crs": proj.srs,
+                    "x0": float(x[0, 0]),
+                    "y0": float(y[0, 0]),
+                    "dx": float(x[0, 1] - x[0, 0]),
+                    "dy": float(y[1, 0] - y[0, 0]),
+                }
+            except Exception:
+                self._affine = None
+        return self._affine
+
+
+_GEOMETRY_CACHE = {}
+# SharedMemory handles attached in this process (kept alive with the arrays)
+_ATTACHED = []
+
+
+def grid_id_for_message(grb):
+    """Returns a short stable id for the grid a message is defined on."""
+    try:
+        return str(grb["md5Section3"])[:16]
+    except Exception:
+        values = []
+        for key in GRID_KEYS:
+            try:
+                values.append(grb[key])
+            except Exception:
+                values.append(None)
+        return hashlib.md5(repr(values).encode()).hexdigest()[:16]
+
+
+def cached_geometry(grid_id):
+    """The GridGeometry already built (or attached) in this process for grid_id, or None."""
+    return _GEOMETRY_CACHE.get(grid_id)
+
+
+def geometry_dtype(full_precision=None):
+    """Lat/lon dtype of geometries: float32 unless full_precision."""
+    return np.dtype(np.float64 if full_precision else np.float32)
+
+
+def geometry_for_message(grb, full_precision=None):
+    """
+    Returns the GridGeometry for a message's grid, building it once per grid
+    per process and reusing it for every later message/file on that grid.
+    full_precision: None reuses whatever is cached for the grid; True/False
+    makes sure the cached lats/lons are float64/float32. New geometries are
+    float32 unless full_precision, the same arrays SharedGeometries hands
+    pool workers, so a parent and its workers resolve points identically.
+    """
+    grid_id = grid_id_for_message(grb)
+    geometry = _GEOMETRY_CACHE.get(grid_id)
+    dtype = geometry_dtype(full_precision)
+    if geometry is not None and (full_precision is None or geometry.lats.dtype == dtype):
+        return geometry
+    if geometry is not None and geometry.lats.dtype.itemsize >= dtype.itemsize:
+        lats, lons = geometry.lats, geometry.lons
+    else:
+        try:
+            lats, lons = grb.latlons()
+        except Exception:
+            _, lats, lons = grb.data()
+    geometry = GridGeometry(grid_id, lats.astype(dtype, copy=False), lons.astype(dtype, copy=False),
+                            getattr(grb, "projparams", None))
+    _GEOMETRY_CACHE[grid_id] = geometry
+    return geometry
+
+
+class SharedGeometry(NamedTuple):
+    """Picklable description of a geometry placed in shared memory."""
+    grid_id: str
+    shape: tuple
+    dtype: str
+    lats_name: str
+    lons_name: str
+    projparams: object
+
+
+class SharedGeometries:
+    """
+    Parent-side owner of geometry segments. Each GridGeometry's lats/lons are
+    copied once into multiprocessing.shared_memory (float32 unless
+    full_precision), and workers attach to them instead of building their own
+    copies. Use as a context manager; segments are unlinked on exit.
+    """
+
+    def __init__(self, full_precision=False):
+        self.full_precision = full_precision
+        self.dtype = geometry_dtype(full_precision)
+        self.descriptors = []
+        self._segments = []
+
+    def add(self, geometry):
+        if any(d.grid_id == geometry.grid_id for d in self.descriptors):
+            return
+        self._create(geometry.grid_id, geometry.lats, geometry.lons, geometry.projparams)
+
+    def add_message(self, grb):
+        """
+        Shares the grid of a pygrib message, copying this process's cached
+        geometry when there is one and otherwise decoding it without caching.
+        """
+        grid_id = grid_id_for_message(grb)
+        if any(d.grid_id == grid_id for d in self.descriptors):
+            return
+        geometry = _GEOMETRY_CACHE.get(grid_id)
+        if geometry is not None:
+            self.add(geometry)
+            return
+        try:
+            lats, lons = grb.latlons()
+        except Exception:
+            _, lats, lons = grb.data()
+        self._create(grid_id, lats, lons, getattr(grb, "projparams", None))
+
+    def _create(self, grid_id, lats, lons, projparams):
+        names = []
+        for array in (lats, lons):
+            segment = shared_memory.SharedMemory(create=True, size=array.size * self.dtype.itemsize)
+            np.ndarray(array.shape, dtype=self.dtype, buffer=segment.buf)[...] = array
+            self._segments.append(segment)
+            names.append(segment.name)
+        self.descriptors.append(SharedGeometry(
+            grid_id, tuple(lats.shape), self.dtype.str, names[0], names[1], projparams
+        ))
+
+    def nbytes(self):
+        return sum(segment.size for segment in self._segments)
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments = []
+        self.descriptors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_geometries(descriptors):
+    """
+    Worker side: registers shared geometries so geometry_for_message reuses
+    them. They replace any geometry already cached for the grid, e.g. the
+    parent's private copy inherited by a forked worker.
+    """
+    for d in descriptors or ():
+        cached = _GEOMETRY_CACHE.get(d.grid_id)
+        if cached is not None and cached.shared:
+            continue
+        arrays = []
+        for name in (d.lats_name, d.lons_name):
+            segment = shared_memory.SharedMemory(name=name)
+            _ATTACHED.append(segment)
+            arrays.append(np.ndarray(d.shape, dtype=np.dtype(d.dtype), buffer=segment.buf))
+        _GEOMETRY_CACHE[d.grid_id] = GridGeometry(d.grid_id, arrays[0], arrays[1], d.projparams, shared=True)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# message_catalog.py (persistent per-folder message index)
+"""
+Header-only index of every message in a download folder.
+
+Each entry records (file, message number, cfVarName, limits, startStep,
+endStep, analDate). The catalog is saved under catalog/<folder>.json and
+refreshed per file by size/mtime, so it is built once per download and
+later queries by variable, threshold, window length and valid time resolve
+to exact (file, msgno) pairs without decoding any field.
+
+    python message_catalog.py FOLDER [--var tp] [--upper 12.7] [--length 1] [--start 2025-10-17T14:00]
+"""
+import argparse
+import json
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import pygrib
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CATALOG_DIR = SCRIPT_DIR / "catalog"
+CATALOG_VERSION = 1
+
+
+class CatalogEntry(NamedTuple):
+    """One message of one GRIB file."""
+    file: str
+    msgno: int
+    cf_var_name: Optional[str]
+    short_name: Optional[str]
+    lower_limit: Optional[float]
+    upper_limit: Optional[float]
+    start_step: Optional[int]
+    end_step: Optional[int]
+    anal_date: Optional[str]
+
+    @property
+    def forecast_length(self):
+        if self.start_step is None or self.end_step is None:
+            return None
+        return self.end_step - self.start_step
+
+    @property
+    def valid_start(self):
+        if self.anal_date is None or self.start_step is None:
+            return None
+        return datetime.fromisoformat(self.anal_date) + timedelta(hours=self.start_step)
+
+
+def _key(grb, name):
+    try:
+        if grb.has_key(name) and not grb.is_missing(name):
+            return grb[name]
+    except Exception:
+        pass
+    return None
+
+
+def scan_file(file_path):
+    """Reads the headers of every message in file_path (no field is decoded)."""
+    entries = []
+    with pygrib.open(str(file_path)) as grbs:
+        for grb in grbs:
+            lower = _key(grb, "lowerLimit")
+            upper = _key(grb, "upperLimit")
+            anal_date = getattr(grb, "analDate", None)
+            entries.append(CatalogEntry(
+                file=str(file_path),
+                msgno=grb.messagenumber,
+                cf_var_name=_key(grb, "cfVarName"),
+                short_name=_key(grb, "shortName"),
+                lower_limit=float(lower) if lower is not None else None,
+                upper_limit=float(upper) if upper is not None else None,
+                start_step=_key(grb, "startStep"),
+                end_step=_key(grb, "endStep"),
+                anal_date=anal_date.isoformat() if anal_date is not None else None,
+            ))
+    return entries
+
+
+def _same_limit(actual, wanted):
+    return actual is not None and math.isclose(actual, wanted, rel_tol=1e-6, abs_tol=1e-9)
+
+
+class MessageCatalog:
+    """Entries of one folder, indexed by variable name."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self._by_var = defaultdict(list)
+        for entry in entries:
+            self._by_var[entry.cf_var_name].append(entry)
+            if entry.short_name != entry.cf_var_name:
+                self._by_var[entry.short_name].append(entry)
+
+    def find(self, var, upper_limit=None, lower_limit=None, forecast_length=None, valid_start=None):
+        """Returns the entries of variable `var` matching every given criterion."""
+        matches = []
+        for entry in self._by_var.get(var, ()):
+            if upper_limit is not None and not _same_limit(entry.upper_limit, upper_limit):
+                continue
+            if lower_limit is not None and not _same_limit(entry.lower_limit, lower_limit):
+                continue
+            if forecast_length is not None and entry.forecast_length != forecast_length:
+                continue
+            if valid_start is not None and entry.valid_start != valid_start:
+                continue
+            matches.append(entry)
+        return matches
+
+    def by_file(self, entries):
+        """Groups entries as {file: [msgno, ...]} so each file is opened once."""
+        grouped = defaultdict(list)
+        for entry in entries:
+            grouped[entry.file].append(entry.msgno)
+        return dict(grouped)
+
+
+def catalog_path(folder):
+    folder = Path(folder).resolve()
+    return CATALOG_DIR / f"{folder.parent.name}_{folder.name}.json"
+
+
+def load_catalog(folder):
+    """
+    Returns the MessageCatalog of folder, rescanning only files that are new
+    or changed (size/mtime) since the saved catalog and dropping deleted ones.
+    """
+    folder = Path(folder)
+    path = catalog_path(folder)
+    try:
+        saved = json.loads(path.read_text(encoding="utf-8"))
+        if saved.get("version") != CATALOG_VERSION:
+            saved = {}
+    except (OSError, ValueError):
+        saved = {}
+    saved_files = saved.get("files", {})
+
+    files = {}
+    changed = False
+    file_paths = sorted(p for p in folder.iterdir() if p.is_file()) if folder.is_dir() else []
+    for file_path in file_paths:
+        stat = file_path.stat()
+        signature = [stat.st_size, stat.st_mtime_ns]
+        record = saved_files.get(str(file_path))
+        if record is None or record["signature"] != signature:
+            try:
+                entries = scan_file(file_path)
+            except Exception:
+                continue
+            record = {"signature": signature, "entries": [list(e) for e in entries]}
+            changed = True
+        files[str(file_path)] = record
+
+    if changed or len(files) != len(saved_files):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".part")
+        tmp.write_text(json.dumps({"version": CATALOG_VERSION, "folder": str(folder), "files": files}),
+                       encoding="utf-8")
+        tmp.replace(path)
+
+    entries = [CatalogEntry(*row) for record in files.values() for row in record["entries"]]
+    return MessageCatalog(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build / query the message catalog of a GRIB folder")
+    parser.add_argument("folder")
+    parser.add_argument("--var", help="cfVarName or shortName, e.g. tp")
+    parser.add_argument("--upper", type=float, default=None)
+    parser.add_argument("--lower", type=float, default=None)
+    parser.add_argument("--length", type=int, default=None, help="window length in hours")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None, help="valid start time")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.folder)
+    print(f"{len(catalog.entries)} messages catalogued")
+    if args.var:
+        for entry in catalog.find(args.var, args.upper, args.lower, args.length, args.start):
+            print(f"{Path(entry.file).name} #{entry.msgno}: {entry.cf_var_name} "
+                  f"[{entry.lower_limit}, {entry.upper_limit}] {entry.start_step}-{entry.end_step}h")
@@ -0,0 +1,302 @@
+"""
+Sinks that receive extracted rows as they come out of the worker pool, so a
+conversion can go straight into MongoDB without an intermediate JSON file.
+
+    MongoSink  - one bucket document per grid cell, model and cycle in
+                 ModelData.point_buckets (needs pymongo); layout="rows" keeps
+                 the old one-document-per-row upserts into ModelData.points
+    MemorySink - in-process stand-in with the same layouts and upsert semantics, for tests
+    StreamSink - NDJSON events on stdout or a TCP socket, one "rows" event per
+                 extracted file plus "progress" events, for progressive callers
+
+Rows upsert on UNIQUE_KEY and buckets are replaced on BUCKET_KEY, so
+re-running a point never duplicates rows; StreamSink leaves de-duplication
+to the consumer.
+
+A bucket holds a model's whole output for one grid cell as parallel arrays
+(threshold_id, forecast_time, step_length, value) plus a `thresholds`
+dictionary of distinct (threshold, name) pairs, ordered by name then
+forecast time, so a read is one document instead of hundreds. It is keyed
+on the cell (grid_id, i, j) the request resolved to, and carries the cell
+center as lat/lon and as a GeoJSON `location` (2dsphere-indexed) with the
+cell's radius_m, so a lookup for any point inside a stored cell is one
+$geoNear seek. Row documents carry the same cell in a `cell` field.
+"""
+import json
+import os
+import socket
+import sys
+import threading
+from pathlib import Path
+
+from output_writers import HEADERS
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_ENV = SCRIPT_DIR.parent / "cinder-app" / "backend" / ".env"
+
+DEFAULT_MONGO_URI = "mongodb://127.0.0.1:27017/ModelData"
+DEFAULT_BATCH_SIZE = 1000
+
+# (model, cycle, lat, lon, name, threshold, forecast_time, step_length)
+UNIQUE_KEY = ("sitrep", "anal_date", "lat", "lon", "name", "threshold", "forecast_time", "step_length")
+# one bucket per (model, cycle, grid cell)
+BUCKET_KEY = ("sitrep", "anal_date", "grid_id", "i", "j")
+CELL_FIELDS = ("grid_id", "i", "j", "lat", "lon", "radius_m")
+
+
+def load_mongo_uri():
+    """MONGO_URI from the environment, else from the backend's .env, else the local default."""
+    uri = os.environ.get("MONGO_URI")
+    if uri:
+        return uri
+    try:
+        for line in BACKEND_ENV.read_text(encoding="utf-8").splitlines():
+            key, _, value = line.partition("=")
+            if key.strip() == "MONGO_URI":
+                return value.strip().strip('"').strip("'")
+    except OSError:
+        pass
+    return DEFAULT_MONGO_URI
+
+
+def rows_to_docs(rows, sitrep, anal_date, lat, lon, cell=None):
+    """
+    Builds point documents (same shape json-to-mongodb.js inserts) from row
+    tuples; cell is the output metadata "cell" of the grid cell lat/lon resolved to.
+    """
+    anal_date_str = anal_date.strftime("%Y-%m-%d %H:%M:%S") if anal_date else "unknown"
+    docs = []
+    for row in rows:
+        doc = dict(zip(HEADERS, row))
+        doc["lat"] = lat
+        doc["lon"] = lon
+        doc["sitrep"] = sitrep
+        doc["anal_date"] = anal_date_str
+        if cell is not None:
+            doc["cell"] = cell
+        docs.append(doc)
+    return docs
+
+
+def output_to_docs(output_data):
+    """Builds point documents from a finished output document."""
+    meta = output_data["metadata"]
+    location = meta["location"]
+    extra = {"cell": meta["cell"]} if meta.get("cell") else {}
+    return [
+        dict(row, lat=location["lat"], lon=location["lon"], sitrep=meta["sitrep"], anal_date=meta["anal_date"],
+             **extra)
+        for row in output_data["data"]
+    ]
+
+
+def output_to_bucket(output_data):
+    """
+    Builds the bucket document of a finished output document (see module
+    docstring). The output must carry its resolved grid cell (metadata["cell"]).
+    """
+    meta = output_data["metadata"]
+    cell = meta.get("cell")
+    if not cell:
+        raise ValueError(f"{meta['sitrep']} output has no resolved grid cell; cannot bucket it")
+    rows = sorted(output_data["data"], key=lambda r: (r["name"], r["forecast_time"], r["threshold"]))
+
+    thresholds = {}
+    bucket = {
+        "sitrep": meta["sitrep"],
+        "anal_date": meta["anal_date"],
+        **{k: cell[k] for k in CELL_FIELDS},
+        "location": {"type": "Point", "coordinates": [cell["lon"], cell["lat"]]},
+        "thresholds": [],
+        "threshold_id": [],
+        "forecast_time": [],
+        "step_length": [],
+        "value": [],
+    }
+    for row in rows:
+        pair = (row["threshold"], row["name"])
+        if pair not in thresholds:
+            thresholds[pair] = len(thresholds)
+            bucket["thresholds"].append({"threshold": pair[0], "name": pair[1]})
+        bucket["threshold_id"].append(thresholds[pair])
+        bucket["forecast_time"].append(row["forecast_time"])
+        bucket["step_length"].append(row["step_length"])
+        bucket["value"].append(row["value"])
+    bucket["count"] = len(rows)
+    return bucket
+
+
+def bucket_to_docs(bucket):
+    """Expands a bucket back into per-row point documents (lat/lon = cell center)."""
+    base = {"sitrep": bucket["sitrep"], "anal_date": bucket["anal_date"], "lat": bucket["lat"],
+            "lon": bucket["lon"], "cell": {k: bucket[k] for k in CELL_FIELDS}}
+    return [
+        dict(base, **bucket["thresholds"][tid], forecast_time=ft, step_length=sl, value=v)
+        for tid, ft, sl, v in zip(bucket["threshold_id"], bucket["forecast_time"],
+                                  bucket["step_length"], bucket["value"])
+    ]
+
+
+def doc_key(doc):
+    return tuple(doc.get(k) for k in UNIQUE_KEY)
+
+
+class MemorySink:
+    """
+    In-process stand-in for MongoSink with the same layouts and upsert
+    behaviour: buckets replaced on BUCKET_KEY (default) or rows upserted on
+    UNIQUE_KEY.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, layout="bucket"):
+        if layout not in ("bucket", "rows"):
+            raise ValueError(f"Unknown layout: {layout} (choose from bucket, rows)")
+        self.bucketed = layout == "bucket"
+        self.batch_size = batch_size
+        self.docs = {}
+        self.buckets = {}
+        self.batches = 0
+
+    def write(self, docs):
+        if self.bucketed:
+            raise TypeError("bucket-layout MemorySink takes whole outputs via write_output()")
+        for start in range(0, len(docs), self.batch_size):
+            for doc in docs[start:start + self.batch_size]:
+                self.docs[doc_key(doc)] = dict(doc)
+            self.batches += 1
+        return len(docs)
+
+    def write_output(self, output_data):
+        if not self.bucketed:
+            return self.write(output_to_docs(output_data))
+        bucket = output_to_bucket(output_data)
+        self.buckets[tuple(bucket[k] for k in BUCKET_KEY)] = bucket
+        self.batches += 1
+        return bucket["count"]
+
+    def close(self):
+        pass
+
+
+class MongoSink:
+    """
+    Writes into MongoDB. In the default bucket layout run_all_models hands
+    over one finished output per model (write_output) and it is stored as a
+    single bucket document; in the row layout rows are streamed in as
+    unordered bulk upserts as each file finishes.
+    """
+
+    def __init__(self, uri=None, db_name=None, collection=None, batch_size=DEFAULT_BATCH_SIZE, layout="bucket"):
+        try:
+            from pymongo import MongoClient, ReplaceOne, UpdateOne
+        except ImportError as e:
+            raise ImportError("MongoSink needs pymongo (pip install pymongo)") from e
+        if layout not in ("bucket", "rows"):
+            raise ValueError(f"Unknown layout: {layout} (choose from bucket, rows)")
+
+        self._update_one = UpdateOne
+        self._replace_one = ReplaceOne
+        self.bucketed = layout == "bucket"
+        self.client = MongoClient(uri or load_mongo_uri())
+        db = self.client[db_name] if db_name else self.client.get_default_database("ModelData")
+        self.collection = db[collection or ("point_buckets" if self.bucketed else "points")]
+        self.batch_size = batch_size
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        if self.bucketed:
+            self.collection.create_index([(k, 1) for k in BUCKET_KEY], unique=True, name="bucket_cell")
+            self.collection.create_index([("location", "2dsphere")], name="bucket_geo")
+        else:
+            self.collection.create_index([(k, 1) for k in UNIQUE_KEY], unique=True, name="point_row_key")
+            self.collection.create_index(
+                [("sitrep", 1), ("anal_date", 1), ("cell.grid_id", 1), ("cell.i", 1), ("cell.j", 1)],
+                name="point_cell"
+            )
+
+    def write_output(self, output_data):
+        """Stores one model's finished output (a bucket, or its rows in the row layout)."""
+        if not self.bucketed:
+            return self.write(output_to_docs(output_data))
+        bucket = output_to_bucket(output_data)
+        self.collection.bulk_write(
+            [self._replace_one({k: bucket[k] for k in BUCKET_KEY}, bucket, upsert=True)], ordered=False
+        )
+        return bucket["count"]
+
+    def write(self, docs):
+        if self.bucketed:
+            raise TypeError("bucket-layout MongoSink takes whole outputs via write_output()")
+        written = 0
+        for start in range(0, len(docs), self.batch_size):
+            batch = docs[start:start + self.batch_size]
+            ops = [
+                self._update_one({k: doc.get(k) for k in UNIQUE_KEY}, {"$set": doc}, upsert=True)
+                for doc in batch
+            ]
+            result = self.collection.bulk_write(ops, ordered=False)
+            written += result.upserted_count + result.modified_count
+        return written
+
+    def close(self):
+        self.client.close()
+
+
+class StreamSink:
+    """
+    Emits one NDJSON event per line as results arrive:
+
+        {"type": "rows", "sitrep": "HREF", "docs": [...]}
+        {"type": "progress", "done": 3, "total": 48, "percent": 6.3, "model": "HREF", "forecast_hour": 2}
+        {"type": "done", "rows": 1234}
+
+    target is None/"-" for stdout or "host:port" for a TCP connection.
+    Each event is flushed immediately so the reader sees it right away.
+    """
+
+    bucketed = False
+
+    def __init__(self, target=None):
+        self._lock = threading.Lock()
+        self._socket = None
+        if target in (None, "-"):
+            self._out = sys.stdout.buffer
+        else:
+            host, _, port = target.rpartition(":")
+            self._socket = socket.create_connection((host or "127.0.0.1", int(port)))
+            self._out = self._socket.makefile("wb")
+        self.rows = 0
+
+    def _emit(self, event):
+        with self._lock:
+            self._out.write(json.dumps(event, separators=(",", ":")).encode() + b"\n")
+            self._out.flush()
+
+    def write(self, docs):
+        if docs:
+            self._emit({"type": "rows", "sitrep": docs[0].get("sitrep"), "docs": docs})
+            self.rows += len(docs)
+        return len(docs)
+
+    def write_output(self, output_data):
+        return self.write(output_to_docs(output_data))
+
+    def progress(self, done, total, **info):
+        percent = round(100.0 * done / total, 1) if total else 100.0
+        self._emit({"type": "progress", "done": done, "total": total, "percent": percent, **info})
+
+    def close(self):
+        self._emit({"type": "done", "rows": self.rows})
+        if self._socket is not None:
+            self._out.close()
+            self._socket.close()
+
+
+SINKS = {"mongo": MongoSink, "memory": MemorySink, "stream": StreamSink}
+
+
+def open_sink(name, **options):
+    """Creates a sink by name ('mongo', 'memory' or 'stream'); options go to its constructor."""
+    if name not in SINKS:
+        raise ValueError(f"Unknown sink: {name} (choose from {', '.join(SINKS)})")
+    return SINKS[name](**options)
@@ -0,0 +1,296 @@
+"""
+Pluggable writers for point-extraction output documents.
+
+Every writer takes the {"metadata": ..., "data": [row, ...]} document built by
+grib_data_to_json.build_output_data and writes it to a path:
+
+    json      - json.dump(indent=2), the original layout
+    orjson    - same layout, compact, serialized with orjson
+    columnar  - dictionary-encoded columns (threshold/name stored once), JSON
+    ndjson    - one {"metadata": ...} line followed by one line per row, so
+                readers can stream records (see forecast_json_parser.py)
+    msgpack   - columnar layout as MessagePack (needs msgpack)
+    parquet   - columnar layout as Parquet with dictionary columns (needs pyarrow)
+
+Every reader returns the row-oriented document again, so benchmark parse
+times compare the same work. Only the .json formats (json, orjson,
+columnar) can be loaded by the backend's json-to-mongodb.js; the others
+are for the direct sinks' consumers and benchmarking.
+
+Run `python output_writers.py <output.json>` to benchmark every available
+writer on an existing output file.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+HEADERS = ["threshold", "name", "step_length", "forecast_time", "value"]
+DICTIONARY_COLUMNS = ("threshold", "name")
+
+DEFAULT_OUTPUT_FORMAT = "orjson" if orjson is not None else "json"
+
+# format name -> {"extension", "write", "read", "available"}
+WRITERS = {}
+
+
+def register_writer(name, extension, available=True):
+    """Decorator that registers a writer under a format name."""
+    def decorator(writer):
+        WRITERS[name] = {"extension": extension, "write": writer, "read": None, "available": available}
+        return writer
+    return decorator
+
+
+def register_reader(name):
+    """Decorator that registers the matching reader used for benchmarking."""
+    def decorator(reader):
+        WRITERS[name]["read"] = reader
+        return reader
+    return decorator
+
+
+def available_formats():
+    return [name for name, entry in WRITERS.items() if entry["available"]]
+
+
+def importable_formats():
+    """Formats the backend importer (cinder-app/backend/json-to-mongodb.js, *.json only) can load."""
+    return [name for name, entry in WRITERS.items() if entry["extension"] == ".json"]
+
+
+def to_columnar(output_data):
+    """
+    Converts row-oriented output to the dictionary-encoded columnar layout:
+    repeated strings are stored once in "dictionaries" and referenced by id.
+    """
+    rows = output_data["data"]
+    dictionaries = {col: [] for col in DICTIONARY_COLUMNS}
+    lookups = {col: {} for col in DICTIONARY_COLUMNS}
+    columns = {col: [] for col in HEADERS}
+
+    for row in rows:
+        for col in HEADERS:
+            value = row.get(col)
+            if col in lookups:
+                ids = lookups[col]
+                if value not in ids:
+                    ids[value] = len(dictionaries[col])
+                    dictionaries[col].append(value)
+                value = ids[value]
+            columns[col].append(value)
+
+    return {
+        "metadata": output_data["metadata"],
+        "layout": "columnar",
+        "dictionaries": dictionaries,
+        "columns": columns,
+    }
+
+
+def from_columnar(doc):
+    """Expands a columnar document back to the row-oriented layout."""
+    dictionaries = doc["dictionaries"]
+    columns = doc["columns"]
+    decoded = {
+        col: [dictionaries[col][i] for i in values] if col in dictionaries else values
+        for col, values in columns.items()
+    }
+    count = len(decoded[HEADERS[0]]) if decoded else 0
+    rows = [{col: decoded[col][i] for col in HEADERS} for i in range(count)]
+    return {"metadata": doc["metadata"], "data": rows}
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@register_writer("json", ".json")
+def write_json(output_data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+
+@register_reader("json")
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@register_writer("orjson", ".json", available=orjson is not None)
+def write_orjson(output_data, path):
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(output_data))
+
+
+@register_reader("orjson")
+def read_orjson(path):
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+@register_writer("columnar", ".json")
+def write_columnar(output_data, path):
+    with open(path, "wb") as f:
+        f.write(_dumps(to_columnar(output_data)))
+
+
+@register_reader("columnar")
+def read_columnar(path):
+    with open(path, "rb") as f:
+        return from_columnar(_loads(f.read()))
+
+
+@register_writer("ndjson", ".ndjson")
+def write_ndjson(output_data, path):
+    with open(path, "wb") as f:
+        f.write(_dumps({"metadata": output_data["metadata"]}) + b"\n")
+        for row in output_data["data"]:
+            f.write(_dumps(row) + b"\n")
+
+
+@register_reader("ndjson")
+def read_ndjson(path):
+    documents = list(iter_ndjson(path))
+    return documents[0] if len(documents) == 1 else documents
+
+
+def iter_ndjson(path):
+    """
+    Streams an NDJSON output file one line at a time, yielding one
+    {"metadata", "data"} document per metadata line (files may hold many points).
+    """
+    document = None
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = _loads(line)
+            if "metadata" in record:
+                if document is not None:
+                    yield document
+                document = {"metadata": record["metadata"], "data": []}
+            elif document is not None:
+                document["data"].append(record)
+    if document is not None:
+        yield document
+
+
+@register_writer("msgpack", ".msgpack", available=msgpack is not None)
+def write_msgpack(output_data, path):
+    with open(path, "wb") as f:
+        f.write(msgpack.packb(to_columnar(output_data), use_bin_type=True))
+
+
+@register_reader("msgpack")
+def read_msgpack(path):
+    with open(path, "rb") as f:
+        return from_columnar(msgpack.unpackb(f.read(), raw=False))
+
+
+@register_writer("parquet", ".parquet", available=pa is not None)
+def write_parquet(output_data, path):
+    rows = output_data["data"]
+    arrays = {col: [row.get(col) for row in rows] for col in HEADERS}
+    table = pa.table({
+        col: pa.array(values).dictionary_encode() if col in DICTIONARY_COLUMNS else pa.array(values)
+        for col, values in arrays.items()
+    })
+    table = table.replace_schema_metadata({"metadata": json.dumps(output_data["metadata"])})
+    pq.write_table(table, path)
+
+
+@register_reader("parquet")
+def read_parquet(path):
+    table = pq.read_table(path)
+    metadata = json.loads(table.schema.metadata[b"metadata"])
+    return {"metadata": metadata, "data": table.select(HEADERS).to_pylist()}
+
+
+def write_output(output_data, path, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Writes output_data with the named writer. Returns the path written."""
+    entry = WRITERS.get(output_format)
+    if entry is None:
+        raise ValueError(f"Unknown output format: {output_format} (choose from {', '.join(WRITERS)})")
+    if not entry["available"]:
+        raise ImportError(f"Output format '{output_format}' needs an optional dependency that is not installed")
+    path = Path(path).with_suffix(entry["extension"])
+    entry["write"](output_data, path)
+    return path
+
+
+def benchmark_writers(output_data, repeat=5, formats=None):
+    """
+    Times every available writer on output_data.
+    Returns a list of {"format", "write_ms", "size_bytes", "parse_ms"} (best of repeat).
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in formats or available_formats():
+            entry = WRITERS[name]
+            path = Path(tmp) / f"bench_{name}{entry['extension']}"
+
+            write_times, parse_times = [], []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                entry["write"](output_data, path)
+                write_times.append(time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                entry["read"](path)
+                parse_times.append(time.perf_counter() - t0)
+
+            results.append({
+                "format": name,
+                "write_ms": min(write_times) * 1000,
+                "size_bytes": os.path.getsize(path),
+                "parse_ms": min(parse_times) * 1000,
+            })
+    return results
+
+
+def print_benchmark(results):
+    print(f"{'format':<10} {'write ms':>10} {'size KB':>10} {'parse ms':>10}")
+    for r in results:
+        print(f"{r['format']:<10} {r['write_ms']:>10.2f} {r['size_bytes'] / 1024:>10.1f} {r['parse_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python output_writers.py <output.json>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "rb") as f:
+        sample = _loads(f.read())
+    if sample.get("layout") == "columnar":
+        sample = from_columnar(sample)
+
+    print_benchmark(benchmark_writers(sample))
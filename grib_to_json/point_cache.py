@@ -0,0 +1,262 @@
+"""
+Result cache keyed by grid cell instead of by exact lat/lon.
+
+Every request is first resolved to (model, cycle, grid id, i, j); two points
+that fall in the same grid cell share one extraction. Entries live in an
+in-memory LRU backed by a directory of JSON files, and both tiers drop a
+model's entries as soon as a newer cycle is observed for it.
+
+Concurrent misses on the same cell are single-flighted through a LeaseTable:
+the first caller creates an exclusive lease file and extracts, later callers
+(other threads or other processes) wait for the lease to go away and then
+read the entry it produced.
+"""
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+import pygrib
+
+from grid_geometry import cached_geometry, geometry_for_message
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CACHE_DIR = SCRIPT_DIR / "point_cache"
+MAX_MEMORY_ENTRIES = 2048
+# a lease older than this is treated as abandoned (longer than any full extraction)
+LEASE_TTL = 900
+LEASE_POLL = 0.25
+
+
+class CellKey(NamedTuple):
+    """Identifies one cached extraction: a grid cell of one model cycle."""
+    model: str
+    cycle: str
+    grid_id: str
+    i: int
+    j: int
+
+
+def resolve_cell(model, file_list, lat, lon, full_precision=None):
+    """
+    Resolves lat/lon to the CellKey of a model's grid using the first message
+    of the first file (geometry is cached per grid, so this is one header read).
+    full_precision: geometry precision to resolve in (see geometry_for_message);
+    pass the pool's setting so the key matches the cell the workers extract.
+    Returns None if the model has no readable files.
+    """
+    return resolve_cells(model, file_list, [(lat, lon)], full_precision)[0]
+
+
+def resolve_cells(model, file_list, points, full_precision=None):
+    """resolve_cell for many (lat, lon) points with a single file open."""
+    if not file_list:
+        return [None] * len(points)
+    try:
+        with pygrib.open(file_list[0]) as grbs:
+            first = grbs.message(1)
+            cycle = first.analDate.strftime("%Y%m%d%H")
+            geometry = geometry_for_message(first, full_precision)
+    except Exception:
+        return [None] * len(points)
+    return [CellKey(model, cycle, geometry.grid_id, *geometry.nearest_index(lat, lon)) for lat, lon in points]
+
+
+def cell_metadata(key):
+    """
+    The output metadata "cell" of a resolved CellKey (see GridGeometry.cell):
+    grid id, i, j, cell-center lat/lon and radius in metres. Returns None when
+    the key is None or its grid is not loaded in this process.
+    """
+    geometry = cached_geometry(key.grid_id) if key is not None else None
+    return geometry.cell(key.i, key.j) if geometry is not None else None
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _process_alive(pid):
+    if os.name != "posix":
+        # os.kill would terminate the process on Windows; rely on LEASE_TTL there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LeaseTable:
+    """
+    Exclusive per-cell leases: lease files created with O_EXCL (so they work
+    across processes) plus an Event per lease held in this process (so
+    waiting threads wake as soon as it is released instead of polling).
+    """
+
+    def __init__(self, lease_dir, ttl=LEASE_TTL, poll=LEASE_POLL):
+        self.lease_dir = Path(lease_dir)
+        self.ttl = ttl
+        self.poll = poll
+        self._held = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.lease_dir / key.model / key.cycle / f"{key.grid_id}_{key.i}_{key.j}.lease"
+
+    def _try_create(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{socket.gethostname()} {os.getpid()} {time.time():.0f}")
+        return True
+
+    def _is_stale(self, path):
+        try:
+            age = time.time() - path.stat().st_mtime
+            host, pid, _ = path.read_text().split()
+        except (OSError, ValueError):
+            # vanished, or caught mid-write; look again on the next poll
+            return False
+        if age > self.ttl:
+            return True
+        return host == socket.gethostname() and not _process_alive(int(pid))
+
+    def acquire(self, key):
+        """
+        Blocks until this caller holds the lease for key. Returns True if it
+        had to wait for another holder first (whose result should be checked
+        before extracting again), False if the lease was free.
+        """
+        path = self._path(key)
+        waited = False
+        while True:
+            with self._lock:
+                event = self._held.get(key)
+                if event is None and self._try_create(path):
+                    self._held[key] = threading.Event()
+                    return waited
+            waited = True
+            if event is not None:
+                # held by another thread of this process
+                event.wait(self.ttl)
+            elif self._is_stale(path):
+                path.unlink(missing_ok=True)
+            else:
+                time.sleep(self.poll)
+
+    def release(self, key):
+        """Releases key if this process holds it; a no-op otherwise."""
+        with self._lock:
+            event = self._held.pop(key, None)
+            if event is None:
+                return
+            self._path(key).unlink(missing_ok=True)
+        event.set()
+
+
+class PointCache:
+    """Two-tier (memory LRU + disk) cache of per-cell extraction results."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=MAX_MEMORY_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._cycles = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.leases = LeaseTable(self.cache_dir / "_leases")
+
+    def _path(self, key):
+        return self.cache_dir / key.model / key.cycle / f"{key.grid_id}_{key.i}_{key.j}.json"
+
+    def observe_cycle(self, model, cycle):
+        """Drops every cached entry for model that belongs to a cycle other than `cycle`."""
+        with self._lock:
+            if self._cycles.get(model) == cycle:
+                return
+            self._cycles[model] = cycle
+            for key in [k for k in self._memory if k.model == model and k.cycle != cycle]:
+                del self._memory[key]
+
+        model_dir = self.cache_dir / model
+        if model_dir.is_dir():
+            for cycle_dir in model_dir.iterdir():
+                if cycle_dir.name != cycle:
+                    shutil.rmtree(cycle_dir, ignore_errors=True)
+
+    def get(self, key, fresh=False, version=None):
+        """
+        Cached entry for key, or None. fresh=True skips the memory tier
+        (another process may have written). version: the ConversionManifest
+        digest the entry must carry; a stale entry is returned as None and
+        counted as a miss, so hit_rate() only counts entries actually used.
+        """
+        entry = None
+        with self._lock:
+            if not fresh:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    self._memory.move_to_end(key)
+
+        if entry is None:
+            try:
+                entry = _loads(self._path(key).read_bytes())
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                with self._lock:
+                    self._remember(key, entry)
+
+        if entry is not None and version is not None and entry.get("version") != version:
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._remember(key, entry)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.part")
+        tmp.write_bytes(_dumps(entry))
+        tmp.replace(path)
+
+    def _remember(self, key, entry):
+        # caller holds self._lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
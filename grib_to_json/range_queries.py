@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# range_queries.py (O(1) forecast-window aggregates on the time-major store)
+"""
+Range-query tables built next to each time-series store (timeseries_store.py)
+so that any window aggregate over forecast hours, for any grid cell, is a
+constant number of array lookups instead of a pass over hourly messages.
+
+Per series, along the hour axis:
+
+    prefix_sum.f32    P[h] = a[0] + ... + a[h-1]           -> sum / mean
+    prefix_logc.f32   L[h] = sum of log1p(-a/100) to h-1    -> any-hour exceedance
+    sparse_max.f32    T[k][h] = max(a[h .. h + 2^k - 1])   -> max
+    sparse_min.f32    same with min                        -> min
+
+Every table keeps the store's (tile row, tile col, ...) layout, so one point's
+tables sit in one contiguous block each. Missing hours (no forecastTime in
+the store's index, or NaN) are skipped: 0 in the prefix sums, NaN (ignored)
+in the sparse tables, so max/min cover only the hours that exist.
+
+    python range_queries.py [--model HREF]
+"""
+import argparse
+import bisect
+import json
+import logging
+import time
+
+import numpy as np
+
+from grib_data_to_json import MODEL_FOLDERS
+from timeseries_store import SPATIAL_TILE, _open_store, latest_store_dir
+
+OPERATIONS = ("sum", "mean", "max", "min", "exceedance")
+MAX_PROBABILITY = 1.0 - 1e-7
+TABLES_MARKER = "range_tables.json"
+
+logger = logging.getLogger("range_queries")
+
+_TABLES = {}
+
+
+def sparse_levels(n_hours):
+    """Number of sparse-table levels needed for n_hours (2^k <= n_hours)."""
+    return max(1, int(n_hours).bit_length())
+
+
+def build_range_tables(store_dir):
+    """Builds the prefix and sparse tables of one store, one tile row at a time."""
+    t0 = time.time()
+    index, _, values = _open_store(store_dir)
+    tile_rows, tile_cols, n_series, n_hours = values.shape[:4]
+    levels = sparse_levels(n_hours)
+    tile = values.shape[4:]
+
+    prefix_shape = (tile_rows, tile_cols, n_series, n_hours + 1) + tile
+    sparse_shape = (tile_rows, tile_cols, levels, n_series, n_hours) + tile
+    prefix_sum = np.memmap(store_dir / "prefix_sum.f32", dtype=np.float32, mode="w+", shape=prefix_shape)
+    prefix_logc = np.memmap(store_dir / "prefix_logc.f32", dtype=np.float32, mode="w+", shape=prefix_shape)
+    sparse_max = np.memmap(store_dir / "sparse_max.f32", dtype=np.float32, mode="w+", shape=sparse_shape)
+    sparse_min = np.memmap(store_dir / "sparse_min.f32", dtype=np.float32, mode="w+", shape=sparse_shape)
+
+    # per (series, hour) availability, so windows can report how many hours they cover
+    available = np.array([[t is not None for t in row] for row in index["forecast_times"]], dtype=bool)
+
+    for tr in range(tile_rows):
+        block = np.array(values[tr], dtype=np.float64)  # (tile_cols, series, hours, y, x)
+        # the index decides which slots exist, whatever a never-written slot holds
+        valid = np.isfinite(block) & available[None, :, :, None, None]
+        block[~valid] = np.nan
+
+        summed = np.where(valid, block, 0.0)
+        prefix_sum[tr, :, :, 0] = 0
+        prefix_sum[tr, :, :, 1:] = np.cumsum(summed, axis=2)
+
+        p = np.clip(summed / 100.0, 0.0, MAX_PROBABILITY)
+        prefix_logc[tr, :, :, 0] = 0
+        prefix_logc[tr, :, :, 1:] = np.cumsum(np.log1p(-p), axis=2)
+
+        high = block.astype(np.float32)
+        low = high.copy()
+        sparse_max[tr, :, 0] = high
+        sparse_min[tr, :, 0] = low
+        for k in range(1, levels):
+            span = 1 << (k - 1)
+            high[:, :, :n_hours - span] = np.fmax(high[:, :, :n_hours - span], high[:, :, span:])
+            low[:, :, :n_hours - span] = np.fmin(low[:, :, :n_hours - span], low[:, :, span:])
+            sparse_max[tr, :, k] = high
+            sparse_min[tr, :, k] = low
+
+    for table in (prefix_sum, prefix_logc, sparse_max, sparse_min):
+        table.flush()
+
+    prefix_count = np.concatenate([np.zeros((n_series, 1), dtype=np.int64),
+                                   np.cumsum(available, axis=1, dtype=np.int64)], axis=1)
+    marker = {"levels": levels, "prefix_count": prefix_count.tolist()}
+    (store_dir / TABLES_MARKER).write_text(json.dumps(marker), encoding="utf-8")
+    logger.info(f"Range tables for {store_dir.parent.name} {store_dir.name}: "
+                f"{n_series} series x {n_hours} hours, {levels} sparse levels in {time.time() - t0:.1f}s")
+
+
+def _open_tables(store_dir):
+    tables = _TABLES.get(store_dir)
+    if tables is None:
+        index, geometry, values = _open_store(store_dir)
+        marker = json.loads((store_dir / TABLES_MARKER).read_text(encoding="utf-8"))
+        tile_rows, tile_cols, n_series, n_hours = values.shape[:4]
+        tile = values.shape[4:]
+        prefix_shape = (tile_rows, tile_cols, n_series, n_hours + 1) + tile
+        sparse_shape = (tile_rows, tile_cols, marker["levels"], n_series, n_hours) + tile
+        tables = {
+            "index": index,
+            "geometry": geometry,
+            "prefix_count": np.array(marker["prefix_count"]),
+            "sum": np.memmap(store_dir / "prefix_sum.f32", dtype=np.float32, mode="r", shape=prefix_shape),
+            "logc": np.memmap(store_dir / "prefix_logc.f32", dtype=np.float32, mode="r", shape=prefix_shape),
+            "max": np.memmap(store_dir / "sparse_max.f32", dtype=np.float32, mode="r", shape=sparse_shape),
+            "min": np.memmap(store_dir / "sparse_min.f32", dtype=np.float32, mode="r", shape=sparse_shape),
+        }
+        _TABLES.clear()
+        _TABLES[store_dir] = tables
+    return tables
+
+
+def hour_span(hours, start_hour, end_hour):
+    """Maps forecast hours [start_hour, end_hour] to the store's hour indices [lo, hi), or None."""
+    lo = bisect.bisect_left(hours, start_hour)
+    hi = bisect.bisect_right(hours, end_hour)
+    return (lo, hi) if hi > lo else None
+
+
+def window_aggregate(model, lat, lon, start_hour, end_hour, op="max"):
+    """
+    Aggregates every series of a model over forecast hours start_hour..end_hour
+    (inclusive, by file forecast hour) at the grid cell nearest lat/lon.
+    Returns [{"threshold", "name", "hours", "value"}], or None if the model has
+    no store / range tables yet.
+    """
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation '{op}' (expected one of {', '.join(OPERATIONS)})")
+    store_dir = latest_store_dir(model)
+    if store_dir is None or not (store_dir / TABLES_MARKER).exists():
+        return None
+    tables = _open_tables(store_dir)
+    index = tables["index"]
+
+    span = hour_span(index["hours"], start_hour, end_hour)
+    if span is None:
+        return []
+    lo, hi = span
+
+    row, col = tables["geometry"].nearest_index(lat, lon)
+    cell = (row // SPATIAL_TILE, col // SPATIAL_TILE)
+    y, x = row % SPATIAL_TILE, col % SPATIAL_TILE
+    counts = tables["prefix_count"][:, hi] - tables["prefix_count"][:, lo]
+
+    if op in ("sum", "mean"):
+        prefix = tables["sum"][cell][:, :, y, x]
+        result = prefix[:, hi] - prefix[:, lo]
+        if op == "mean":
+            result = np.where(counts > 0, result / np.maximum(counts, 1), np.nan)
+    elif op == "exceedance":
+        prefix = tables["logc"][cell][:, :, y, x]
+        result = -np.expm1(prefix[:, hi] - prefix[:, lo]) * 100.0
+    else:
+        k = (hi - lo).bit_length() - 1
+        sparse = tables[op][cell][k, :, :, y, x]
+        combine = np.fmax if op == "max" else np.fmin
+        result = combine(sparse[:, lo], sparse[:, hi - (1 << k)])
+
+    return [
+        {"threshold": threshold, "name": name, "hours": int(count), "value": float(value)}
+        for (threshold, name, _), count, value in zip(index["series"], counts, result)
+        if count
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build range-query tables for the time-series stores")
+    parser.add_argument("--model", choices=list(MODEL_FOLDERS), action="append",
+                        help="model(s) to build (default: all)")
+    args = parser.parse_args()
+
+    for model in args.model or list(MODEL_FOLDERS):
+        store_dir = latest_store_dir(model)
+        if store_dir is None:
+            logger.warning(f"No time-series store for {model}, skipping range tables")
+            continue
+        build_range_tables(store_dir)
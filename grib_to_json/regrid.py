@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# regrid.py (cross-model regridding with cached sparse weights)
+"""
+Regrids fields from any model grid (HREF bbox, REFS/NBM CONUS, ...) onto a
+common regular lat/lon target grid.
+
+Interpolation weights (nearest or bilinear) from a source grid to a target
+grid are computed once per (source grid id, target grid, method) from the
+source grid's projected affine transform, stored as CSR arrays (indptr,
+indices, data) in regrid_weights/*.npz, and reused by every later message
+on that grid pair. Regridding a field is then one sparse mat-vec done with
+plain numpy (no scipy in the environment).
+
+    python regrid.py FILE [--method bilinear] [--step 0.05] [--bbox 20 55 -130 -60]
+"""
+import argparse
+import hashlib
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pyproj
+
+from grib_data_to_json import open_grib
+from grid_geometry import geometry_for_message
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+WEIGHTS_DIR = SCRIPT_DIR / "regrid_weights"
+METHODS = ("nearest", "bilinear")
+
+_WEIGHTS = {}
+
+
+class TargetGrid(NamedTuple):
+    """Regular lat/lon grid; cell centres run from the min corner in `step` increments."""
+    lat_min: float
+    lat_max: float
+    lon_min: float
+    lon_max: float
+    step: float
+
+    @property
+    def grid_id(self):
+        return hashlib.md5(repr(tuple(float(v) for v in self)).encode()).hexdigest()[:16]
+
+    @property
+    def shape(self):
+        return (int(round((self.lat_max - self.lat_min) / self.step)) + 1,
+                int(round((self.lon_max - self.lon_min) / self.step)) + 1)
+
+    def latlons(self):
+        ny, nx = self.shape
+        lats = self.lat_min + np.arange(ny) * self.step
+        lons = self.lon_min + np.arange(nx) * self.step
+        lon2d, lat2d = np.meshgrid(lons, lats)
+        return lat2d, lon2d
+
+
+# CONUS at ~5 km, covering the HREF, REFS and NBM domains
+COMMON_GRID = TargetGrid(21.0, 53.0, -126.0, -66.0, 0.05)
+
+
+class RegridWeights:
+    """CSR interpolation matrix of shape (target cells, source cells)."""
+
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = tuple(shape)
+        counts = np.diff(indptr)
+        self._rows = np.repeat(np.arange(self.shape[0], dtype=np.int64), counts)
+        self._empty = counts == 0
+
+    def apply(self, values):
+        """Sparse mat-vec: returns the flat target field (NaN where no source point applies)."""
+        values = np.asarray(values, dtype=np.float32).ravel()
+        out = np.bincount(self._rows, weights=self.data * values[self.indices], minlength=self.shape[0])
+        out = out.astype(np.float32)
+        out[self._empty] = np.nan
+        return out
+
+    def save(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".part.npz")
+        np.savez(tmp, indptr=self.indptr, indices=self.indices, data=self.data, shape=np.array(self.shape))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f["indptr"], f["indices"], f["data"], f["shape"])
+
+
+def source_positions(geometry, lats, lons):
+    """Fractional (row, col) of lat/lon points on geometry's grid."""
+    affine = geometry.affine()
+    if affine is None:
+        raise RuntimeError(f"Grid {geometry.grid_id} has no projection parameters")
+    x, y = pyproj.Proj(geometry.projparams)(lons, lats)
+    return (np.asarray(y) - affine["y0"]) / affine["dy"], (np.asarray(x) - affine["x0"]) / affine["dx"]
+
+
+def compute_weights(geometry, target, method="bilinear"):
+    """Builds the RegridWeights from geometry's grid to target."""
+    lats, lons = target.latlons()
+    rows, cols = source_positions(geometry, lats.ravel(), lons.ravel())
+    nrows, ncols = geometry.shape
+    n_target = rows.size
+
+    if method == "nearest":
+        r = np.rint(rows).astype(np.int64)
+        c = np.rint(cols).astype(np.int64)
+        inside = (r >= 0) & (r < nrows) & (c >= 0) & (c < ncols)
+        indptr = np.concatenate([[0], np.cumsum(inside)]).astype(np.int64)
+        indices = (r * ncols + c)[inside]
+        data = np.ones(indices.size, dtype=np.float32)
+    elif method == "bilinear":
+        r0 = np.floor(rows).astype(np.int64)
+        c0 = np.floor(cols).astype(np.int64)
+        fr = (rows - r0).astype(np.float32)
+        fc = (cols - c0).astype(np.float32)
+        inside = (r0 >= 0) & (r0 + 1 < nrows) & (c0 >= 0) & (c0 + 1 < ncols)
+        corners = [
+            (r0, c0, (1 - fr) * (1 - fc)),
+            (r0, c0 + 1, (1 - fr) * fc),
+            (r0 + 1, c0, fr * (1 - fc)),
+            (r0 + 1, c0 + 1, fr * fc),
+        ]
+        indptr = np.concatenate([[0], np.cumsum(inside * 4)]).astype(np.int64)
+        indices = np.stack([(r * ncols + c)[inside] for r, c, _ in corners], axis=1).ravel()
+        data = np.stack([w[inside] for _, _, w in corners], axis=1).ravel().astype(np.float32)
+    else:
+        raise ValueError(f"Unknown regrid method '{method}' (expected one of {', '.join(METHODS)})")
+
+    return RegridWeights(indptr, indices.astype(np.int64), data, (n_target, nrows * ncols))
+
+
+def weights_for(geometry, target=COMMON_GRID, method="bilinear"):
+    """Returns the cached RegridWeights for (source grid, target, method), building them once."""
+    key = (geometry.grid_id, target.grid_id, method)
+    weights = _WEIGHTS.get(key)
+    if weights is not None:
+        return weights
+
+    path = WEIGHTS_DIR / f"{geometry.grid_id}_{target.grid_id}_{method}.npz"
+    try:
+        weights = RegridWeights.load(path)
+    except (OSError, ValueError, KeyError):
+        weights = compute_weights(geometry, target, method)
+        weights.save(path)
+    _WEIGHTS[key] = weights
+    return weights
+
+
+def regrid(values, geometry, target=COMMON_GRID, method="bilinear"):
+    """Regrids one decoded field from geometry's grid onto target; returns a (ny, nx) float32 array."""
+    values = np.ma.filled(values.astype(np.float32), np.nan) if np.ma.isMaskedArray(values) else values
+    return weights_for(geometry, target, method).apply(values).reshape(target.shape)
+
+
+def regrid_message(grb, target=COMMON_GRID, method="bilinear"):
+    """Regrids a pygrib message onto target."""
+    return regrid(grb.values, geometry_for_message(grb), target, method)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regrid a GRIB file onto a common lat/lon grid")
+    parser.add_argument("file")
+    parser.add_argument("--method", choices=METHODS, default="bilinear")
+    parser.add_argument("--step", type=float, default=COMMON_GRID.step)
+    parser.add_argument("--bbox", type=float, nargs=4, metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"),
+                        default=COMMON_GRID[:4])
+    args = parser.parse_args()
+
+    target = TargetGrid(*args.bbox, args.step)
+    with open_grib(Path(args.file)) as grbs:
+        for grb in grbs:
+            t0 = time.perf_counter()
+            weights_for(geometry_for_message(grb), target, args.method)
+            t1 = time.perf_counter()
+            field = regrid_message(grb, target, args.method)
+            t2 = time.perf_counter()
+            print(f"#{grb.messagenumber} {grb.name}: {target.shape} target, "
+                  f"weights {1000 * (t1 - t0):.1f} ms, mat-vec {1000 * (t2 - t1):.1f} ms, "
+                  f"{np.isfinite(field).mean():.0%} covered")
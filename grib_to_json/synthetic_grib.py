@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# synthetic_grib.py (writes HREF/REFS/NBM-like GRIB2 files for benchmarks)
+"""
+Generates synthetic GRIB2 probability files that look like the real
+downloads to the converter: Lambert conformal CONUS grids, model file
+naming, a realistic number of probability messages per forecast hour,
+product definition templates 5 (instantaneous) and 9 (accumulation window)
+and a choice of packing types.
+
+Grid sizes follow the operational products; `scale` divides Nx/Ny (and
+multiplies the grid spacing) so the same profile can be written at several
+sizes:
+
+    HREF  1799 x 1059 @ 3 km     50 messages / hour
+    REFS  1799 x 1059 @ 3 km     50 messages / hour
+    NBM   2345 x 1597 @ 2.539 km 25 messages / hour
+
+Needs the eccodes Python bindings (pygrib cannot create messages from
+scratch).
+
+    python synthetic_grib.py OUTDIR [--model HREF] [--hours 1 6] [--scale 8] [--packing grid_complex]
+"""
+import argparse
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    import eccodes
+except ImportError:
+    eccodes = None
+
+PACKING_TYPES = ("grid_simple", "grid_complex", "grid_complex_spatial_differencing", "grid_ccsds", "grid_jpeg")
+
+ANAL_DATE = 20251016
+CYCLE = 12
+
+
+class Product(NamedTuple):
+    """One probability product: GRIB2 parameter, level and the thresholds written for it."""
+    discipline: int
+    category: int
+    number: int
+    surface_type: int
+    surface_value: int
+    window: int            # accumulation hours (template 9); 0 = instantaneous (template 5)
+    probability_type: int  # 0 = below lower limit, 1 = above upper limit
+    thresholds: tuple
+    scale_factor: int
+
+
+# Parameters matching grib_data_to_json.DESIRED_FORECAST_TYPES
+PRODUCTS = {
+    "precip_1h": Product(0, 1, 8, 1, 0, 1, 1, (0.254, 2.54, 6.35, 12.7, 25.4), 3),
+    "precip_3h": Product(0, 1, 8, 1, 0, 3, 1, (2.54, 12.7, 25.4, 50.8, 76.2), 3),
+    "wind_10m": Product(0, 2, 1, 103, 10, 0, 1, (10.3, 15.4, 20.6, 25.7), 1),
+    "temp_2m": Product(0, 0, 0, 103, 2, 0, 0, (255.4, 273.15, 305.4, 310.9), 2),
+    "apparent_2m": Product(0, 0, 21, 103, 2, 0, 1, (305.4, 310.9, 316.5), 1),
+    "rh_2m": Product(0, 1, 1, 103, 2, 0, 0, (10, 15, 20, 25), 0),
+}
+
+
+class GridProfile(NamedTuple):
+    """Lambert conformal grid of one model plus the products written per hour."""
+    nx: int
+    ny: int
+    dx: float
+    la1: float
+    lo1: float
+    lov: float
+    latin: float
+    products: tuple
+    repeats: int           # product list repeated (e.g. member-time-lagged variants)
+
+    def message_count(self):
+        return self.repeats * sum(len(PRODUCTS[p].thresholds) for p in self.products)
+
+
+MODELS = {
+    "HREF": GridProfile(1799, 1059, 3000.0, 21.138, 237.28, 262.5, 38.5,
+                        ("precip_1h", "precip_3h", "wind_10m", "temp_2m", "apparent_2m", "rh_2m"), 2),
+    "REFS": GridProfile(1799, 1059, 3000.0, 21.138, 237.28, 262.5, 38.5,
+                        ("precip_1h", "precip_3h", "wind_10m", "temp_2m", "apparent_2m", "rh_2m"), 2),
+    "NBM": GridProfile(2345, 1597, 2539.703, 19.229, 233.723, 265.0, 25.0,
+                       ("precip_1h", "precip_3h", "wind_10m", "temp_2m", "apparent_2m", "rh_2m"), 1),
+}
+
+
+def file_name(model, forecast_hour):
+    """Download-folder name of one forecast hour (what detect_model_cycle expects)."""
+    if model == "HREF":
+        return f"href.t{CYCLE:02d}z.conus.prob.f{forecast_hour:02d}.grib2"
+    if model == "REFS":
+        return f"rrfs.{ANAL_DATE}t{CYCLE:02d}z.f{forecast_hour:03d}.conus.grib2"
+    return f"nbm_t{CYCLE:02d}z_f{forecast_hour:03d}_custom.grib2"
+
+
+def probability_field(shape, rng):
+    """Smooth 0-100 field with spatial structure, so packing ratios resemble real products."""
+    ny, nx = shape
+    y = np.linspace(0, 1, ny)[:, None]
+    x = np.linspace(0, 1, nx)[None, :]
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    field = (np.sin(6 * x + phase[0]) * np.cos(4 * y + phase[1]) + np.sin(11 * (x + y) + phase[2])) / 2
+    field = np.clip((field + rng.normal(0, 0.05, shape)) * 60 + 20, 0, 100)
+    # real probabilities are mostly 0 with coherent blobs
+    field[field < 15] = 0
+    return np.round(field, 1)
+
+
+def _new_message(profile, scale, product, threshold, forecast_hour, packing, values):
+    h = eccodes.codes_grib_new_from_samples("GRIB2")
+    try:
+        # NCEP centre so parameter names come from the same local tables as the real files
+        eccodes.codes_set(h, "centre", 7)
+        eccodes.codes_set(h, "tablesVersion", 2)
+        eccodes.codes_set(h, "gridType", "lambert")
+        grid = {
+            "Nx": profile.nx // scale,
+            "Ny": profile.ny // scale,
+            "latitudeOfFirstGridPointInDegrees": profile.la1,
+            "longitudeOfFirstGridPointInDegrees": profile.lo1,
+            "LaDInDegrees": profile.latin,
+            "LoVInDegrees": profile.lov,
+            "Latin1InDegrees": profile.latin,
+            "Latin2InDegrees": profile.latin,
+            "DxInMetres": profile.dx * scale,
+            "DyInMetres": profile.dx * scale,
+            # rows run south to north from la1, as in the operational CONUS grids
+            "scanningMode": 64,
+        }
+        for key, value in grid.items():
+            eccodes.codes_set(h, key, value)
+
+        eccodes.codes_set(h, "productDefinitionTemplateNumber", 9 if product.window else 5)
+        for key, value in (("discipline", product.discipline), ("parameterCategory", product.category),
+                           ("parameterNumber", product.number),
+                           ("typeOfFirstFixedSurface", product.surface_type),
+                           ("scaledValueOfFirstFixedSurface", product.surface_value),
+                           ("dataDate", ANAL_DATE), ("dataTime", CYCLE * 100),
+                           ("probabilityType", product.probability_type)):
+            eccodes.codes_set(h, key, value)
+
+        if product.window:
+            eccodes.codes_set(h, "forecastTime", max(0, forecast_hour - product.window))
+            eccodes.codes_set(h, "typeOfStatisticalProcessing", 1)
+            eccodes.codes_set(h, "lengthOfTimeRange", min(product.window, forecast_hour))
+        else:
+            eccodes.codes_set(h, "forecastTime", forecast_hour)
+
+        scaled = int(round(threshold * 10 ** product.scale_factor))
+        limit = "UpperLimit" if product.probability_type == 1 else "LowerLimit"
+        eccodes.codes_set(h, f"scaleFactorOf{limit}", product.scale_factor)
+        eccodes.codes_set(h, f"scaledValueOf{limit}", scaled)
+
+        eccodes.codes_set(h, "packingType", packing)
+        if packing != "grid_simple":
+            eccodes.codes_set(h, "bitsPerValue", 12)
+        eccodes.codes_set_values(h, values.ravel())
+        return eccodes.codes_get_message(h)
+    finally:
+        eccodes.codes_release(h)
+
+
+def write_forecast_hour(path, model, forecast_hour, scale=1, packing="grid_complex", seed=0):
+    """Writes one synthetic forecast-hour file; returns (path, message_count)."""
+    if eccodes is None:
+        raise RuntimeError("synthetic_grib.py needs the eccodes Python bindings (pip install eccodes)")
+    profile = MODELS[model]
+    shape = (profile.ny // scale, profile.nx // scale)
+    rng = np.random.default_rng(seed * 1000 + forecast_hour)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".part")
+    count = 0
+    with open(tmp, "wb") as f:
+        for _ in range(profile.repeats):
+            for name in profile.products:
+                product = PRODUCTS[name]
+                for threshold in product.thresholds:
+                    values = probability_field(shape, rng)
+                    f.write(_new_message(profile, scale, product, threshold, forecast_hour, packing, values))
+                    count += 1
+    tmp.replace(path)
+    return path, count
+
+
+def write_model_folder(outdir, model, hours, scale=1, packing="grid_complex", seed=0):
+    """Writes one file per forecast hour into outdir; returns the file paths."""
+    return [
+        write_forecast_hour(Path(outdir) / file_name(model, fh), model, fh, scale, packing, seed)[0]
+        for fh in hours
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic HREF/REFS/NBM-like GRIB2 files")
+    parser.add_argument("outdir", type=Path)
+    parser.add_argument("--model", choices=list(MODELS), default="HREF")
+    parser.add_argument("--hours", type=int, nargs=2, default=(1, 6), metavar=("FIRST", "LAST"))
+    parser.add_argument("--scale", type=int, default=1, help="divide the grid dimensions by this factor")
+    parser.add_argument("--packing", choices=PACKING_TYPES, default="grid_complex")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for fh in range(args.hours[0], args.hours[1] + 1):
+        path, count = write_forecast_hour(args.outdir / file_name(args.model, fh), args.model, fh,
+                                          args.scale, args.packing, args.seed)
+        print(f"{path}: {count} messages, {path.stat().st_size / (1024 * 1024):.1f} MB")
@@ -0,0 +1,119 @@
+"""
+Shared fixtures: synthetic model cycles (synthetic_grib.py, run in a
+subprocess so eccodes and pygrib never share a process) and a sandbox that
+points the converter's model folders, manifests and time-series store at a
+temporary directory.
+"""
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+pytest.importorskip("pygrib")
+pytest.importorskip("eccodes")
+
+import conversion_manifest  # noqa: E402
+import grib_data_to_json  # noqa: E402
+import timeseries_store  # noqa: E402
+from grid_geometry import EARTH_RADIUS_M  # noqa: E402
+
+HOURS = (1, 6)
+SCALE = 16
+
+# a point well inside the synthetic CONUS grid
+LAT, LON = 38.9, -97.5
+
+
+@pytest.fixture(scope="session")
+def synthetic_folder(tmp_path_factory):
+    """synthetic_folder(model) -> folder of synthetic files f01-f06 for that model, written once per session."""
+    folders = {}
+
+    def make(model):
+        if model not in folders:
+            folder = tmp_path_factory.mktemp(f"{model.lower()}_data") / f"{model.lower()}_download"
+            subprocess.run(
+                [sys.executable, str(SCRIPT_DIR / "synthetic_grib.py"), str(folder), "--model", model,
+                 "--hours", str(HOURS[0]), str(HOURS[1]), "--scale", str(SCALE)],
+                check=True, capture_output=True,
+            )
+            assert_point_inside(next(folder.iterdir()), LAT, LON)
+            folders[model] = folder
+        return folders[model]
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def synthetic_href(synthetic_folder):
+    """Folder of synthetic HREF files f01-f06 (every product written twice, as in MODELS["HREF"])."""
+    return synthetic_folder("HREF")
+
+
+def assert_point_inside(file_path, lat, lon):
+    """Fails unless lat/lon falls inside the file's grid, away from the clamped edge rows and columns."""
+    import pygrib
+
+    with pygrib.open(str(file_path)) as grbs:
+        lats, lons = grbs.message(1).latlons()
+    assert lats.min() < lat < lats.max() and lons.min() < lon < lons.max()
+    row, col = grib_data_to_json.compute_nearest_index(lat, lon, lats, lons)
+    assert 0 < row < lats.shape[0] - 1 and 0 < col < lats.shape[1] - 1
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres, elementwise over arrays (grid_geometry.haversine_m is scalar)."""
+    lat1, lon1, lat2, lon2 = np.radians([lat1, lon1, lat2, lon2])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def model_sandbox(synthetic_folder, tmp_path, monkeypatch):
+    """
+    model_sandbox(model) runs the converter on a private copy of one
+    model's synthetic folder only and returns that download folder.
+    MODEL_FOLDERS / DERIVED_FOLDERS are updated in place because other
+    modules import the dicts by name.
+    """
+    saved = {name: dict(getattr(grib_data_to_json, name)) for name in ("MODEL_FOLDERS", "DERIVED_FOLDERS")}
+    monkeypatch.setattr(conversion_manifest, "MANIFEST_DIR", tmp_path / "manifests")
+    monkeypatch.setattr(timeseries_store, "STORE_DIR", tmp_path / "timeseries")
+
+    def make(model):
+        folder = tmp_path / f"{model.lower()}_data" / f"{model.lower()}_download"
+        shutil.copytree(synthetic_folder(model), folder)
+        grib_data_to_json.MODEL_FOLDERS.clear()
+        grib_data_to_json.MODEL_FOLDERS[model] = folder
+        grib_data_to_json.DERIVED_FOLDERS.clear()
+        grib_data_to_json.DERIVED_FOLDERS[model] = folder.parent / f"{model.lower()}_derived"
+        return folder
+
+    try:
+        yield make
+    finally:
+        for name, contents in saved.items():
+            getattr(grib_data_to_json, name).clear()
+            getattr(grib_data_to_json, name).update(contents)
+
+
+@pytest.fixture
+def href_sandbox(model_sandbox):
+    """model_sandbox("HREF")."""
+    return model_sandbox("HREF")
+
+
+def drop_messages(file_path, name):
+    """Rewrites one GRIB file without the messages of parameter `name`, leaving a gap in those series."""
+    import pygrib
+
+    file_path = Path(file_path)
+    with pygrib.open(str(file_path)) as grbs:
+        kept = [grb.tostring() for grb in grbs if grb.name != name]
+    file_path.write_bytes(b"".join(kept))
@@ -0,0 +1,30 @@
+"""make_json_file and run_all_models sharing one ConversionManifest on synthetic HREF data."""
+import exceedance
+import grib_data_to_json
+from conftest import LAT, LON
+from conversion_manifest import ConversionManifest
+
+
+def pending(folder):
+    """Files run_all_models would still have to extract for the test point."""
+    _, todo = ConversionManifest(folder).plan(grib_data_to_json.model_files("HREF", folder), LAT, LON)
+    return todo
+
+
+def test_callers_keep_each_others_rows(href_sandbox, monkeypatch):
+    monkeypatch.setattr(grib_data_to_json, "write_json_output", lambda *args, **kwargs: None)
+    exceedance.build_exceedance("HREF", windows=[(0, 3)])
+    files = grib_data_to_json.model_files("HREF", href_sandbox)
+    assert any(".derived." in f for f in files)
+
+    from_make = grib_data_to_json.make_json_file(href_sandbox, LAT, LON, grib_data_to_json.DESIRED_FORECAST_TYPES)
+    assert pending(href_sandbox) == []
+
+    from_run = grib_data_to_json.run_all_models(LAT, LON, write=False, cache=None)["HREF"]
+    assert pending(href_sandbox) == []
+    assert from_run["data"] == from_make["data"]
+
+    # a second make_json_file pass extracts nothing and still leaves the derived rows in place
+    monkeypatch.setattr(grib_data_to_json, "process_single_file", None)
+    grib_data_to_json.make_json_file(href_sandbox, LAT, LON, grib_data_to_json.DESIRED_FORECAST_TYPES)
+    assert pending(href_sandbox) == []
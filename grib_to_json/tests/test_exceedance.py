@@ -0,0 +1,64 @@
+"""exceedance.build_exceedance on synthetic HREF and REFS data (every product written twice per file)."""
+from pathlib import Path
+
+import numpy as np
+import pygrib
+import pytest
+
+import exceedance
+import grib_data_to_json
+from conftest import HOURS
+from timeseries_store import forecast_end_of
+
+PRECIP_1H_THRESHOLDS = 5  # synthetic_grib.PRODUCTS["precip_1h"], first product of each repeat
+REPEATS = 2               # synthetic_grib.MODELS["HREF"/"REFS"].repeats
+
+
+def hour_file(folder, hour):
+    return next(f for f in grib_data_to_json.list_grib_files(folder) if forecast_end_of(f) == hour)
+
+
+def hourly_precip_1h(folder, hour):
+    """The hour's precip_1h fields in file order: [repeat][threshold]."""
+    with pygrib.open(hour_file(folder, hour)) as grbs:
+        per_repeat = grbs.messages // REPEATS
+        return [[grbs.message(r * per_repeat + t + 1).values for t in range(PRECIP_1H_THRESHOLDS)]
+                for r in range(REPEATS)]
+
+
+def derived_messages(model, end_hour):
+    with pygrib.open(hour_file(grib_data_to_json.DERIVED_FOLDERS[model], end_hour)) as grbs:
+        return [(grb.forecastTime, grb.lengthOfTimeRange, grb.hourOfEndOfOverallTimeInterval, grb.values)
+                for grb in grbs]
+
+
+@pytest.mark.parametrize("model", ["HREF", "REFS"])
+@pytest.mark.parametrize("start, end", [(0, HOURS[1]), (2, HOURS[1]), (0, 3)])
+def test_window_combines_each_hour_once(model_sandbox, model, start, end):
+    folder = model_sandbox(model)
+    assert exceedance.build_exceedance(model, windows=[(start, end)]) == REPEATS * PRECIP_1H_THRESHOLDS
+
+    hourly = [hourly_precip_1h(folder, hour) for hour in range(start + 1, end + 1)]
+    messages = derived_messages(model, end)
+    assert len(messages) == REPEATS * PRECIP_1H_THRESHOLDS
+    for n, (forecast_time, length, end_of_interval, values) in enumerate(messages):
+        r, t = divmod(n, PRECIP_1H_THRESHOLDS)
+        expected = exceedance.any_hour_exceedance([hour[r][t] / 100.0 for hour in hourly]) * 100.0
+        assert (forecast_time, length, end_of_interval) == (start, end - start, 12 + end)
+        np.testing.assert_allclose(values, expected, atol=0.1)
+
+
+@pytest.mark.parametrize("model, sitrep", [("HREF", "HREF"), ("REFS", "RRFS")])
+def test_derived_files_keep_the_source_model_and_cycle(model_sandbox, model, sitrep):
+    folder = model_sandbox(model)
+    exceedance.build_exceedance(model, windows=[(0, 3)])
+    files = grib_data_to_json.model_files(model, folder)
+    assert any(".derived." in f for f in files)
+    assert {grib_data_to_json.detect_model_cycle(Path(f).name) for f in files} == {(sitrep, "12z")}
+
+
+def test_accumulator_rejects_a_repeated_hour():
+    accumulator = exceedance.ExceedanceAccumulator()
+    accumulator.add(np.zeros(3), 1)
+    with pytest.raises(ValueError):
+        accumulator.add(np.zeros(3), 1)
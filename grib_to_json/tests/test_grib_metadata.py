@@ -0,0 +1,25 @@
+"""grib_metadata.describe_message descriptor caching."""
+import pygrib
+
+from grib_metadata import describe_message, header_signature
+
+
+def test_messages_differing_only_by_level_get_their_own_descriptor(synthetic_href, tmp_path):
+    with pygrib.open(str(next(synthetic_href.iterdir()))) as grbs:
+        wind = next(grb for grb in grbs if grb.name == "Wind speed")
+    # same product at 2 m then 10 m; eccodes names the 10 m one "10 metre wind speed"
+    wind["scaleFactorOfFirstFixedSurface"] = 0
+    path = tmp_path / "levels.grib2"
+    messages = []
+    for level in (2, 10):
+        wind["scaledValueOfFirstFixedSurface"] = level
+        messages.append(wind.tostring())
+    path.write_bytes(b"".join(messages))
+
+    with pygrib.open(str(path)) as grbs:
+        low, high = list(grbs)
+        assert low.name != high.name
+        assert header_signature(low) != header_signature(high)
+        for grb in (low, high):
+            descriptor = describe_message(grb)
+            assert (descriptor.name, descriptor.short_name) == (grb.name, grb.shortName)
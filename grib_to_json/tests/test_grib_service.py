@@ -0,0 +1,67 @@
+"""grib_service HTTP handler on synthetic HREF data."""
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import grib_service
+import timeseries_store
+from conftest import LAT, LON
+
+
+def _reject_constant(token):
+    raise ValueError(f"invalid JSON token {token}")
+
+
+@pytest.fixture
+def service(href_sandbox):
+    """Base URL of an ExtractionHandler server (no resident pool: run_all_models creates its own)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), grib_service.ExtractionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get_json(url):
+    """(status, payload) parsed as strictly as JSON.parse does: bare NaN/Infinity fail."""
+    try:
+        with urllib.request.urlopen(url, timeout=120) as response:
+            status, body = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, body = e.code, e.read()
+    return status, json.loads(body, parse_constant=_reject_constant)
+
+
+def test_extract_returns_valid_json(service):
+    status, payload = get_json(f"{service}/extract?lat={LAT}&lon={LON}")
+    assert status == 200
+    output = payload["models"]["HREF"]
+    assert output["data"] and output["metadata"]["cell"]["grid_id"]
+
+
+def test_missing_values_are_sent_as_null(service):
+    store_dir = timeseries_store.build_store("HREF", pool=None)
+    index, geometry, _ = timeseries_store._open_store(store_dir)
+    # mask the point's first slot, as a masked grid cell would be
+    row, col = geometry.nearest_index(LAT, LON)
+    tile = timeseries_store.SPATIAL_TILE
+    values = np.memmap(store_dir / "values.f32", dtype=np.float32, mode="r+", shape=tuple(index["shape"]))
+    values[row // tile, col // tile, 0, 0, row % tile, col % tile] = np.nan
+    values.flush()
+
+    status, payload = get_json(f"{service}/timeseries?model=HREF&lat={LAT}&lon={LON}")
+    assert status == 200
+    assert sum(row["value"] is None for row in payload["data"]) == 1
+
+
+def test_dumps_json_replaces_non_finite_values():
+    text = grib_service.dumps_json({"a": [1.5, float("nan")], "b": (float("inf"), "x")})
+    assert json.loads(text, parse_constant=_reject_constant) == {"a": [1.5, None], "b": [None, "x"]}
@@ -0,0 +1,90 @@
+"""Bounding-box sub-grids of the synthetic grid against the full decoded fields."""
+import json
+
+import numpy as np
+import pygrib
+import pyproj
+import pytest
+
+import grib_subgrid
+from conftest import LAT, LON
+from grib_data_to_json import list_grib_files
+
+BBOX = (LAT - 2.0, LAT + 2.0, LON - 3.0, LON + 3.0)
+
+
+@pytest.fixture(scope="module")
+def first_file(synthetic_href):
+    return list_grib_files(synthetic_href)[0]
+
+
+def full_fields(file_path):
+    """{msgno: (lats, lons, values)} of every message, decoded in full."""
+    with pygrib.open(str(file_path)) as grbs:
+        fields = {}
+        for grb in grbs:
+            lats, lons = grb.latlons()
+            fields[grb.messagenumber] = (lats, ((lons + 180.0) % 360.0) - 180.0, grb.values)
+        return fields
+
+
+def test_crop_matches_a_slice_of_the_full_field(first_file):
+    subgrid = grib_subgrid.extract_bbox(first_file, BBOX, coords="latlon")
+    fields = full_fields(first_file)
+    row0, row1, col0, col1 = subgrid["window"]
+
+    assert subgrid["messages"]
+    assert subgrid["shape"] == (row1 - row0, col1 - col0)
+    for msg in subgrid["messages"]:
+        lats, lons, values = fields[msg["msgno"]]
+        np.testing.assert_array_equal(msg["values"], values[row0:row1, col0:col1].astype(np.float32))
+    np.testing.assert_allclose(subgrid["coords"]["lats"], lats[row0:row1, col0:col1], atol=1e-4)
+    np.testing.assert_allclose(subgrid["coords"]["lons"], lons[row0:row1, col0:col1], atol=1e-4)
+
+
+def test_window_is_the_smallest_one_holding_the_bbox(first_file):
+    subgrid = grib_subgrid.extract_bbox(first_file, BBOX)
+    lats, lons, _ = next(iter(full_fields(first_file).values()))
+    lat_min, lat_max, lon_min, lon_max = BBOX
+    inside = (lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+    rows, cols = np.nonzero(inside)
+
+    assert subgrid["window"] == (rows.min(), rows.max() + 1, cols.min(), cols.max() + 1)
+
+
+def test_affine_origin_is_the_first_cropped_point(first_file):
+    subgrid = grib_subgrid.extract_bbox(first_file, BBOX, coords="affine")
+    coords = subgrid["coords"]
+    lats, lons, _ = next(iter(full_fields(first_file).values()))
+    row0, _, col0, _ = subgrid["window"]
+
+    assert coords["type"] == "affine"
+    x, y = pyproj.Proj(coords["crs"])(lons[row0, col0], lats[row0, col0])
+    # within 1% of a grid step (lat/lon are stored to micro-degrees)
+    assert abs(x - coords["x0"]) < 0.01 * abs(coords["dx"]) and abs(y - coords["y0"]) < 0.01 * abs(coords["dy"])
+
+
+def test_keywords_filter_messages(first_file):
+    everything = grib_subgrid.extract_bbox(first_file, BBOX)
+    precip = grib_subgrid.extract_bbox(first_file, BBOX, keywords=["precipitation"])
+
+    assert 0 < len(precip["messages"]) < len(everything["messages"])
+    assert all("precipitation" in msg["name"].lower() for msg in precip["messages"])
+
+
+def test_bbox_off_the_grid_is_none(first_file):
+    assert grib_subgrid.extract_bbox(first_file, (60.0, 62.0, 10.0, 12.0)) is None
+
+
+def test_payload_round_trips_through_json(first_file):
+    subgrid = grib_subgrid.extract_bbox(first_file, BBOX, coords="latlon")
+    payload = json.loads(json.dumps(grib_subgrid.subgrid_payload(subgrid)))
+
+    for msg, sent in zip(subgrid["messages"], payload["messages"]):
+        np.testing.assert_array_equal(grib_subgrid.decode_array(sent["values"]), msg["values"])
+    np.testing.assert_array_equal(grib_subgrid.decode_array(payload["coords"]["lats"]), subgrid["coords"]["lats"])
+
+
+def test_find_forecast_file(href_sandbox):
+    assert grib_subgrid.find_forecast_file("HREF", 6).name == "href.t12z.conus.prob.f06.grib2"
+    assert grib_subgrid.find_forecast_file("HREF", 48) is None
@@ -0,0 +1,44 @@
+"""Shared float32 geometries in the converter's worker pools."""
+import multiprocessing
+
+import numpy as np
+import pygrib
+import pytest
+
+import grib_data_to_json
+import grid_geometry
+from conftest import LAT, LON
+from point_cache import resolve_cell
+
+
+def worker_geometry(grid_id, lat, lon):
+    geometry = grid_geometry.cached_geometry(grid_id)
+    return geometry.lats.dtype.str, geometry.shared, geometry.nearest_index(lat, lon)
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+@pytest.mark.parametrize("full_precision", [False, True])
+def test_workers_use_the_shared_geometry(synthetic_href, method, full_precision):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"no {method} start method")
+    files = grib_data_to_json.list_grib_files(synthetic_href)
+    # the parent resolves first, filling its own geometry cache before the pool starts
+    key = resolve_cell("HREF", files, LAT, LON, full_precision)
+    expected = np.dtype(np.float64 if full_precision else np.float32).str
+    assert grid_geometry.cached_geometry(key.grid_id).lats.dtype.str == expected
+
+    context = multiprocessing.get_context(method)
+    with grib_data_to_json.share_geometries(files[:1], grid_geometry.SharedGeometries(full_precision)) as shared, \
+            context.Pool(2, initializer=grib_data_to_json.init_worker, initargs=(shared.descriptors,)) as pool:
+        results = pool.starmap(worker_geometry, [(key.grid_id, LAT, LON)] * 2)
+    for dtype, is_shared, index in results:
+        assert (dtype, is_shared, index) == (expected, True, (key.i, key.j))
+
+
+def test_full_precision_is_decoded_again_after_float32(synthetic_href):
+    with pygrib.open(str(next(synthetic_href.iterdir()))) as grbs:
+        grb = grbs.message(1)
+        exact, _ = grb.latlons()
+        grid_geometry.geometry_for_message(grb, full_precision=False)
+        geometry = grid_geometry.geometry_for_message(grb, full_precision=True)
+    np.testing.assert_array_equal(geometry.lats, exact)
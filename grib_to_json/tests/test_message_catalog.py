@@ -0,0 +1,85 @@
+"""MessageCatalog.find() against a full header scan, and the catalog-backed visualizer lookup."""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pygrib
+import pytest
+
+import message_catalog
+from conftest import drop_messages
+from grib_data_to_json import list_grib_files
+from message_catalog import CatalogEntry, MessageCatalog
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import grib_visualizer  # noqa: E402
+
+QUERIES = [
+    # var, upper_limit, lower_limit, forecast_length, valid_start offset (hours after analysis)
+    ("tp", 12.7, None, 1, 3),
+    ("tp", 25.4, None, 3, None),
+    ("ws", 15.4, None, None, None),
+    ("t", None, 273.15, 0, 6),
+    ("aptmp", 310.9, None, None, 1),
+    ("tp", 99.0, None, None, None),
+]
+
+
+@pytest.fixture
+def catalog_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(message_catalog, "CATALOG_DIR", tmp_path / "catalog")
+    return tmp_path / "catalog"
+
+
+def full_scan(folder, var, upper, lower, length, valid_start):
+    """(file, msgno) of every matching message, read straight from the GRIB headers."""
+    found = set()
+    for file_path in list_grib_files(folder):
+        with pygrib.open(str(file_path)) as grbs:
+            for grb in grbs:
+                if var not in (grb.cfVarName, grb.shortName):
+                    continue
+                if upper is not None and grb.upperLimit != pytest.approx(upper):
+                    continue
+                if lower is not None and grb.lowerLimit != pytest.approx(lower):
+                    continue
+                if length is not None and grb.endStep - grb.startStep != length:
+                    continue
+                if valid_start is not None and grb.analDate + timedelta(hours=grb.startStep) != valid_start:
+                    continue
+                found.add((str(file_path), grb.messagenumber))
+    return found
+
+
+def analysis_date(folder):
+    with pygrib.open(str(list_grib_files(folder)[0])) as grbs:
+        return grbs.message(1).analDate
+
+
+@pytest.mark.parametrize("var, upper, lower, length, offset", QUERIES)
+def test_find_matches_a_full_scan(href_sandbox, catalog_dir, var, upper, lower, length, offset):
+    valid_start = analysis_date(href_sandbox) + timedelta(hours=offset) if offset is not None else None
+    catalog = message_catalog.load_catalog(href_sandbox)
+    found = {(e.file, e.msgno) for e in catalog.find(var, upper, lower, length, valid_start)}
+
+    assert found == full_scan(href_sandbox, var, upper, lower, length, valid_start)
+    assert found or upper == 99.0
+
+
+def test_changed_file_is_rescanned(href_sandbox, catalog_dir):
+    before = message_catalog.load_catalog(href_sandbox)
+    drop_messages(list_grib_files(href_sandbox)[0], "Wind speed")
+
+    catalog = message_catalog.load_catalog(href_sandbox)
+    assert len(catalog.find("ws")) < len(before.find("ws"))
+    assert {(e.file, e.msgno) for e in catalog.find("ws")} == full_scan(href_sandbox, "ws", None, None, None, None)
+    # the saved catalog is reused as is when nothing changed
+    assert message_catalog.load_catalog(href_sandbox).entries == catalog.entries
+
+
+def test_visualizer_tolerates_a_missing_analysis_date(monkeypatch, capsys):
+    entry = CatalogEntry("missing.grib2", 1, "tp", "tp", 0.0, 12.7, 0, 1, None)
+    monkeypatch.setattr(grib_visualizer, "load_catalog", lambda folder: MessageCatalog([entry]))
+
+    grib_visualizer.get_one_forecast("unused", 12.7, "tp", None, 2, 38.9, -97.5)
+    assert "analysis date: None" in capsys.readouterr().out
@@ -0,0 +1,62 @@
+"""run_all_models / make_json_file into MemorySink on synthetic HREF data."""
+import pytest
+
+import grib_data_to_json
+from conftest import LAT, LON
+from output_sinks import BUCKET_KEY, MemorySink, bucket_to_docs, doc_key, output_to_docs
+
+
+def _row_keys(docs):
+    """doc_key without lat/lon: bucket docs carry the cell center, not the requested point."""
+    return sorted(key[:2] + key[4:] for key in map(doc_key, docs))
+
+
+def _run(sink):
+    return grib_data_to_json.run_all_models(LAT, LON, write=False, cache=None, sink=sink)["HREF"]
+
+
+def test_memory_sink_bucket_layout(href_sandbox):
+    sink = MemorySink()
+    output_data = _run(sink)
+
+    assert sink.bucketed and not sink.docs
+    assert len(sink.buckets) == 1
+    (key, bucket), = sink.buckets.items()
+    cell = output_data["metadata"]["cell"]
+    assert key == tuple(bucket[k] for k in BUCKET_KEY)
+    assert (bucket["sitrep"], bucket["grid_id"], bucket["i"], bucket["j"]) == \
+        ("HREF", cell["grid_id"], cell["i"], cell["j"])
+    assert bucket["count"] == len(output_data["data"])
+    assert _row_keys(bucket_to_docs(bucket)) == _row_keys(output_to_docs(output_data))
+
+    # a rerun replaces the bucket instead of adding a second one
+    _run(sink)
+    assert len(sink.buckets) == 1
+
+
+def test_memory_sink_rows_layout(href_sandbox):
+    sink = MemorySink(batch_size=7, layout="rows")
+    output_data = _run(sink)
+
+    assert not sink.bucketed and not sink.buckets
+    docs = output_to_docs(output_data)
+    assert docs and all("cell" in doc for doc in docs)
+    # rows are upserted on UNIQUE_KEY, so repeated messages collapse
+    assert set(sink.docs) == {doc_key(doc) for doc in docs}
+    assert sink.batches >= len(grib_data_to_json.list_grib_files(href_sandbox))
+
+
+def test_make_json_file_into_memory_sink(href_sandbox, monkeypatch):
+    monkeypatch.setattr(grib_data_to_json, "write_json_output", lambda *args, **kwargs: None)
+    output_data = grib_data_to_json.make_json_file(href_sandbox, LAT, LON,
+                                                   grib_data_to_json.DESIRED_FORECAST_TYPES)
+    sink = MemorySink()
+    assert sink.write_output(output_data) == len(output_data["data"])
+    assert _row_keys(bucket_to_docs(*sink.buckets.values())) == _row_keys(output_to_docs(output_data))
+
+
+def test_memory_sink_bucket_layout_rejects_rows():
+    with pytest.raises(TypeError):
+        MemorySink().write([])
+    with pytest.raises(ValueError):
+        MemorySink(layout="columns")
@@ -0,0 +1,25 @@
+"""Every output writer's reader returns the same row-oriented document."""
+import pytest
+
+from output_writers import WRITERS, available_formats, importable_formats
+
+OUTPUT = {
+    "metadata": {"sitrep": "HREF", "anal_date": "2025-10-16 12:00:00", "location": {"lat": 38.9, "lon": -97.5}},
+    "data": [
+        {"threshold": "> 2.54 kg m**-2", "name": "Total Precipitation", "step_length": 1, "forecast_time": 0,
+         "value": 12.5},
+        {"threshold": "> 10.3 m s**-1", "name": "Wind speed", "step_length": 0, "forecast_time": 1, "value": 0.0},
+    ],
+}
+
+
+@pytest.mark.parametrize("name", available_formats())
+def test_reader_round_trip(tmp_path, name):
+    entry = WRITERS[name]
+    path = tmp_path / f"out{entry['extension']}"
+    entry["write"](OUTPUT, path)
+    assert entry["read"](path) == OUTPUT
+
+
+def test_importable_formats_are_json_files():
+    assert set(importable_formats()) == {"json", "orjson", "columnar"}
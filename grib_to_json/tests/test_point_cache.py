@@ -0,0 +1,24 @@
+"""PointCache hit accounting."""
+from point_cache import CellKey, PointCache
+
+KEY = CellKey("HREF", "2025101612", "abc", 3, 4)
+
+
+def test_stale_entries_count_as_misses(tmp_path):
+    cache = PointCache(tmp_path)
+    cache.put(KEY, {"version": "old", "data": []})
+
+    assert cache.get(KEY, version="new") is None
+    assert cache.get(KEY, fresh=True, version="new") is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    assert cache.get(KEY, version="old")["version"] == "old"
+    assert cache.get(KEY, fresh=True)["version"] == "old"
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert cache.hit_rate() == 0.5
+
+
+def test_missing_entry_is_a_miss(tmp_path):
+    cache = PointCache(tmp_path)
+    assert cache.get(KEY) is None
+    assert (cache.hits, cache.misses) == (0, 1)
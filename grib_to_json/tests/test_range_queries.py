@@ -0,0 +1,42 @@
+"""range_queries window aggregates on a synthetic HREF store with a gap in one series."""
+import numpy as np
+import pytest
+
+import range_queries
+import timeseries_store
+from conftest import LAT, LON, drop_messages
+from test_timeseries_store import GAP_HOUR, GAP_NAME
+
+REDUCE = {"max": np.max, "min": np.min, "sum": np.sum, "mean": np.mean}
+
+
+@pytest.fixture
+def gap_store(href_sandbox):
+    """(index, {series: the cell's values at the hours that exist}) of a store missing GAP_NAME at GAP_HOUR."""
+    drop_messages(href_sandbox / f"href.t12z.conus.prob.f{GAP_HOUR:02d}.grib2", GAP_NAME)
+    store_dir = timeseries_store.build_store("HREF", pool=None)
+    range_queries.build_range_tables(store_dir)
+
+    index, geometry, values = timeseries_store._open_store(store_dir)
+    row, col = geometry.nearest_index(LAT, LON)
+    tile = timeseries_store.SPATIAL_TILE
+    block = values[row // tile, col // tile, :, :, row % tile, col % tile]
+    present = {series: [float(block[series, hour]) for hour, t in enumerate(times) if t is not None]
+               for series, times in enumerate(index["forecast_times"])}
+    return index, present
+
+
+@pytest.mark.parametrize("op", sorted(REDUCE))
+def test_window_skips_the_missing_hour(gap_store, op):
+    index, present = gap_store
+    results = range_queries.window_aggregate("HREF", LAT, LON, 1, 6, op)
+    assert len(results) == len(index["series"])
+    for (_, name, _), values, result in zip(index["series"], present.values(), results):
+        assert result["hours"] == len(values) == (5 if name == GAP_NAME else 6)
+        assert result["value"] == pytest.approx(REDUCE[op](values), rel=1e-5, abs=1e-3)
+
+
+def test_window_over_only_the_missing_hour(gap_store):
+    results = range_queries.window_aggregate("HREF", LAT, LON, GAP_HOUR, GAP_HOUR, "min")
+    assert results and not any(r["name"] == GAP_NAME for r in results)
+    assert all(np.isfinite(r["value"]) for r in results)
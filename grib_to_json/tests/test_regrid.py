@@ -0,0 +1,72 @@
+"""Regridding the synthetic grid onto a regular lat/lon target."""
+import numpy as np
+import pygrib
+import pytest
+
+import regrid
+from conftest import LAT, LON, distance_m
+from grib_data_to_json import list_grib_files
+from grid_geometry import geometry_for_message
+
+TARGET = regrid.TargetGrid(LAT - 2.0, LAT + 2.0, LON - 3.0, LON + 3.0, 0.25)
+
+
+@pytest.fixture
+def source(synthetic_href, tmp_path, monkeypatch):
+    """(geometry, values) of the first message of the first synthetic HREF file, weights cached in tmp_path."""
+    monkeypatch.setattr(regrid, "WEIGHTS_DIR", tmp_path / "regrid_weights")
+    monkeypatch.setattr(regrid, "_WEIGHTS", {})
+    with pygrib.open(str(list_grib_files(synthetic_href)[0])) as grbs:
+        grb = grbs.message(1)
+        return geometry_for_message(grb, full_precision=True), grb.values
+
+
+def test_nearest_picks_the_closest_source_cell(source):
+    geometry, _ = source
+    # every source cell holds its own flat index, so the output names the cell it came from
+    ids = np.arange(geometry.lats.size, dtype=np.float64)
+    out = regrid.regrid(ids, geometry, TARGET, method="nearest")
+
+    assert np.isfinite(out).all()
+    lats, lons = TARGET.latlons()
+    rows, cols = np.divmod(out.astype(np.int64), geometry.shape[1])
+    picked = distance_m(lats, lons, geometry.lats[rows, cols], geometry.lons_180[rows, cols])
+    for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        neighbour = distance_m(lats, lons, geometry.lats[rows + dr, cols + dc], geometry.lons_180[rows + dr, cols + dc])
+        # nearest in the projected plane; the conformal projection barely distorts a cell
+        assert (picked <= neighbour * 1.01).all()
+
+
+def test_nearest_output_matches_the_source_values(source):
+    geometry, values = source
+    out = regrid.regrid(values, geometry, TARGET, method="nearest")
+
+    i = TARGET.shape[0] // 2
+    j = TARGET.shape[1] // 2
+    lats, lons = TARGET.latlons()
+    assert (lats[i, j], lons[i, j]) == (LAT, LON)
+    assert out[i, j] == np.float32(values[geometry.nearest_index(LAT, LON)])
+    assert np.isin(out, np.asarray(values, dtype=np.float32)).all()
+
+
+def test_bilinear_keeps_a_constant_field(source):
+    geometry, _ = source
+    out = regrid.regrid(np.full(geometry.shape, 42.0), geometry, TARGET, method="bilinear")
+
+    assert np.allclose(out, 42.0)
+
+
+def test_target_outside_the_grid_is_nan(source):
+    geometry, values = source
+    out = regrid.regrid(values, geometry, regrid.TargetGrid(60.0, 62.0, 10.0, 12.0, 0.5), method="nearest")
+
+    assert np.isnan(out).all()
+
+
+def test_weights_are_persisted_and_reused(source):
+    geometry, values = source
+    first = regrid.regrid(values, geometry, TARGET, method="bilinear")
+    regrid._WEIGHTS.clear()
+
+    assert list(regrid.WEIGHTS_DIR.glob("*_bilinear.npz"))
+    np.testing.assert_array_equal(regrid.regrid(values, geometry, TARGET, method="bilinear"), first)
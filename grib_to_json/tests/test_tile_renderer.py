@@ -0,0 +1,98 @@
+"""Tile coverage on the synthetic grid and tile-cache invalidation when a forecast hour is refetched."""
+import io
+import os
+import shutil
+
+import numpy as np
+import pygrib
+import pytest
+from PIL import Image
+
+import tile_renderer
+from conftest import LAT, LON, distance_m
+from grib_data_to_json import list_grib_files
+from grib_metadata import describe_message
+from grid_geometry import geometry_for_message
+
+Z = 6
+
+
+@pytest.fixture
+def tile_sandbox(href_sandbox, tmp_path, monkeypatch):
+    """HREF download folder with the tile cache redirected to tmp_path."""
+    monkeypatch.setattr(tile_renderer, "TILE_DIR", tmp_path / "tile_cache")
+    tile_renderer._FIELD_CACHE.clear()
+    return href_sandbox
+
+
+def probability_message(file_path):
+    """(geometry, msgno) of the first probability message in a file."""
+    with pygrib.open(str(file_path)) as grbs:
+        for grb in grbs:
+            if describe_message(grb).is_probability:
+                return geometry_for_message(grb), grb.messagenumber
+    raise AssertionError(f"no probability message in {file_path}")
+
+
+def point_tile(z):
+    """(x, y) of the zoom-z tile holding LAT/LON."""
+    x, _, y, _ = tile_renderer.tile_range(LAT, LAT, LON, LON, z)
+    return x, y
+
+
+def test_tile_inside_grid_is_fully_covered_by_nearby_cells(tile_sandbox):
+    geometry, _ = probability_message(list_grib_files(tile_sandbox)[0])
+    x, y = point_tile(Z)
+    lut = tile_renderer.tile_lut(geometry, Z, x, y)
+
+    assert (lut >= 0).all()
+    lons, lats = tile_renderer.tile_lonlats(Z, x, y)
+    rows, cols = np.divmod(lut, geometry.shape[1])
+    distance = distance_m(lats.ravel(), lons.ravel(), geometry.lats[rows, cols], geometry.lons_180[rows, cols])
+    # no pixel is further from its cell's centre than the cell's half-diagonal
+    radius = geometry.cell(*geometry.nearest_index(LAT, LON))["radius_m"]
+    assert distance.max() <= radius * 1.01
+
+
+def test_edge_tile_is_partly_covered(tile_sandbox):
+    geometry, _ = probability_message(list_grib_files(tile_sandbox)[0])
+    # the tile holding the grid's first (south-west) corner point
+    lat, lon = float(geometry.lats[0, 0]), float(geometry.lons_180[0, 0])
+    x, _, y, _ = tile_renderer.tile_range(lat, lat, lon, lon, Z)
+    inside = tile_renderer.tile_lut(geometry, Z, x, y) >= 0
+
+    assert 0 < inside.mean() < 1
+
+
+def test_tile_off_grid_is_transparent(tile_sandbox):
+    file_path = list_grib_files(tile_sandbox)[0]
+    geometry, msgno = probability_message(file_path)
+    x, y = 8, 5  # z4 tile over Europe
+
+    assert (tile_renderer.tile_lut(geometry, 4, x, y) == -1).all()
+    png = tile_renderer.render_tile("HREF", file_path, msgno, 4, x, y)
+    assert not np.asarray(Image.open(io.BytesIO(png)))[..., 3].any()
+
+
+def test_refetched_hour_gets_fresh_tiles(tile_sandbox):
+    files = list_grib_files(tile_sandbox)
+    first, last = files[0], files[-1]
+    _, msgno = probability_message(first)
+    x, y = point_tile(Z)
+    old = tile_renderer.render_tile("HREF", first, msgno, Z, x, y)
+    old_key = tile_renderer.message_key(first, msgno)
+
+    # refetch within the cycle: same name, new contents
+    mtime = os.stat(first).st_mtime_ns
+    shutil.copyfile(last, first)
+    os.utime(first, ns=(mtime, mtime + 10 ** 9))
+    new = tile_renderer.render_tile("HREF", first, msgno, Z, x, y)
+
+    assert tile_renderer.message_key(first, msgno) != old_key
+    assert new != old
+    assert new == tile_renderer.render_tile("REFETCHED", last, msgno, Z, x, y)
+
+    cycle = tile_renderer.file_cycle(first)
+    tile_renderer.purge_stale_versions("HREF", cycle, first)
+    cycle_dir = tile_renderer.TILE_DIR / "HREF" / cycle
+    assert [p.name for p in cycle_dir.iterdir()] == [tile_renderer.message_key(first, msgno)]
@@ -0,0 +1,27 @@
+"""timeseries_store.build_store on synthetic HREF data."""
+import numpy as np
+
+import timeseries_store
+from conftest import LAT, LON, drop_messages
+
+GAP_NAME = "Apparent temperature"
+GAP_HOUR = 3
+
+
+def test_missing_slots_are_nan(href_sandbox):
+    drop_messages(href_sandbox / f"href.t12z.conus.prob.f{GAP_HOUR:02d}.grib2", GAP_NAME)
+    store_dir = timeseries_store.build_store("HREF", pool=None)
+    index, _, values = timeseries_store._open_store(store_dir)
+
+    hour = index["hours"].index(GAP_HOUR)
+    gap = [s for s, (_, name, _) in enumerate(index["series"]) if name == GAP_NAME]
+    others = [s for s, (_, name, _) in enumerate(index["series"]) if name != GAP_NAME]
+    assert gap and others
+    assert all(index["forecast_times"][s][hour] is None for s in gap)
+    assert np.isnan(values[:, :, gap, hour]).all()
+    assert not np.isnan(values[0, 0, others, hour]).all()
+
+    data = timeseries_store.timeseries("HREF", LAT, LON)["data"]
+    gap_rows = [row for row in data if row["name"] == GAP_NAME]
+    assert gap_rows and all(np.isfinite(row["value"]) for row in gap_rows)
+    assert len({row["forecast_time"] for row in gap_rows}) == len(index["hours"]) - 1
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# tile_renderer.py (XYZ map tiles from GRIB fields)
+"""
+Renders decoded GRIB probability fields as 256x256 Web Mercator PNG tiles.
+
+Every tile pixel is mapped to a grid index once per (grid, z, x, y) and the
+lookup table is reused for every message/file on that grid, so rendering a
+tile is one fancy-index plus one colormap-LUT lookup. Tiles are cached on
+disk under tile_cache/<model>/<cycle>/<message>/<z>/<x>/<y>.png, where the
+message id carries the source file's size and mtime so a forecast hour
+refetched within a cycle gets fresh tiles, and the low zooms are warmed
+right after each fetch, so most map requests are a file read.
+
+    python tile_renderer.py [--model HREF] [--max-zoom 4] [--var precip]
+"""
+import argparse
+import io
+import logging
+import math
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pyproj
+from PIL import Image
+
+from grib_data_to_json import DESIRED_FORECAST_TYPES, MODEL_FOLDERS, is_interesting_message, list_grib_files, open_grib
+from grib_metadata import describe_message
+from grid_geometry import geometry_for_message
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+TILE_DIR = SCRIPT_DIR / "tile_cache"
+
+TILE_SIZE = 256
+WARM_MAX_ZOOM = 4
+MAX_ZOOM = 12
+MAX_LUT_CACHE = 512
+MAX_FIELD_CACHE = 8
+MERCATOR_MAX_LAT = 85.0511287798
+
+# Probability colour stops (percent -> RGBA), interpolated into a 256 entry LUT
+COLOR_STOPS = [
+    (0, (68, 1, 84, 0)),
+    (5, (72, 40, 120, 150)),
+    (25, (49, 104, 142, 180)),
+    (50, (33, 145, 140, 200)),
+    (75, (94, 201, 98, 220)),
+    (100, (253, 231, 37, 235)),
+]
+
+logger = logging.getLogger("tile_renderer")
+
+_LUT_CACHE = OrderedDict()
+_FIELD_CACHE = OrderedDict()
+_CYCLE_CACHE = {}
+_cache_lock = threading.Lock()
+
+
+def build_colormap(stops=COLOR_STOPS):
+    """Returns a (256, 4) uint8 RGBA table spanning 0-100 %."""
+    positions = np.array([p for p, _ in stops], dtype=np.float32) * 255.0 / 100.0
+    colors = np.array([c for _, c in stops], dtype=np.float32)
+    index = np.arange(256, dtype=np.float32)
+    table = np.stack([np.interp(index, positions, colors[:, k]) for k in range(4)], axis=1)
+    return table.round().astype(np.uint8)
+
+
+COLORMAP = build_colormap()
+
+
+def tile_lonlats(z, x, y):
+    """Lon/lat (degrees) of every pixel centre of tile (z, x, y), each shaped (256, 256)."""
+    n = 2 ** z
+    pixels = (np.arange(TILE_SIZE, dtype=np.float64) + 0.5) / TILE_SIZE
+    lons = (x + pixels) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * (y + pixels) / n))))
+    return np.meshgrid(lons, lats)
+
+
+def tile_range(lat_min, lat_max, lon_min, lon_max, z):
+    """Returns (x0, x1, y0, y1), the inclusive tile index range covering a lat/lon box at zoom z."""
+    n = 2 ** z
+
+    def to_x(lon):
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def to_y(lat):
+        lat = math.radians(max(-MERCATOR_MAX_LAT, min(MERCATOR_MAX_LAT, lat)))
+        return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)))
+
+    return to_x(lon_min), to_x(lon_max), to_y(lat_max), to_y(lat_min)
+
+
+def tile_lut(geometry, z, x, y):
+    """
+    Returns a flat int32 array of 256*256 grid indices (row * ncols + col) for
+    tile (z, x, y) on geometry's grid, -1 where the pixel falls off the grid.
+    Built once per (grid, tile) from the grid's projected affine transform.
+    """
+    key = (geometry.grid_id, z, x, y)
+    with _cache_lock:
+        lut = _LUT_CACHE.get(key)
+        if lut is not None:
+            _LUT_CACHE.move_to_end(key)
+            return lut
+
+    affine = geometry.affine()
+    if affine is None:
+        raise RuntimeError(f"Grid {geometry.grid_id} has no projection parameters")
+
+    lons, lats = tile_lonlats(z, x, y)
+    px, py = pyproj.Proj(geometry.projparams)(lons, lats)
+    cols = np.rint((px - affine["x0"]) / affine["dx"]).astype(np.int64)
+    rows = np.rint((py - affine["y0"]) / affine["dy"]).astype(np.int64)
+    nrows, ncols = geometry.shape
+    inside = (rows >= 0) & (rows < nrows) & (cols >= 0) & (cols < ncols)
+    lut = np.where(inside, rows * ncols + cols, -1).astype(np.int32).ravel()
+
+    with _cache_lock:
+        _LUT_CACHE[key] = lut
+        while len(_LUT_CACHE) > MAX_LUT_CACHE:
+            _LUT_CACHE.popitem(last=False)
+    return lut
+
+
+def colorize(values, lut):
+    """Maps a flat float field through a tile LUT and the colormap; returns (256, 256, 4) uint8."""
+    sampled = np.full(lut.shape, np.nan, dtype=np.float32)
+    inside = lut >= 0
+    sampled[inside] = values[lut[inside]]
+    valid = np.isfinite(sampled)
+    index = np.zeros(lut.shape, dtype=np.uint8)
+    index[valid] = np.clip(sampled[valid] * 2.55, 0, 255).astype(np.uint8)
+    rgba = COLORMAP[index]
+    rgba[~valid] = 0
+    return rgba.reshape(TILE_SIZE, TILE_SIZE, 4)
+
+
+def encode_png(rgba):
+    buf = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buf, format="PNG", optimize=False)
+    return buf.getvalue()
+
+
+def forecast_hour_of(file_path):
+    m = re.search(r'f(\d{2,3})', Path(file_path).name.lower())
+    return int(m.group(1)) if m else None
+
+
+def file_version(file_path):
+    """(size, mtime_ns) of a file as a short token; changes whenever the file is rewritten."""
+    st = Path(file_path).stat()
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def message_key(file_path, msgno):
+    """
+    Cache id of one message: forecast hour of its file, its message number
+    and the file's version ("f013m5.<size>-<mtime>").
+    """
+    prefix = "d" if ".derived." in Path(file_path).name else ""
+    return f"{prefix}f{forecast_hour_of(file_path):03d}m{int(msgno)}.{file_version(file_path)}"
+
+
+def file_cycle(file_path):
+    """Returns the analysis cycle ("%Y%m%d%H") of a GRIB file, memoized by path and mtime."""
+    file_path = Path(file_path)
+    key = (str(file_path), file_path.stat().st_mtime_ns)
+    cycle = _CYCLE_CACHE.get(key)
+    if cycle is None:
+        with open_grib(file_path) as grbs:
+            cycle = grbs.message(1).analDate.strftime("%Y%m%d%H")
+        _CYCLE_CACHE[key] = cycle
+    return cycle
+
+
+def tile_path(model, cycle, message, z, x, y):
+    return TILE_DIR / model / cycle / message / str(z) / str(x) / f"{y}.png"
+
+
+def load_field(file_path, msgno):
+    """Decodes one message to (geometry, flat float32 values), keeping the last few fields."""
+    key = (str(file_path), file_version(file_path), int(msgno))
+    with _cache_lock:
+        cached = _FIELD_CACHE.get(key)
+        if cached is not None:
+            _FIELD_CACHE.move_to_end(key)
+            return cached
+
+    with open_grib(Path(file_path)) as grbs:
+        grb = grbs.message(int(msgno))
+        geometry = geometry_for_message(grb)
+        values = grb.values
+    if np.ma.isMaskedArray(values):
+        values = values.astype(np.float32).filled(np.nan)
+    cached = (geometry, np.asarray(values, dtype=np.float32).ravel())
+
+    with _cache_lock:
+        _FIELD_CACHE[key] = cached
+        while len(_FIELD_CACHE) > MAX_FIELD_CACHE:
+            _FIELD_CACHE.popitem(last=False)
+    return cached
+
+
+def write_tile(path, png):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{threading.get_ident()}.part")
+    tmp.write_bytes(png)
+    tmp.replace(path)
+
+
+def render_tile(model, file_path, msgno, z, x, y):
+    """Returns the PNG bytes of tile (z, x, y) for one message, from the disk cache when possible."""
+    path = tile_path(model, file_cycle(file_path), message_key(file_path, msgno), z, x, y)
+    try:
+        return path.read_bytes()
+    except OSError:
+        pass
+
+    geometry, values = load_field(file_path, msgno)
+    png = encode_png(colorize(values, tile_lut(geometry, z, x, y)))
+    write_tile(path, png)
+    return png
+
+
+def purge_old_cycles(model, cycle):
+    """Removes cached tiles of every cycle of model other than `cycle`."""
+    model_dir = TILE_DIR / model
+    if model_dir.is_dir():
+        for cycle_dir in model_dir.iterdir():
+            if cycle_dir.name != cycle:
+                shutil.rmtree(cycle_dir, ignore_errors=True)
+
+
+def purge_stale_versions(model, cycle, file_path):
+    """Removes a file's cached tiles rendered from an earlier version of it (same cycle)."""
+    cycle_dir = TILE_DIR / model / cycle
+    if not cycle_dir.is_dir():
+        return
+    prefix = "d" if ".derived." in Path(file_path).name else ""
+    hour_re = re.compile(rf"{prefix}f{forecast_hour_of(file_path):03d}m\d+\.")
+    version = file_version(file_path)
+    for message_dir in cycle_dir.iterdir():
+        name = message_dir.name
+        if hour_re.match(name) and not name.endswith(f".{version}"):
+            shutil.rmtree(message_dir, ignore_errors=True)
+
+
+def warm_tiles(model, max_zoom=WARM_MAX_ZOOM, keywords=DESIRED_FORECAST_TYPES):
+    """
+    Renders zooms 0..max_zoom of every matching probability message of a model's
+    current files into the tile cache. Each message is decoded once.
+    Returns {"model", "cycle", "messages", "tiles", "seconds"}.
+    """
+    t0 = time.time()
+    keywords_lower = [k.lower() for k in keywords]
+    report = {"model": model, "cycle": None, "messages": 0, "tiles": 0, "seconds": 0.0}
+
+    for file_path in list_grib_files(MODEL_FOLDERS[model]):
+        if forecast_hour_of(file_path) is None:
+            continue
+        try:
+            cycle = file_cycle(file_path)
+        except Exception as e:
+            logger.warning(f"Skipping {Path(file_path).name}: {e}")
+            continue
+        if report["cycle"] != cycle:
+            report["cycle"] = cycle
+            purge_old_cycles(model, cycle)
+        purge_stale_versions(model, cycle, file_path)
+
+        with open_grib(Path(file_path)) as grbs:
+            for grb in grbs:
+                if not is_interesting_message(grb, keywords_lower):
+                    continue
+                try:
+                    if not describe_message(grb).is_probability:
+                        continue
+                except Exception:
+                    continue
+
+                geometry = geometry_for_message(grb)
+                values = grb.values
+                if np.ma.isMaskedArray(values):
+                    values = values.astype(np.float32).filled(np.nan)
+                values = np.asarray(values, dtype=np.float32).ravel()
+                message = message_key(file_path, grb.messagenumber)
+                lons = geometry.lons_180
+
+                for z in range(max_zoom + 1):
+                    x0, x1, y0, y1 = tile_range(float(geometry.lats.min()), float(geometry.lats.max()),
+                                                float(lons.min()), float(lons.max()), z)
+                    for x in range(x0, x1 + 1):
+                        for y in range(y0, y1 + 1):
+                            path = tile_path(model, cycle, message, z, x, y)
+                            if path.exists():
+                                continue
+                            write_tile(path, encode_png(colorize(values, tile_lut(geometry, z, x, y))))
+                            report["tiles"] += 1
+                report["messages"] += 1
+
+    report["seconds"] = round(time.time() - t0, 2)
+    logger.info(
+        f"Tile warm-up {model} cycle {report['cycle']}: {report['messages']} messages, "
+        f"{report['tiles']} tiles (z0-{max_zoom}) in {report['seconds']:.1f}s"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render low-zoom map tiles after a model fetch")
+    parser.add_argument("--model", choices=list(MODEL_FOLDERS), action="append",
+                        help="model(s) to render (default: all)")
+    parser.add_argument("--max-zoom", type=int, default=WARM_MAX_ZOOM)
+    parser.add_argument("--var", action="append", help="message name keywords (default: DESIRED_FORECAST_TYPES)")
+    args = parser.parse_args()
+
+    for model in args.model or list(MODEL_FOLDERS):
+        warm_tiles(model, max_zoom=args.max_zoom, keywords=args.var or DESIRED_FORECAST_TYPES)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# timeseries_store.py (time-major per-model store)
+"""
+Rewrites a model cycle's file-per-hour GRIB data into one time-major array so
+that a point's full forecast (every variable, threshold and hour) is a single
+contiguous read instead of one file open per forecast hour.
+
+Layout of timeseries/<model>/<cycle>/values.f32 (float32, C order):
+
+    [tile_row, tile_col, series, hour, y, x]
+
+with SPATIAL_TILE x SPATIAL_TILE spatial tiles. A series is one probability
+product (threshold text, name, n-th occurrence in a file); index.json holds
+the series list, the forecast hours and each (series, hour)'s forecastTime
+and step length. Slots no message wrote hold NaN. The store is built after
+each fetch, one worker per file.
+
+    python timeseries_store.py [--model HREF]
+"""
+import argparse
+import json
+import logging
+import re
+import shutil
+import time
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+
+from grib_data_to_json import (
+    DESIRED_FORECAST_TYPES,
+    MODEL_FOLDERS,
+    assemble_output,
+    default_pool_size,
+    detect_model_cycle,
+    is_interesting_message,
+    list_grib_files,
+    open_grib,
+)
+from grib_metadata import describe_message
+from grid_geometry import GridGeometry, geometry_for_message
+from output_writers import HEADERS
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+STORE_DIR = SCRIPT_DIR / "timeseries"
+SPATIAL_TILE = 8
+
+logger = logging.getLogger("timeseries_store")
+
+_STORES = {}
+
+
+def forecast_end_of(file_path):
+    m = re.search(r'f(\d{2,3})', Path(file_path).name.lower())
+    return int(m.group(1)) if m else None
+
+
+def scan_messages(file_path, keywords_lower):
+    """
+    Header pass over one file: returns [(msgno, series_key, forecastTime)] for
+    every matching probability message, plus the file's analDate.
+    """
+    messages = []
+    anal_date = None
+    seen = Counter()
+    with open_grib(Path(file_path)) as grbs:
+        for grb in grbs:
+            if not is_interesting_message(grb, keywords_lower):
+                continue
+            try:
+                descriptor = describe_message(grb)
+            except Exception:
+                continue
+            if not descriptor.is_probability:
+                continue
+            anal_date = anal_date or grb.analDate
+            base = (descriptor.threshold_text, descriptor.name)
+            messages.append((grb.messagenumber, base + (seen[base],), grb.forecastTime))
+            seen[base] += 1
+    return messages, anal_date
+
+
+def tiled_shape(shape, n_series, n_hours):
+    ny, nx = shape
+    return (-(-ny // SPATIAL_TILE), -(-nx // SPATIAL_TILE), n_series, n_hours, SPATIAL_TILE, SPATIAL_TILE)
+
+
+def _write_hour(task, values_path, shape):
+    """Worker: decodes one file's messages and writes them into their (series, hour) slots."""
+    file_path, hour, slots = task
+    store = np.memmap(values_path, dtype=np.float32, mode="r+", shape=shape)
+    tile_rows, tile_cols = shape[0], shape[1]
+    padded = np.full((tile_rows * SPATIAL_TILE, tile_cols * SPATIAL_TILE), np.nan, dtype=np.float32)
+    with open_grib(Path(file_path)) as grbs:
+        for msgno, series in slots:
+            values = grbs.message(msgno).values
+            if np.ma.isMaskedArray(values):
+                values = values.astype(np.float32).filled(np.nan)
+            padded[:values.shape[0], :values.shape[1]] = values
+            tiles = padded.reshape(tile_rows, SPATIAL_TILE, tile_cols, SPATIAL_TILE).transpose(0, 2, 1, 3)
+            store[:, :, series, hour] = tiles
+    store.flush()
+    del store
+    return len(slots)
+
+
+def build_store(model, keywords=DESIRED_FORECAST_TYPES, pool=None):
+    """
+    Builds the time-major store for the model's current files and removes
+    stores of older cycles. Returns the store directory, or None if the model
+    has no matching messages.
+    """
+    t0 = time.time()
+    keywords_lower = [k.lower() for k in keywords]
+    files = [f for f in list_grib_files(MODEL_FOLDERS[model]) if forecast_end_of(f) is not None]
+    files.sort(key=forecast_end_of)
+
+    scans = [scan_messages(f, keywords_lower) for f in files]
+    anal_date = next((ad for _, ad in scans if ad is not None), None)
+    if anal_date is None:
+        logger.warning(f"No probability messages for {model}, time-series store not built")
+        return None
+
+    series_index = {}
+    for messages, _ in scans:
+        for _, key, _ in messages:
+            series_index.setdefault(key, len(series_index))
+    n_series, n_hours = len(series_index), len(files)
+    forecast_times = [[None] * n_hours for _ in range(n_series)]
+    step_lengths = [[None] * n_hours for _ in range(n_series)]
+    tasks = []
+    for hour, (file_path, (messages, _)) in enumerate(zip(files, scans)):
+        slots = []
+        for msgno, key, forecast_time in messages:
+            series = series_index[key]
+            forecast_times[series][hour] = forecast_time
+            step_lengths[series][hour] = forecast_end_of(file_path) - forecast_time
+            slots.append((msgno, series))
+        tasks.append((file_path, hour, slots))
+
+    with open_grib(Path(files[0])) as grbs:
+        geometry = geometry_for_message(grbs.message(1))
+
+    cycle = anal_date.strftime("%Y%m%d%H")
+    store_dir = STORE_DIR / model / cycle
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    store_dir.mkdir(parents=True)
+    np.save(store_dir / "lats.npy", geometry.lats.astype(np.float32))
+    np.save(store_dir / "lons.npy", geometry.lons.astype(np.float32))
+
+    shape = tiled_shape(geometry.shape, n_series, n_hours)
+    values_path = store_dir / "values.f32"
+    # NaN marks a (series, hour) slot no message wrote, so "no data" never reads as 0%
+    store = np.memmap(values_path, dtype=np.float32, mode="w+", shape=shape)
+    for tile_row in store:
+        tile_row[:] = np.nan
+    store.flush()
+    del store
+
+    fn = partial(_write_hour, values_path=str(values_path), shape=shape)
+    if pool is not None:
+        written = sum(pool.map(fn, tasks, chunksize=1))
+    else:
+        with Pool(processes=default_pool_size(len(tasks))) as own_pool:
+            written = sum(own_pool.map(fn, tasks, chunksize=1))
+
+    sitrep, cycle_hint = detect_model_cycle(Path(files[0]).name.lower())
+    index = {
+        "model": model,
+        "sitrep": sitrep,
+        "cycle": cycle_hint,
+        "anal_date": anal_date.strftime("%Y-%m-%d %H:%M:%S"),
+        "folder": str(MODEL_FOLDERS[model]),
+        "grid_id": geometry.grid_id,
+        "grid_shape": list(geometry.shape),
+        "shape": list(shape),
+        "hours": [forecast_end_of(f) for f in files],
+        "series": [list(key) for key in series_index],
+        "forecast_times": forecast_times,
+        "step_lengths": step_lengths,
+    }
+    # index.json is written last: its presence marks a complete store
+    (store_dir / "index.json").write_text(json.dumps(index), encoding="utf-8")
+
+    model_dir = STORE_DIR / model
+    for cycle_dir in model_dir.iterdir():
+        if cycle_dir.name != cycle:
+            shutil.rmtree(cycle_dir, ignore_errors=True)
+
+    size_mb = values_path.stat().st_size / (1024 * 1024)
+    logger.info(f"Time-series store {model} {cycle}: {n_series} series x {n_hours} hours, "
+                f"{written} messages, {size_mb:,.0f} MB in {time.time() - t0:.1f}s")
+    return store_dir
+
+
+def latest_store_dir(model):
+    """Returns the newest complete store directory of a model, or None."""
+    model_dir = STORE_DIR / model
+    if not model_dir.is_dir():
+        return None
+    complete = sorted(d for d in model_dir.iterdir() if (d / "index.json").exists())
+    return complete[-1] if complete else None
+
+
+def _open_store(store_dir):
+    store = _STORES.get(store_dir)
+    if store is None:
+        index = json.loads((store_dir / "index.json").read_text(encoding="utf-8"))
+        geometry = GridGeometry(index.get("grid_id", store_dir.name), np.load(store_dir / "lats.npy"), np.load(store_dir / "lons.npy"))
+        values = np.memmap(store_dir / "values.f32", dtype=np.float32, mode="r", shape=tuple(index["shape"]))
+        store = (index, geometry, values)
+        _STORES.clear()
+        _STORES[store_dir] = store
+    return store
+
+
+def timeseries(model, lat, lon):
+    """
+    Returns the output document (same shape as grib_data_to_json's
+    build_output_data) holding every series and forecast hour of a model for
+    the grid cell nearest lat/lon, read from the time-major store.
+    Returns None if the model has no store yet.
+    """
+    store_dir = latest_store_dir(model)
+    if store_dir is None:
+        return None
+    index, geometry, values = _open_store(store_dir)
+
+    row, col = geometry.nearest_index(lat, lon)
+    block = np.array(values[row // SPATIAL_TILE, col // SPATIAL_TILE, :, :, row % SPATIAL_TILE, col % SPATIAL_TILE])
+
+    data = []
+    for hour in range(block.shape[1]):
+        for series, (threshold, name, _) in enumerate(index["series"]):
+            forecast_time = index["forecast_times"][series][hour]
+            if forecast_time is None:
+                continue
+            row_values = (threshold, name, index["step_lengths"][series][hour], forecast_time, float(block[series, hour]))
+            data.append(dict(zip(HEADERS, row_values)))
+
+    output_data, _ = assemble_output(index["sitrep"], index["cycle"], index["anal_date"], data,
+                                     index["folder"], lat, lon, geometry.cell(row, col))
+    return output_data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the time-major store after a model fetch")
+    parser.add_argument("--model", choices=list(MODEL_FOLDERS), action="append",
+                        help="model(s) to build (default: all)")
+    args = parser.parse_args()
+
+    for model in args.model or list(MODEL_FOLDERS):
+        build_store(model)
@@ -0,0 +1,245 @@
+"""
+Low-overhead stage timing for the fetch and GRIB -> JSON pipeline.
+
+Spans wrap the pipeline stages (fetch, idx parse, range download, file open,
+geometry, message select, decode, extract, write):
+
+    with span("decode", file=name):
+        values = grb.values
+
+    @traced("write")
+    def write_json_output(...): ...
+
+Tracing is off unless CINDER_TRACE is set (to a directory, or to 1 for
+traces/<timestamp>/); then span() is a shared no-op context manager and
+traced() a single flag check. When enabled, every process (pool workers
+included, the variable is inherited) appends Chrome trace events to
+<trace dir>/<pid>.jsonl after each file and on exit, and finish_run() in
+the parent merges them into trace.json (open in chrome://tracing or
+Perfetto) and logs a per-stage summary table.
+
+A background thread samples RSS every RSS_INTERVAL seconds; current_rss_mb()
+returns the last sample, so log formatting no longer queries the OS on
+every record.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+TRACE_ENV = "CINDER_TRACE"
+TRACE_ROOT = SCRIPT_DIR / "traces"
+RSS_INTERVAL = 0.5
+FLUSH_EVENTS = 2000
+
+logger = logging.getLogger("tracing")
+
+_NULL_SPAN = nullcontext()
+_events = []
+_events_lock = threading.Lock()
+_trace_dir = None
+_sampler_pid = None
+_rss_mb = None
+
+
+def _resolve_trace_dir(value):
+    if not value:
+        return None
+    if value.lower() in ("1", "true", "yes"):
+        path = TRACE_ROOT / datetime.now().strftime("%Y%m%d-%H%M%S")
+        # children inherit the resolved directory, not a fresh timestamp
+        os.environ[TRACE_ENV] = str(path)
+        return path
+    return Path(value)
+
+
+def enable(trace_dir=None):
+    """Turns tracing on for this process and every process it starts; returns the trace directory."""
+    global _trace_dir
+    _trace_dir = _resolve_trace_dir(str(trace_dir) if trace_dir else "1")
+    os.environ[TRACE_ENV] = str(_trace_dir)
+    _trace_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_sampler()
+    return _trace_dir
+
+
+def enabled():
+    return _trace_dir is not None
+
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+
+def _record(event):
+    with _events_lock:
+        _events.append(event)
+        full = len(_events) >= FLUSH_EVENTS
+    if full:
+        flush()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event = {
+            "name": self.name, "ph": "X", "ts": self.start, "dur": _now_us() - self.start,
+            "pid": os.getpid(), "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        if exc_type is not None:
+            event.setdefault("args", {})["error"] = exc_type.__name__
+        _record(event)
+        return False
+
+
+def span(name, **args):
+    """Context manager timing one stage; a shared no-op when tracing is off."""
+    if _trace_dir is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator form of span(); the stage name defaults to the function name."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _trace_dir is None:
+                return fn(*args, **kwargs)
+            with _Span(label, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def flush():
+    """Appends this process's buffered events to <trace dir>/<pid>.jsonl."""
+    if _trace_dir is None:
+        return
+    with _events_lock:
+        events = _events[:]
+        _events.clear()
+    if not events:
+        return
+    _trace_dir.mkdir(parents=True, exist_ok=True)
+    with open(_trace_dir / f"{os.getpid()}.jsonl", "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+# ---------- RSS sampler ----------
+def _read_rss_mb():
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _sample_loop(pid):
+    global _rss_mb
+    while _sampler_pid == pid:
+        _rss_mb = _read_rss_mb()
+        if _trace_dir is not None and _rss_mb is not None:
+            _record({"name": "rss", "ph": "C", "ts": _now_us(), "pid": pid, "args": {"MB": round(_rss_mb, 1)}})
+        time.sleep(RSS_INTERVAL)
+
+
+def _ensure_sampler():
+    # threads don't survive fork, so each process starts its own sampler
+    global _sampler_pid, _rss_mb
+    pid = os.getpid()
+    if _sampler_pid == pid:
+        return
+    _sampler_pid = pid
+    _rss_mb = _read_rss_mb()
+    threading.Thread(target=_sample_loop, args=(pid,), name="rss-sampler", daemon=True).start()
+
+
+def current_rss_mb():
+    """Last sampled RSS of this process in MB (None if unavailable)."""
+    _ensure_sampler()
+    return _rss_mb
+
+
+# ---------- Reporting ----------
+def load_events(trace_dir):
+    events = []
+    for path in sorted(Path(trace_dir).glob("*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    return events
+
+
+def summarize(events):
+    """Returns [(stage, count, total_s, mean_ms, max_ms)] for complete events, slowest total first."""
+    durations = {}
+    for event in events:
+        if event.get("ph") == "X":
+            durations.setdefault(event["name"], []).append(event["dur"])
+    table = [
+        (name, len(d), sum(d) / 1e6, sum(d) / len(d) / 1e3, max(d) / 1e3)
+        for name, d in durations.items()
+    ]
+    table.sort(key=lambda row: row[2], reverse=True)
+    return table
+
+
+def format_summary(table):
+    lines = [f"{'stage':<18} {'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}"]
+    for name, count, total, mean, peak in table:
+        lines.append(f"{name:<18} {count:>7} {total:>9.2f} {mean:>9.2f} {peak:>9.2f}")
+    return "\n".join(lines)
+
+
+def finish_run(label="run"):
+    """
+    Merges every process's events into <trace dir>/trace.json and logs the
+    per-stage summary. Call once in the parent after its pool has finished.
+    Returns the trace.json path, or None when tracing is off.
+    """
+    if _trace_dir is None:
+        return None
+    flush()
+    events = load_events(_trace_dir)
+    path = _trace_dir / "trace.json"
+    tmp = path.with_suffix(".part")
+    tmp.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+    tmp.replace(path)
+    logger.info(f"{label} trace ({len(events)} events) -> {path}\n{format_summary(summarize(events))}")
+    return path
+
+
+_trace_dir = _resolve_trace_dir(os.environ.get(TRACE_ENV, ""))
+# processes that exit normally (stage scripts, the service) keep their tail of events
+atexit.register(flush)
+if hasattr(os, "register_at_fork"):
+    # a forked worker must not re-emit the parent's buffered events
+    os.register_at_fork(after_in_child=_events.clear)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# warm_points.py (post-ingest warm-up)
+"""
+Precomputes a list of hot points right after a model's fetch completes, so
+the first user at each of those locations is served from the cache / DB.
+
+Sites come from a CSV (lat,lon[,name]) and/or the most frequent points in
+the backend's query log. Points are deduplicated by grid cell, cells that are
+already cached are skipped, and every remaining cell is extracted in one pass
+per GRIB file (each message decoded once for all cells).
+
+    python warm_points.py [--model HREF] [--sites warm_sites.csv] [--from-log 50] [--sink mongo]
+"""
+import argparse
+import csv
+import logging
+import time
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool
+from pathlib import Path
+
+from grib_data_to_json import (
+    DESIRED_FORECAST_TYPES,
+    MODEL_FOLDERS,
+    POINT_CACHE,
+    build_output_data,
+    default_pool_size,
+    list_grib_files,
+    make_cache_entry,
+    model_files,
+    process_file_points,
+)
+from conversion_manifest import ConversionManifest
+from message_catalog import load_catalog
+from output_sinks import SINKS, open_sink
+from point_cache import cell_metadata, resolve_cells
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PARENT_DIR = SCRIPT_DIR.parent
+
+SITES_FILE = SCRIPT_DIR / "warm_sites.csv"
+QUERY_LOG = PARENT_DIR / "cinder-app" / "backend" / "query_log.csv"
+TOP_LOGGED_POINTS = 50
+
+logger = logging.getLogger("warm_points")
+
+
+def load_sites(path=SITES_FILE):
+    """Reads (lat, lon) pairs from a CSV with a lat,lon[,name] header."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)]
+
+
+def sites_from_query_log(path=QUERY_LOG, top_n=TOP_LOGGED_POINTS):
+    """Returns the top_n most requested (lat, lon) pairs from the backend query log."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    counts = Counter()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            try:
+                counts[(float(row[1]), float(row[2]))] += 1
+            except (IndexError, ValueError):
+                continue
+    return [point for point, _ in counts.most_common(top_n)]
+
+
+def warm_model(model, sites, sink=None, cache=POINT_CACHE, pool=None):
+    """
+    Extracts every not-yet-cached grid cell covered by `sites` for one model
+    and stores the results in the point cache (and the sink, if given).
+    Returns a coverage report dict.
+    """
+    t0 = time.time()
+    folder = MODEL_FOLDERS[model]
+    file_list = list_grib_files(folder)
+    # refresh the header catalog of the new download while we're here
+    load_catalog(folder)
+    version = ConversionManifest(folder).version(model_files(model, folder))
+    report = {"model": model, "cycle": None, "sites": len(sites), "cells": 0,
+              "already_cached": 0, "extracted": 0, "rows": 0, "seconds": 0.0}
+
+    # one representative site per grid cell that is not cached yet
+    cells = {}
+    for (lat, lon), key in zip(sites, resolve_cells(model, file_list, sites)):
+        if key is None:
+            continue
+        report["cycle"] = key.cycle
+        if key in cells:
+            continue
+        cache.observe_cycle(model, key.cycle)
+        entry = cache.get(key, version=version)
+        cells[key] = (lat, lon) if entry is None else None
+
+    report["cells"] = len(cells)
+    report["already_cached"] = sum(1 for point in cells.values() if point is None)
+    todo = [(key, point) for key, point in cells.items() if point is not None]
+
+    if todo and file_list:
+        points = [point for _, point in todo]
+        keywords_lower = [k.lower() for k in DESIRED_FORECAST_TYPES]
+        fn = partial(process_file_points, points=points, keywords_lower=keywords_lower)
+        extract_list = model_files(model, folder)
+        if pool is not None:
+            file_results = pool.map(fn, extract_list)
+        else:
+            with Pool(processes=default_pool_size(len(extract_list))) as own_pool:
+                file_results = own_pool.map(fn, extract_list)
+
+        for k, (key, (lat, lon)) in enumerate(todo):
+            results = [(rows_per_point[k], anal_date, fname) for rows_per_point, anal_date, fname in file_results]
+            output_data, _ = build_output_data(folder, lat, lon, results, cell_metadata(key))
+            cache.put(key, make_cache_entry(output_data, results, version))
+            if sink is not None:
+                sink.write_output(output_data)
+            report["rows"] += len(output_data["data"])
+        report["extracted"] = len(todo)
+
+    report["seconds"] = round(time.time() - t0, 2)
+    coverage = (report["already_cached"] + report["extracted"]) / report["cells"] if report["cells"] else 0.0
+    logger.info(
+        f"Warm-up {model} cycle {report['cycle']}: {report['sites']} sites -> {report['cells']} cells, "
+        f"{report['already_cached']} cached, {report['extracted']} extracted, {report['rows']} rows, "
+        f"coverage {coverage:.0%} in {report['seconds']:.1f}s"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute hot points after a model fetch")
+    parser.add_argument("--model", choices=list(MODEL_FOLDERS), action="append",
+                        help="model(s) to warm (default: all)")
+    parser.add_argument("--sites", default=str(SITES_FILE), help="CSV with lat,lon[,name] columns")
+    parser.add_argument("--from-log", type=int, default=TOP_LOGGED_POINTS,
+                        help="also warm the N most requested points in the query log (0 to skip)")
+    parser.add_argument("--sink", choices=list(SINKS), default=None)
+    args = parser.parse_args()
+
+    sites = load_sites(args.sites)
+    if args.from_log:
+        sites = list(dict.fromkeys(sites + sites_from_query_log(top_n=args.from_log)))
+
+    sink = None
+    if args.sink:
+        try:
+            sink = open_sink(args.sink)
+        except Exception as e:
+            logger.warning(f"Sink '{args.sink}' unavailable, warming the point cache only: {e}")
+    try:
+        for model in args.model or list(MODEL_FOLDERS):
+            warm_model(model, sites, sink=sink)
+    finally:
+        if sink is not None:
+            sink.close()
@@ -2,6 +2,12 @@ import pygrib
 import numpy as np
 from datetime import timedelta, datetime
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "grib_to_json"))
+from grib_metadata import describe_message
+from message_catalog import load_catalog
 
 
 def get_value_from_latlon(lat, lon, lats, lons, data):
@@ -16,8 +22,9 @@ def get_value_from_latlon(lat, lon, lats, lons, data):
 
 def parse_grib_message(grb, lat, lon, filename):
     """Extract human-readable info and value for one GRIB message."""
-    limit = "more than" if grb.upperLimit > grb.lowerLimit else "less than"
-    val = grb.upperLimit if grb.upperLimit > grb.lowerLimit else grb.lowerLimit
+    descriptor = describe_message(grb)
+    limit = "less than" if descriptor.operator == "<" else "more than"
+    val = descriptor.threshold
 
     # Compute forecast start and end
     forecast_start_hour = grb.forecastTime
@@ -35,39 +42,40 @@ def parse_grib_message(grb, lat, lon, filename):
     data, lats, lons = grb.data()
     value = get_value_from_latlon(lat, lon, lats, lons, data)
 
-    return limit, val, grb.units, grb.name, forecast_start_time, forecast_end_time, value, time_label
+    return limit, val, descriptor.units, descriptor.name, forecast_start_time, forecast_end_time, value, time_label
 
 
 
 
 
 def get_one_forecast(folder_name, upper_limit, short_name, start_time, requested_forecast_length, lat, lon):
-    """Find matching GRIB files and extract the requested forecast data."""
-    href_files = sorted([entry.path for entry in os.scandir(folder_name) if entry.is_file()])
+    """Find matching GRIB messages via the folder's message catalog and extract only those."""
+    catalog = load_catalog(folder_name)
+    if not catalog.entries:
+        print(f"No GRIB messages found in {folder_name}")
+        return
+
+    # Print analysis date from the catalog (no file needs to be opened); None if the message has none
+    anal_date = catalog.entries[0].anal_date
+    print(f"HREF analysis date: {datetime.fromisoformat(anal_date) if anal_date is not None else None}")
 
-    # Print analysis date from first file
-    with pygrib.open(href_files[0]) as meta_grbs:
-        meta_grb = meta_grbs.message(1)
-        print(f"HREF analysis date: {meta_grb.analDate}")
+    matches = catalog.find(short_name, upper_limit=upper_limit,
+                           forecast_length=requested_forecast_length, valid_start=start_time)
 
-    for file_path in href_files:
+    for file_path, message_numbers in sorted(catalog.by_file(matches).items()):
         # Extract forecast hour number (e.g., 'f42')
-        parts = file_path.split(".")
+        parts = os.path.basename(file_path).split(".")
         number = next((p[1:] for p in parts if p.startswith("f")), None)
 
         with pygrib.open(file_path) as grbs:
-            for grb in grbs:
-                forecast_length = grb.endStep - grb.startStep
-
-                if grb.cfVarName == short_name and grb.upperLimit == upper_limit and forecast_length == requested_forecast_length:
-                    limit, val, units, name, forecast_start, forecast_end, value, time_label = parse_grib_message(grb, lat, lon, file_path)
-
-                    if forecast_start == start_time:
-                        print(
-                            f"Hour {number}. Message {grb.messagenumber}: "
-                            f"Probability of {limit} {val} {units} {name} "
-                            f"{time_label} is {value:.1f}% at ({lat:.4f}, {lon:.4f})"
-                        )
+            for msgno in message_numbers:
+                grb = grbs.message(msgno)
+                limit, val, units, name, forecast_start, forecast_end, value, time_label = parse_grib_message(grb, lat, lon, file_path)
+                print(
+                    f"Hour {number}. Message {grb.messagenumber}: "
+                    f"Probability of {limit} {val} {units} {name} "
+                    f"{time_label} is {value:.1f}% at ({lat:.4f}, {lon:.4f})"
+                )
 
 
 # --- Configuration ---